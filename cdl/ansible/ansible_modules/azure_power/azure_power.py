@@ -32,9 +32,23 @@ options:
   vm_name:
     description:
       - Name of the Azure virtual machine (computerName) to manage.
-    required: true
+      - Exactly one of vm_name and vm_names is required.
     type: str
 
+  vm_names:
+    description:
+      - Names of several virtual machines to manage in one call.
+      - One credential and one client per subscription are shared, all power requests
+        are sent concurrently and per-VM results are returned in C(results).
+    type: list
+    elements: str
+
+  max_workers:
+    description:
+      - Requests sent at once with vm_names.
+    type: int
+    default: 16
+
   action:
     description:
       - Power action to apply to the virtual machine.
@@ -48,6 +62,7 @@ options:
 notes:
   - This module must be executed on EE node.
   - Inventory file path is hardcoded inside the module (/mnt/opcon-archive/Archive/7D/UPD/).
+  - Lookups use the vm_inventory module_utils, which keeps an indexed SQLite copy of the inventory next to the CSV (<csv>.idx.sqlite).
   - The inventory file is automatically resolved as: 
       /mnt/opcon-archive/Archive/7D/UPD/azure_VMs_inventory-global-china-<today>.csv
   - The following environment variables must be provided (injected via AAP credentials or vault):
@@ -71,6 +86,11 @@ EXAMPLES = r'''
   azure_vm_power:
     vm_name: "CSM1KPOCVMW916"
     action: "deallocate"
+
+- name: Deallocate the nightly shutdown list in one call
+  azure_vm_power:
+    vm_names: "{{ shutdown_vms }}"
+    action: "deallocate"
 '''
 
 RETURN = r'''
@@ -104,12 +124,24 @@ error:
   description: Error message if operation failed.
   type: str
   returned: when status == "failed"
+
+results:
+  description: One entry per VM (vm, subscription_id, resource_group, changed, msg, power_state, failed).
+    A VM whose power operation failed is reported as failed and not changed.
+  type: list
+  elements: dict
+  returned: when vm_names is used
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 import os
-import csv
-from azure.identity import ClientSecretCredential, AzureAuthorityHosts
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from ansible.module_utils.vm_inventory import inventory_path, load_inventory as find_vm
+    from ansible.module_utils.azure_clients import get_credential as shared_credential, get_client
+except ImportError:
+    from vm_inventory import inventory_path, load_inventory as find_vm
+    from azure_clients import get_credential as shared_credential, get_client
 from azure.mgmt.compute import ComputeManagementClient
 from azure.core.exceptions import HttpResponseError
 
@@ -122,41 +154,12 @@ AZURE_CHINA_CLIENT_ID = os.environ.get('AZURE_CHINA_CLIENT_ID')
 AZURE_CHINA_TENANT_ID = os.environ.get("AZURE_CHINA_TENANT_ID")
 AZURE_CHINA_SECRET = os.environ.get("AZURE_CHINA_CLIENT_SECRET")
 
-# China specific settings
-CHINA_ARM_ENDPOINT = "https://management.chinacloudapi.cn"
-# kwargs for china clients
-RESOURCE_CLIENT_KWARGS = {
-    'base_url': CHINA_ARM_ENDPOINT,
-    'credential_scopes': [f"{CHINA_ARM_ENDPOINT}/.default"]
-}
-MGMT_CLIENT_KWARGS = {
-    'base_url': CHINA_ARM_ENDPOINT,
-    'credential_scopes': [f"{CHINA_ARM_ENDPOINT}/.default"]
-}
-
 # inventory setup
 INVENTORY_DIR = "/mnt/opcon-archive/Archive/7D/UPD"
-INVENTORY_PREFIX = "azure_VMs_inventory-global-china-"
-CSV_EXT = ".csv"
 
-# generates a string for today's tag and loads the file to grep required info
+# looks the VM up in the indexed copy of today's inventory
 def load_inventory(vm_name):
-    today_file = f"{INVENTORY_PREFIX}{get_today()}{CSV_EXT}"
-    full_path = os.path.join(INVENTORY_DIR, today_file)
-
-    if not os.path.exists(full_path):
-        raise FileNotFoundError(f"Inventory not found at: {full_path}")
-
-    with open(full_path, encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f, delimiter="\t")
-        for row in reader:
-            if row.get("name", "").strip().upper() == vm_name.upper():
-                return {
-                    "subscription_id": row.get("subscriptionId"),
-                    "resource_group": row.get("resourceGroup"),
-                    "vm_name": row.get("name"),
-                }
-    return None
+    return find_vm(vm_name, inventory_path(get_today(), INVENTORY_DIR))
 
 
 # generate a string with the format of the date(today) to match the inventory naming convention
@@ -174,75 +177,160 @@ def get_power_state(instance_view):
     return "Unknown"
 
 
+# azure cloud of a VM, based on its name
+def get_azure_space(vm_name):
+    return 'china' if 'CSM4' in vm_name.upper() or 'LAB4' in vm_name.upper() else 'global'
+
+
+# shared credential of an azure cloud
+def get_credential(azure_space):
+    if azure_space == 'china':
+        return shared_credential('china', AZURE_CHINA_TENANT_ID, AZURE_CHINA_CLIENT_ID, AZURE_CHINA_SECRET)
+    return shared_credential('global', AZURE_TENANT_ID, AZURE_CLIENT_ID, AZURE_SECRET)
+
+
+# shared compute client of a subscription in an azure cloud
+def get_compute_client(azure_space, subscription_id, credential):
+    return get_client(ComputeManagementClient, azure_space, subscription_id, credential)
+
+
+# checks the current state and sends the power request
+# returns (result, poller); poller is None when nothing was sent
+def begin_action(compute_client, rg, vm_resource, action):
+    instance_view = compute_client.virtual_machines.instance_view(rg, vm_resource)
+    current_state = get_power_state(instance_view)
+
+    if action == "start" and current_state == "VM running":
+        return {"changed": False, "msg": "VM is already running.", "power_state": current_state}, None
+    if action in ["stop", "deallocate"] and current_state == "VM deallocated":
+        return {"changed": False, "msg": "VM is already deallocated.", "power_state": current_state}, None
+
+    if action == "start":
+        poller = compute_client.virtual_machines.begin_start(rg, vm_resource)
+    elif action == "stop":
+        poller = compute_client.virtual_machines.begin_power_off(rg, vm_resource)
+    elif action == "deallocate":
+        poller = compute_client.virtual_machines.begin_deallocate(rg, vm_resource)
+    else:
+        return {"failed": True, "msg": f"Unsupported action '{action}'"}, None
+
+    return {"changed": True, "msg": f"{action.title()} request sent.", "vm": vm_resource}, poller
+
+
+# waits for a sent power request and reports the VM's final power state
+# a failed operation is raised by poller.result()
+def finish_action(compute_client, rg, vm_resource, action, poller):
+    poller.result()
+    instance_view = compute_client.virtual_machines.instance_view(rg, vm_resource)
+    return {"changed": True, "msg": f"{action.title()} completed.", "vm": vm_resource,
+            "power_state": get_power_state(instance_view)}
+
+
+# turns an exception into a module result
+def error_result(e):
+    if isinstance(e, HttpResponseError):
+        return {"failed": True, "changed": False, "msg": f"Azure API error: {str(e)}"}
+    return {"failed": True, "changed": False, "msg": f"Unexpected error: {str(e)}"}
+
+
 # execute the called action
 def manage_vm(vm_name, action):
     vm_info = load_inventory(vm_name)
     if not vm_info:
         return {"changed": False, "msg": f"VM '{vm_name}' not found in inventory."}
 
-    AZURE_SPACE = 'china' if 'CSM4' in vm_name.upper() or 'LAB4' in vm_name.upper() else 'global'
-
-    if AZURE_SPACE == 'global':
-        credentials = ClientSecretCredential(
-            tenant_id=AZURE_TENANT_ID,
-            client_id=AZURE_CLIENT_ID,
-            client_secret=AZURE_SECRET,
-        )
-    elif AZURE_SPACE == 'china':
-        credential = ClientSecretCredential(
-            tenant_id=AZURE_CHINA_TENANT_ID,
-            client_id=AZURE_CHINA_CLIENT_ID,
-            client_secret=AZURE_CHINA_SECRET,
-            authority=AzureAuthorityHosts.AZURE_CHINA
-        )
-
-    if AZURE_SPACE == 'global':
-        compute_client = ComputeManagementClient(credentials, vm_info["subscription_id"])
-    elif AZURE_SPACE == 'china':
-        compute_client = ComputeManagementClient(credential, vm_info["subscription_id"], **MGMT_CLIENT_KWARGS)
-    rg = vm_info["resource_group"]
-    vm_resource = vm_info["vm_name"]
+    azure_space = get_azure_space(vm_name)
+    compute_client = get_compute_client(azure_space, vm_info["subscription_id"], get_credential(azure_space))
 
     try:
-        instance_view = compute_client.virtual_machines.instance_view(rg, vm_resource)
-        current_state = get_power_state(instance_view)
-
-        if action == "start" and current_state == "VM running":
-            return {"changed": False, "msg": "VM is already running."}
-        if action in ["stop", "deallocate"] and current_state == "VM deallocated":
-            return {"changed": False, "msg": "VM is already deallocated."}
-
-        if action == "start":
-            compute_client.virtual_machines.begin_start(rg, vm_resource).wait()
-        elif action == "stop":
-            compute_client.virtual_machines.begin_power_off(rg, vm_resource).wait()
-        elif action == "deallocate":
-            compute_client.virtual_machines.begin_deallocate(rg, vm_resource).wait()
-        else:
-            return {"failed": True, "msg": f"Unsupported action '{action}'"}
-
-        return {"changed": True, "msg": f"{action.title()} request sent.", "vm": vm_resource}
-
-    except HttpResponseError as e:
-        return {"failed": True, "msg": f"Azure API error: {str(e)}"}
+        result, poller = begin_action(compute_client, vm_info["resource_group"], vm_info["vm_name"], action)
+        if poller:
+            result = finish_action(compute_client, vm_info["resource_group"], vm_info["vm_name"], action, poller)
+        return result
 
     except Exception as e:
-        return {"failed": True, "msg": f"Unexpected error: {str(e)}"}
+        return error_result(e)
+
+
+# execute the called action on many VMs
+# one credential per azure cloud and one compute client per subscription are shared by
+# the VMs; all requests are sent concurrently and the pollers are then awaited together
+def manage_vms(vm_names, action, max_workers=16):
+    results = []
+    targets = []
+    for vm_name in vm_names:
+        vm_info = load_inventory(vm_name)
+        if not vm_info:
+            results.append({"vm": vm_name, "failed": True, "changed": False,
+                            "msg": f"VM '{vm_name}' not found in inventory."})
+            continue
+        result = {"vm": vm_info["vm_name"], "subscription_id": vm_info["subscription_id"],
+                  "resource_group": vm_info["resource_group"]}
+        results.append(result)
+        targets.append((get_azure_space(vm_name), vm_info, result))
+
+    credentials = {}
+    clients = {}
+    for azure_space, vm_info, _ in targets:
+        if azure_space not in credentials:
+            credentials[azure_space] = get_credential(azure_space)
+        key = (azure_space, vm_info["subscription_id"])
+        if key not in clients:
+            clients[key] = get_compute_client(azure_space, vm_info["subscription_id"], credentials[azure_space])
+
+    def send(target):
+        azure_space, vm_info, result = target
+        try:
+            outcome, poller = begin_action(clients[(azure_space, vm_info["subscription_id"])],
+                                           vm_info["resource_group"], vm_info["vm_name"], action)
+        except Exception as e:
+            outcome, poller = error_result(e), None
+        result.update(outcome)
+        return poller
+
+    def finish(item):
+        (azure_space, vm_info, result), poller = item
+        try:
+            outcome = finish_action(clients[(azure_space, vm_info["subscription_id"])],
+                                    vm_info["resource_group"], vm_info["vm_name"], action, poller)
+        except Exception as e:
+            outcome = error_result(e)
+        result.update(outcome)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        pollers = list(executor.map(send, targets))
+        sent = [(target, poller) for target, poller in zip(targets, pollers) if poller]
+        list(executor.map(finish, sent))
+
+    return results
 
 
 def main():
     module = AnsibleModule(
         argument_spec=dict(
-            vm_name=dict(type="str", required=True),
+            vm_name=dict(type="str"),
+            vm_names=dict(type="list", elements="str"),
             action=dict(type="str", required=True, choices=["start", "stop", "deallocate"]),
+            max_workers=dict(type="int", default=16),
         ),
+        mutually_exclusive=[["vm_name", "vm_names"]],
+        required_one_of=[["vm_name", "vm_names"]],
         supports_check_mode=False
     )
 
-    vm_name = module.params["vm_name"]
     action = module.params["action"]
 
-    result = manage_vm(vm_name, action)
+    if module.params["vm_names"] is not None:
+        results = manage_vms(module.params["vm_names"], action, module.params["max_workers"])
+        failed = [r["vm"] for r in results if r.get("failed")]
+        changed = any(r.get("changed") for r in results)
+        if failed:
+            module.fail_json(msg=f"{len(failed)} of {len(results)} VM(s) failed: {', '.join(failed)}",
+                             changed=changed, results=results)
+        module.exit_json(changed=changed, msg=f"{action.title()} completed for {len(results)} VM(s).",
+                         results=results)
+
+    result = manage_vm(module.params["vm_name"], action)
 
     if result.get("failed"):
         module.fail_json(msg=result["msg"])
@@ -22,7 +22,8 @@ author: "Tsvetelin Maslarski (LDC)"
 short_description: Collects VM info from Azure.
 description:
   - Computer name must be provided in order to collect VM info.
-  - The program will brute-force search in all available subscriptions to find the VM.
+  - The VM is located with a single Azure Resource Graph query across all available subscriptions.
+  - If Resource Graph is unavailable, fails or returns nothing, the program brute-force searches all subscriptions.
   - If a VM is found the information will be outputted as:
         {
             "subscriptionId": "<subscription_id>",
@@ -88,13 +89,44 @@ from azure.mgmt.compute import ComputeManagementClient
 from azure.core.exceptions import HttpResponseError
 from azure.mgmt.resource import ResourceManagementClient,SubscriptionClient
 
+try:
+    from ansible.module_utils.vm_graph import find_vm, get_power_state
+except ImportError:
+    from vm_graph import find_vm, get_power_state
+
 
 AZURE_CLIENT_ID = os.environ.get('AZURE_CLIENT_ID')
 AZURE_TENANT_ID = os.environ.get("AZURE_TENANT_ID")
 AZURE_SECRET = os.environ.get("AZURE_CLIENT_SECRET")
 
-def collect_info(vm_name):
+def find_vm_graph(credentials, vm_name, warn=None):
+    """Locate a VM by computer name with one Resource Graph query; None if not found, unavailable or the query failed."""
+    try:
+        vm_info = find_vm(credentials, vm_name)
+    except HttpResponseError as e:
+        if warn:
+            warn(f"Resource Graph query failed, falling back to subscription scan: {e.message}")
+        return None
+    if not vm_info:
+        return None
+
+    compute_client = ComputeManagementClient(credentials, vm_info['subscription_id'])
+    instance_view = compute_client.virtual_machines.instance_view(vm_info['resource_group'], vm_info['vm_name'])
+
+    return {
+        'subscriptionId': vm_info['subscription_id'],
+        'resourceGroup': vm_info['resource_group'],
+        'name': vm_info['vm_name'],
+        'status': get_power_state(instance_view),
+    }
+
+def collect_info(vm_name, warn=None):
     credentials = DefaultAzureCredential()
+
+    found = find_vm_graph(credentials, vm_name, warn)
+    if found:
+        return {'changed': True, 'msg': found}
+
     sub_client = SubscriptionClient(credentials)
     found = {}
 
@@ -133,7 +165,10 @@ def main():
     )
 
     vm_name = module.params['vm_name']
-    result = collect_info(vm_name)
+    try:
+        result = collect_info(vm_name, module.warn)
+    except HttpResponseError as e:
+        module.fail_json(msg=f"Failed to look up {vm_name}: {e.message}")
 
     if result.get('failed'):
         module.fail_json(msg=result['msg'])
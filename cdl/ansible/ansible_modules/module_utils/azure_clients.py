@@ -0,0 +1 @@
+../../../azure/azure_clients.py
\ No newline at end of file
@@ -0,0 +1 @@
+../../../azure/copy_sto_program/src/core/resource_graph.py
\ No newline at end of file
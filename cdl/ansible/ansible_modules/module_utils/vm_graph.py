@@ -0,0 +1 @@
+../../../azure/vm_graph.py
\ No newline at end of file
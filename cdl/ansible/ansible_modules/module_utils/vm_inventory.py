@@ -0,0 +1 @@
+../../../azure/vm_inventory.py
\ No newline at end of file
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Process-wide pool of Azure credentials and management clients.
+
+Credentials are cached per (authority, tenant, client id), so their access tokens
+are acquired once and refreshed by the SDK for the rest of the run. Management
+clients are cached per (authority, subscription, client type, credential), so
+their HTTP sessions and TLS connections are reused across VMs.
+
+Usage:
+    from azure_clients import get_credential, get_client
+
+    credential = get_credential('global', tenant_id, client_id, client_secret)
+    compute_client = get_client(ComputeManagementClient, 'global', subscription_id, credential)
+
+Author: tsvetelin.maslarski-ext@ldc.com
+"""
+
+import threading
+from azure.identity import ClientSecretCredential, AzureAuthorityHosts
+
+# China specific settings
+CHINA_ARM_ENDPOINT = "https://management.chinacloudapi.cn"
+MGMT_CLIENT_KWARGS = {
+    'base_url': CHINA_ARM_ENDPOINT,
+    'credential_scopes': [f"{CHINA_ARM_ENDPOINT}/.default"]
+}
+
+_credentials = {}
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_credential(authority, tenant_id, client_id, client_secret, **kwargs):
+    """
+    Get the shared credential of a service principal.
+
+    Args:
+        authority (str): 'global' or 'china'
+        tenant_id (str): Tenant ID
+        client_id (str): Service principal client ID
+        client_secret (str): Service principal secret (only used when the credential is created)
+        **kwargs: Extra credential options (e.g. connection_verify), only used when it is created
+
+    Returns:
+        ClientSecretCredential
+    """
+    key = (authority, tenant_id, client_id)
+    with _lock:
+        credential = _credentials.get(key)
+        if credential is None:
+            if authority == 'china':
+                credential = ClientSecretCredential(
+                    tenant_id=tenant_id,
+                    client_id=client_id,
+                    client_secret=client_secret,
+                    authority=AzureAuthorityHosts.AZURE_CHINA,
+                    **kwargs
+                )
+            else:
+                credential = ClientSecretCredential(
+                    tenant_id=tenant_id,
+                    client_id=client_id,
+                    client_secret=client_secret,
+                    **kwargs
+                )
+            _credentials[key] = credential
+        return credential
+
+
+def get_client(client_class, authority, subscription_id, credential, **kwargs):
+    """
+    Get the shared management client of a subscription.
+
+    Args:
+        client_class: SDK client class (e.g. ComputeManagementClient)
+        authority (str): 'global' or 'china' (china clients use the China Resource Manager endpoint)
+        subscription_id (str): Subscription ID
+        credential: Credential from get_credential
+        **kwargs: Extra client options, only used when the client is created
+
+    Returns:
+        Client instance
+    """
+    key = (authority, subscription_id, client_class, credential)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            if authority == 'china':
+                kwargs = {**MGMT_CLIENT_KWARGS, **kwargs}
+            client = client_class(credential, subscription_id, **kwargs)
+            _clients[key] = client
+        return client
+
+
+def clear():
+    """Close and forget all pooled clients and credentials."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _credentials.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            pass
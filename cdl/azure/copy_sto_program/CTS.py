@@ -16,20 +16,63 @@ With resource groups specified (faster):
 For Azure China:
     python CTS.py --source-storage-account srcaccount --source-share srcshare --dest-storage-account destaccount --dest-share destshare --environment china
 
+Shares with many small files (copy 16 files at a time):
+    python CTS.py --source-storage-account srcaccount --source-share srcshare --dest-storage-account destaccount --dest-share destshare --workers 16
+
+Server-side copy (data stays inside Azure, the host only coordinates):
+    python CTS.py --source-storage-account srcaccount --source-share srcshare --dest-storage-account destaccount --dest-share destshare --server-side --workers 16
+
+Resumable copy (rerun the same command after a failure to continue where it stopped):
+    python CTS.py --source-storage-account srcaccount --source-share srcshare --dest-storage-account destaccount --dest-share destshare --manifest srcshare.sqlite
+
+Async pipeline (16 files in flight, at most 512 MiB buffered):
+    python CTS.py --source-storage-account srcaccount --source-share srcshare --dest-storage-account destaccount --dest-share destshare --async --workers 16 --max-inflight-mb 512
+
+Few very large files (transfer 8 ranges of each file at once):
+    python CTS.py --source-storage-account srcaccount --source-share srcshare --dest-storage-account destaccount --dest-share destshare --range-workers 8
+
+Recurring migration (copy only the delta, remove files deleted at the source):
+    python CTS.py --source-storage-account srcaccount --source-share srcshare --dest-storage-account destaccount --dest-share destshare --sync --delete-extraneous
+
+Split one share across 4 processes or pods (run once per index 0..3, each with its own manifest):
+    python CTS.py --source-storage-account srcaccount --source-share srcshare --dest-storage-account destaccount --dest-share destshare --shard 0/4 --manifest shard0.sqlite
+
+Only some files (globs match the path relative to the share root; 're:' for regular expressions):
+    python CTS.py --source-storage-account srcaccount --source-share srcshare --dest-storage-account destaccount --dest-share destshare --include 'projects/*' --exclude '*.tmp' --exclude 're:(^|/)cache/'
+
+Many share pairs from a job file (YAML or CSV), 4 pairs at a time, at most 32 files in flight overall:
+    python CTS.py --batch migration.yaml --batch-workers 4 --workers 32 --manifest manifests/
+
+Dry run (checks and size histogram; nothing is copied):
+    python CTS.py --source-storage-account srcaccount --source-share srcshare --dest-storage-account destaccount --dest-share destshare --plan
+
+Dry run with an estimated duration for 16 workers (the probe writes up to 256 MiB to the destination share):
+    python CTS.py --source-storage-account srcaccount --source-share srcshare --dest-storage-account destaccount --dest-share destshare --plan --probe-mb 256 --workers 16
+
 Author: tsvetelin.maslarski-ext@ldc.com
 """
 
 import sys
 import argparse
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from azure.core.exceptions import HttpResponseError
 from tqdm import tqdm
 import hashlib
 import time
 
+from src.core.account_index import StorageAccountIndex
 from src.core.azure_auth import AzureAuthenticator
 from src.core.azure_discovery import AzureDiscovery
 from src.core.azure_storage import AzureStorageManager, FileShareCopier
+from src.core.batch import AccountPool, BatchRunner, load_jobs
+from src.core.manifest import CopyManifest
+from src.core.metrics import RunMetrics
+from src.core.path_filter import PathFilter, parse_shard
+from src.core import planner
+from src.core.throttle import AdaptiveLimiter
 from src.core.utils import format_bytes, calculate_md5_from_bytes, setup_ssl_verification, check_storage_tiers, check_quota
 from src.config.settings import StorageAccountConfig
 
@@ -41,59 +84,105 @@ def parse_arguments():
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog=__doc__
     )
-    parser.add_argument('--source-storage-account', required=True,
-                       help='Source storage account name')
+    parser.add_argument('--source-storage-account', required=False,
+                       help='Source storage account name (required unless --batch)')
     parser.add_argument('--source-resource-group', required=False,
                        help='Source storage account resource group (optional, will be discovered if not provided)')
-    parser.add_argument('--source-share', required=True,
-                       help='Source file share name')
-    parser.add_argument('--dest-storage-account', required=True,
-                       help='Destination storage account name')
+    parser.add_argument('--source-share', required=False,
+                       help='Source file share name (required unless --batch)')
+    parser.add_argument('--dest-storage-account', required=False,
+                       help='Destination storage account name (required unless --batch)')
     parser.add_argument('--dest-resource-group', required=False,
                        help='Destination storage account resource group (optional, will be discovered if not provided)')
-    parser.add_argument('--dest-share', required=True,
-                       help='Destination file share name')
+    parser.add_argument('--dest-share', required=False,
+                       help='Destination file share name (required unless --batch)')
     parser.add_argument('--environment', choices=['global', 'china'], default='global',
                        help='Azure environment (global or china)')
     parser.add_argument('--dec', action='store_true', default=False,
                        help='Use python-decouple config() instead of os.getenv() for reading .env file')
     parser.add_argument('--enable-ssl-verify', action='store_true', default=False,
                        help='Enable SSL certificate verification (disabled by default for corporate environments)')
-
-    return parser.parse_args()
-
-
-def discover_storage_location(discovery: AzureDiscovery, account_name: str,
-                              resource_group: str = None) -> tuple:
-    """
-    Discover storage account location.
-
-    Returns:
-        Tuple of (subscription_id, resource_group)
-    """
-    if resource_group:
-        # Resource group provided, just find subscription
-        print(f"\nResource group provided: {resource_group}")
-        subscription_id = discovery.find_subscription_for_storage_account(
-            resource_group, account_name
-        )
-
-        if not subscription_id:
-            raise Exception(
-                f"Could not find storage account '{account_name}' "
-                f"in resource group '{resource_group}'"
-            )
-
-        return subscription_id, resource_group
-    else:
-        # Discover both subscription and resource group
-        result = discovery.find_storage_account_location(account_name)
-
-        if not result:
-            raise Exception(f"Could not find storage account '{account_name}'")
-
-        subscription_id, resource_group, _ = result
-        return subscription_id, resource_group
+    parser.add_argument('--index-file', default=None,
+                       help='Storage account location index (default: ~/.cts/account_index_<environment>.json)')
+    parser.add_argument('--index-ttl-hours', type=float, default=24.0,
+                       help='Age after which index entries are rescanned; 0 forces a full scan (default: 24)')
+    parser.add_argument('--no-index', action='store_true', default=False,
+                       help='Do not use the storage account location index (always scan subscriptions)')
+    parser.add_argument('--no-resource-graph', action='store_true', default=False,
+                       help='Do not query Azure Resource Graph; locate accounts by scanning each subscription')
+    parser.add_argument('--discovery-workers', type=int, default=8,
+                       help='Number of subscriptions scanned concurrently when Resource Graph is not used (default: 8)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Number of files to copy concurrently (default: 1, sequential)')
+    parser.add_argument('--server-side', action='store_true', default=False,
+                       help='Copy inside Azure with start_copy_from_url (data does not pass through this host)')
+    parser.add_argument('--deep-verify', action='store_true', default=False,
+                       help='Re-download every copied file to verify its MD5 (slow, doubles egress)')
+    parser.add_argument('--manifest', required=False,
+                       help='SQLite checkpoint file; reruns with the same file skip verified files and resume partial ones')
+    parser.add_argument('--list-workers', type=int, default=8,
+                       help='Number of directories listed concurrently while enumerating the source (default: 8)')
+    parser.add_argument('--sync', action='store_true', default=False,
+                       help='Incremental sync: copy only files that are new or changed (size/last-modified)')
+    parser.add_argument('--delete-extraneous', action='store_true', default=False,
+                       help='With --sync, delete destination files that no longer exist in the source')
+    parser.add_argument('--sync-md5', action='store_true', default=False,
+                       help='With --sync, compare stored Content-MD5 for files of equal size (extra request per file)')
+    parser.add_argument('--async', dest='async_copy', action='store_true', default=False,
+                       help='Use the asyncio pipeline (overlaps range download/upload; requires aiohttp)')
+    parser.add_argument('--max-inflight-mb', type=int, default=256,
+                       help='Maximum MiB of range data held by all workers (and all --batch jobs) at once (default: 256)')
+    parser.add_argument('--chunk-size-mb', type=int, default=4,
+                       help='Range size in MiB for streamed copies, 1-4 (default: 4)')
+    parser.add_argument('--range-workers', type=int, default=1,
+                       help='Number of ranges of one file transferred concurrently (default: 1)')
+
+    parser.add_argument('--no-adaptive', action='store_true', default=False,
+                       help='Disable adaptive concurrency (AIMD) and retries of throttled ranges/failed files')
+    parser.add_argument('--file-retries', type=int, default=2,
+                       help='Times files failed by throttling or transient errors are re-queued with backoff in adaptive mode (default: 2)')
+    parser.add_argument('--report', required=False,
+                       help='Write a JSON run report (throughput, phase timings, retries, slowest files) to this file')
+    parser.add_argument('--report-interval', type=float, default=0,
+                       help='Print a progress line (and refresh --report) every N seconds; 0 disables (default: 0)')
+    parser.add_argument('--include', action='append', default=[], metavar='PATTERN',
+                       help="Only copy files whose path matches (glob, or regex with 're:' prefix); repeatable")
+    parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                       help="Skip files whose path matches (glob, or regex with 're:' prefix); repeatable")
+    parser.add_argument('--shard', default=None, metavar='I/N',
+                       help='Copy only shard I of N (0-based) of the files, partitioned by path hash')
+    parser.add_argument('--batch', required=False, metavar='JOB_FILE',
+                       help='Copy every share pair listed in a YAML or CSV job file')
+    parser.add_argument('--batch-workers', type=int, default=4,
+                       help='With --batch, number of share pairs copied at once (default: 4)')
+    parser.add_argument('--plan', action='store_true', default=False,
+                       help='Dry run: run the checks and print a size histogram; nothing is copied. '
+                            'WARNING: with --probe-mb it writes sample files to the destination share '
+                            '(deleted afterwards) to estimate the copy duration')
+    parser.add_argument('--probe-mb', type=int, default=0,
+                       help='With --plan, copy up to N MiB of sample files into a scratch directory of the '
+                            'destination share to measure throughput (default: 0, no probe)')
+    parser.add_argument('--probe-files', type=int, default=50,
+                       help='With --plan, maximum number of files copied by the probe (default: 50)')
+
+    args = parser.parse_args()
+    pair_args = ['source_storage_account', 'source_share', 'dest_storage_account', 'dest_share']
+    if args.batch:
+        if args.async_copy or args.plan:
+            parser.error('--batch cannot be combined with --async or --plan')
+    elif any(getattr(args, name) is None for name in pair_args):
+        parser.error('--source-storage-account, --source-share, --dest-storage-account and '
+                     '--dest-share are required unless --batch is given')
+    if args.async_copy and (args.sync or args.server_side or args.range_workers > 1):
+        parser.error('--async cannot be combined with --sync, --server-side or --range-workers')
+    if not 1 <= args.chunk_size_mb <= 4:
+        parser.error('--chunk-size-mb must be between 1 and 4 (Azure Files range upload limit)')
+    try:
+        args.path_filter = PathFilter(args.include, args.exclude,
+                                      parse_shard(args.shard) if args.shard else None)
+    except (ValueError, re.error) as e:
+        parser.error(str(e))
+    return args
 
 
 def print_banner(title: str):
@@ -117,6 +206,129 @@ def print_summary(source_config: StorageAccountConfig, dest_config: StorageAccou
     print(f"{'='*70}")
 
 
+def run_plan(args, copier, plan, checks: dict, report_fields: dict) -> bool:
+    """
+    Print the dry-run report: plan totals, size histogram, probe and estimated duration.
+
+    Args:
+        args: Parsed command line arguments
+        copier: FileShareCopier configured like the real run (used for the probe)
+        plan: FilePlan of the source share
+        checks: Result of each pre-copy check by name
+        report_fields: Run report fields, extended with the plan
+
+    Returns:
+        True if all checks passed
+    """
+    print_banner("Copy Plan (dry run)")
+    histogram = planner.size_histogram(plan)
+    planner.print_plan(plan, histogram)
+    report_fields['plan'] = {
+        'files': plan.file_count,
+        'directories': len(plan.directories),
+        'bytes': plan.total_size,
+        'histogram': [vars(bucket) for bucket in histogram],
+        'checks': checks,
+    }
+
+    model = None
+    sample = []
+    if args.probe_mb <= 0:
+        print("\n  Duration not estimated: pass --probe-mb N to measure throughput "
+              "(writes up to N MiB to the destination share)")
+    elif plan.file_count:
+        sample = planner.select_probe_sample(plan, args.probe_files, args.probe_mb * 1024 * 1024)
+        if not sample:
+            smallest = min(entry.size for entry in plan.files.values())
+            print(f"\n  ⚠ Every file is larger than --probe-mb; use at least "
+                  f"--probe-mb {smallest // (1024 * 1024) + 1} to probe")
+
+    if sample:
+        probe_dir = f".cts-probe-{int(time.time())}"
+        print(f"\n  Probing throughput with {len(sample)} file(s) "
+              f"({format_bytes(sum(entry.size for entry in sample))}) into {args.dest_share}/{probe_dir}...")
+        # probe copies are scratch data: keep them out of the run metrics
+        copier.metrics = None
+        model = planner.run_probe(copier, args.source_share, args.dest_share, sample, probe_dir)
+
+    if model:
+        estimate = model.estimate(plan.file_count, plan.total_size, args.workers)
+        print(f"\n  Probe: {model.probe_files} file(s), {format_bytes(model.probe_bytes)} "
+              f"in {model.probe_seconds:.1f}s")
+        print(f"  Per-file overhead: {model.per_file_seconds * 1000:.0f} ms, "
+              f"per-stream rate: {format_bytes(int(1 / model.seconds_per_byte)) if model.seconds_per_byte else 'n/a'}/s")
+        print(f"  Estimated duration with {args.workers} worker(s): {planner.format_duration(estimate)}")
+        if args.sync:
+            print("  (estimate for a full copy; --sync copies only new or changed files)")
+        if args.async_copy:
+            print("  (probe used the threaded copier; --async usually runs somewhat faster)")
+        report_fields['plan']['estimate_seconds'] = round(estimate, 1)
+        report_fields['plan']['probe'] = vars(model)
+    elif sample:
+        print("\n  ⚠ No throughput probe result; duration not estimated")
+
+    passed = all(checks.values())
+    for name, ok in checks.items():
+        print(f"  {'✓' if ok else '✗'} {name} check {'passed' if ok else 'failed'}")
+    return passed
+
+
+def run_batch(args, credential, discovery, metrics: RunMetrics, report_fields: dict) -> int:
+    """
+    Copy all share pairs of the --batch job file.
+
+    Args:
+        args: Parsed command line arguments
+        credential: Azure credential shared by all pairs
+        discovery: AzureDiscovery shared by all pairs
+        metrics: Run metrics shared by all pairs
+        report_fields: Run report fields, extended with the per-job results
+
+    Returns:
+        Number of jobs that did not succeed
+    """
+    jobs = load_jobs(args.batch)
+    print(f"  Loaded {len(jobs)} job(s) from {args.batch}")
+
+    # One limiter caps the files in flight across all pairs; without --no-adaptive it
+    # also lowers the cap when the service throttles
+    if args.no_adaptive:
+        throttle = AdaptiveLimiter(max_limit=args.workers, decrease_factor=1.0, max_retries=0)
+    else:
+        throttle = AdaptiveLimiter(max_limit=args.workers)
+
+    def response_hook(pipeline_response):
+        metrics.response_hook(pipeline_response)
+        if not args.no_adaptive:
+            throttle.response_hook(pipeline_response)
+
+    accounts = AccountPool(credential, args.environment, discovery,
+                           client_options={'raw_response_hook': response_hook})
+    runner = BatchRunner(
+        accounts,
+        copier_options=dict(
+            workers=args.workers, server_side=args.server_side, deep_verify=args.deep_verify,
+            list_workers=args.list_workers, chunk_size=args.chunk_size_mb * 1024 * 1024,
+            range_workers=args.range_workers, metrics=metrics, throttle=throttle,
+            file_retries=0 if args.no_adaptive else args.file_retries,
+            max_inflight_bytes=args.max_inflight_mb * 1024 * 1024, path_filter=args.path_filter,
+        ),
+        job_workers=args.batch_workers, manifest_dir=args.manifest, sync=args.sync,
+        delete_extraneous=args.delete_extraneous, compare_md5=args.sync_md5
+    )
+
+    with metrics.phase('copy'):
+        results = runner.run(jobs)
+    report_fields['jobs'] = [result.to_dict() for result in results]
+
+    print_banner("Batch Complete")
+    for result in results:
+        mark = '✓' if result.status == 'success' else '✗'
+        detail = result.error or f"{result.successful} copied, {result.failed} failed"
+        print(f"  {mark} {result.job.name}: {result.status} ({detail}, {result.seconds:.0f}s)")
+    return sum(1 for result in results if result.status != 'success')
+
+
 def main():
     """Main execution function."""
     args = parse_arguments()
@@ -126,6 +338,23 @@ def main():
 
     print_banner(f"CTS - Copy To Storage | {args.environment.upper()} Environment")
 
+    metrics = RunMetrics()
+    report_fields = {
+        'options': {
+            'workers': args.workers, 'range_workers': args.range_workers,
+            'chunk_size_mb': args.chunk_size_mb, 'list_workers': args.list_workers,
+            'server_side': args.server_side, 'async': args.async_copy, 'sync': args.sync,
+            'deep_verify': args.deep_verify,
+            'include': args.include, 'exclude': args.exclude, 'shard': args.shard,
+        },
+        'result': 'error',
+    }
+    if args.batch:
+        report_fields['batch'] = args.batch
+    else:
+        report_fields['source'] = f"{args.source_storage_account}/{args.source_share}"
+        report_fields['destination'] = f"{args.dest_storage_account}/{args.dest_share}"
+
     try:
         # Step 1: Authenticate
         print("\nStep 1: Authenticating...")
@@ -137,17 +366,32 @@ def main():
 
         # Step 2: Discover storage account locations
         print("\nStep 2: Discovering storage account locations...")
-        discovery = AzureDiscovery(credential, args.environment)
-
-        # Discover source
-        source_sub_id, source_rg = discover_storage_location(
-            discovery, args.source_storage_account, args.source_resource_group
-        )
+        index = None
+        if not args.no_index:
+            index_file = args.index_file or Path.home() / '.cts' / f'account_index_{args.environment}.json'
+            index = StorageAccountIndex(index_file, ttl_hours=args.index_ttl_hours)
+        discovery = AzureDiscovery(credential, args.environment, index=index,
+                                   use_resource_graph=not args.no_resource_graph,
+                                   subscription_workers=args.discovery_workers)
+
+        if args.batch:
+            unsuccessful = run_batch(args, credential, discovery, metrics, report_fields)
+            report_fields['result'] = 'success' if unsuccessful == 0 else 'failed'
+            if unsuccessful:
+                print(f"\n⚠ {unsuccessful} job(s) did not complete successfully.")
+                sys.exit(1)
+            print(f"\n✓ All jobs copied and verified successfully!")
+            sys.exit(0)
 
-        # Discover destination
-        dest_sub_id, dest_rg = discover_storage_location(
-            discovery, args.dest_storage_account, args.dest_resource_group
-        )
+        # Discover source and destination concurrently (once if they are the same account)
+        source_location = (args.source_storage_account, args.source_resource_group)
+        dest_location = (args.dest_storage_account, args.dest_resource_group)
+        with metrics.phase('discover'), ThreadPoolExecutor(max_workers=2) as executor:
+            source_future = executor.submit(discovery.locate_storage_account, *source_location)
+            dest_future = source_future if dest_location == source_location else \
+                executor.submit(discovery.locate_storage_account, *dest_location)
+            source_sub_id, source_rg = source_future.result()
+            dest_sub_id, dest_rg = dest_future.result()
 
         # Create config objects
         source_config = StorageAccountConfig(
@@ -174,9 +418,11 @@ def main():
         source_details = source_storage_mgr.get_storage_account_details(source_rg, args.source_storage_account)
         dest_details = dest_storage_mgr.get_storage_account_details(dest_rg, args.dest_storage_account)
 
-        # Check storage tiers
-        if not check_storage_tiers(source_details, dest_details):
+        # Check storage tiers (--plan reports the result instead of stopping)
+        checks = {'tier': check_storage_tiers(source_details, dest_details)}
+        if not checks['tier'] and not args.plan:
             print("\nOperation cancelled by user.")
+            report_fields['result'] = 'cancelled'
             sys.exit(0)
 
         # Step 4: Get storage account keys
@@ -187,18 +433,41 @@ def main():
 
         # Step 5: Create share service clients
         print("\nStep 5: Initializing file share clients...")
+        # --workers is the ceiling; throttling responses lower the limit and healthy runs raise it again
+        throttle = None if args.no_adaptive else AdaptiveLimiter(max_limit=args.workers)
+
+        def response_hook(pipeline_response):
+            metrics.response_hook(pipeline_response)
+            if throttle:
+                throttle.response_hook(pipeline_response)
+
         source_service_client = source_storage_mgr.create_share_service_client(
-            args.source_storage_account, source_key
+            args.source_storage_account, source_key, raw_response_hook=response_hook
         )
         dest_service_client = dest_storage_mgr.create_share_service_client(
-            args.dest_storage_account, dest_key
+            args.dest_storage_account, dest_key, raw_response_hook=response_hook
         )
         print("  ✓ Clients initialized")
 
         # Step 6: Calculate total size
         print(f"\nStep 6: Calculating total size of source share '{args.source_share}'...")
-        copier = FileShareCopier(source_service_client, dest_service_client)
-        total_size, file_count = copier.calculate_total_size(args.source_share)
+        manifest = CopyManifest(args.manifest) if args.manifest and not args.plan else None
+        copier = FileShareCopier(source_service_client, dest_service_client,
+                                 workers=args.workers, server_side=args.server_side,
+                                 deep_verify=args.deep_verify, manifest=manifest,
+                                 list_workers=args.list_workers,
+                                 chunk_size=args.chunk_size_mb * 1024 * 1024,
+                                 range_workers=args.range_workers,
+                                 metrics=metrics, throttle=throttle,
+                                 file_retries=args.file_retries,
+                                 max_inflight_bytes=args.max_inflight_mb * 1024 * 1024,
+                                 path_filter=args.path_filter)
+        if args.path_filter.active:
+            print(f"  Selecting files: include={args.include or 'all'}, exclude={args.exclude or 'none'}, "
+                  f"shard={args.shard or 'all'}")
+        with metrics.phase('enumerate'):
+            plan = copier.build_file_plan(args.source_share)
+        total_size, file_count = plan.total_size, plan.file_count
         print(f"  Total files: {file_count:,}")
         print(f"  Total size: {total_size:,} bytes ({format_bytes(total_size)})")
 
@@ -210,21 +479,78 @@ def main():
 
         print(f"  Destination share quota: {dest_quota:,} bytes ({format_bytes(dest_quota)})")
 
-        if not check_quota(total_size, dest_quota):
+        checks['quota'] = check_quota(total_size, dest_quota, interactive=not args.plan)
+        if args.plan:
+            passed = run_plan(args, copier, plan, checks, report_fields)
+            report_fields['result'] = 'planned' if passed else 'checks_failed'
+            sys.exit(0 if passed else 1)
+        if not checks['quota']:
             print("\nOperation cancelled.")
+            report_fields['result'] = 'cancelled'
             sys.exit(0)
 
         # Step 8: Copy files
         print_banner("Starting file copy operation...")
 
-        successful, failed = copier.copy_share(
-            args.source_share,
-            args.dest_share,
-            dest_root_dir=args.source_share
-        )
+        if manifest:
+            print(f"Using manifest: {args.manifest}")
+        if args.report_interval > 0:
+            metrics.start_periodic(args.report_interval, args.report, report_fields)
+
+        try:
+            with metrics.phase('copy'):
+                if args.async_copy:
+                    from src.core.async_copier import AsyncFileShareCopier
+
+                    async_copier = AsyncFileShareCopier(
+                        source_service_client.url, source_key,
+                        dest_service_client.url, dest_key,
+                        workers=args.workers,
+                        max_inflight_bytes=args.max_inflight_mb * 1024 * 1024,
+                        chunk_size=args.chunk_size_mb * 1024 * 1024,
+                        deep_verify=args.deep_verify,
+                        manifest=manifest,
+                        metrics=metrics,
+                        throttle=throttle,
+                        file_retries=args.file_retries
+                    )
+                    # plan was listed by copier, so --include/--exclude/--shard already apply
+                    successful, failed = asyncio.run(async_copier.copy_share(
+                        args.source_share,
+                        args.dest_share,
+                        plan,
+                        dest_root_dir=args.source_share
+                    ))
+                elif args.sync:
+                    successful, failed = copier.sync_share(
+                        args.source_share,
+                        args.dest_share,
+                        dest_root_dir=args.source_share,
+                        delete_extraneous=args.delete_extraneous,
+                        compare_md5=args.sync_md5,
+                        plan=plan
+                    )
+                else:
+                    successful, failed = copier.copy_share(
+                        args.source_share,
+                        args.dest_share,
+                        dest_root_dir=args.source_share,
+                        plan=plan
+                    )
+        finally:
+            metrics.stop_periodic()
+            if manifest:
+                manifest.close()
+
+        report_fields['result'] = 'success' if failed == 0 else 'failed'
+        report_fields['successful'] = successful
+        report_fields['failed'] = failed
 
         # Print final summary
         print_banner("Copy Operation Complete")
+        snapshot = metrics.snapshot()
+        print(f"  Throughput: {format_bytes(int(snapshot['bytes_per_second']))}/s, "
+              f"{snapshot['files_per_second']:.2f} files/s, {snapshot['retries_total']} retried requests")
         print(f"  ✓ Successful copies: {successful}")
         if failed > 0:
             print(f"  ✗ Failed copies: {failed}")
@@ -246,6 +572,10 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if args.report:
+            metrics.write_report(args.report, report_fields)
+            print(f"Run report written to {args.report}")
 
 
 if __name__ == "__main__":
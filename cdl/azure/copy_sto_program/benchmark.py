@@ -0,0 +1,465 @@
+"""
+CTS Benchmark
+Measures FileShareCopier throughput on generated datasets.
+
+Datasets:
+    small   many small files in a flat-ish tree
+    large   a few huge files (exercises --chunk-size-mb / --range-workers)
+    deep    a deep directory tree (exercises listing and directory creation)
+
+Backends:
+    memory  in-process simulated file share with per-request latency, per-stream
+            bandwidth and an optional concurrency threshold above which it answers
+            503 ServerBusy. Runs fully offline.
+    azure   any Azure Files endpoint given by connection strings (a scratch storage
+            account). Azurite does not emulate Azure Files, so offline runs use the
+            memory backend.
+
+Example usage:
+
+Compare worker counts on the simulated service:
+    python benchmark.py --datasets small,large,deep --workers 1,8,32
+
+Large files with parallel ranges and a throttling service:
+    python benchmark.py --datasets large --workers 4 --range-workers 1,8 --throttle-above 24
+
+Against a scratch storage account (shares are created and deleted):
+    python benchmark.py --backend azure --source-connection-string "..." --dest-connection-string "..."
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Tuple
+
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceNotFoundError
+
+from src.core.azure_storage import FileShareCopier
+from src.core.metrics import RunMetrics
+from src.core.throttle import AdaptiveLimiter
+from src.core.utils import format_bytes
+
+
+DATASETS = {
+    # name: (description, generator arguments)
+    'small': ('2,000 x 16 KiB files in 20 directories', dict(files=2000, size=16 * 1024, fanout=20, depth=1)),
+    'large': ('4 x 64 MiB files', dict(files=4, size=64 * 1024 * 1024, fanout=1, depth=0)),
+    'deep': ('500 x 64 KiB files in a depth-6 tree', dict(files=500, size=64 * 1024, fanout=3, depth=6)),
+}
+
+
+def generate_dataset(files: int, size: int, fanout: int, depth: int,
+                     scale: float = 1.0) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (relative_path, content) pairs of a synthetic dataset.
+
+    Args:
+        files: Number of files
+        size: Size of each file in bytes
+        fanout: Subdirectories per directory
+        depth: Depth of the directory tree (0 = all files in the root)
+        scale: Multiplier applied to the number of files
+    """
+    directories = [""]
+    level = [""]
+    for _ in range(depth):
+        level = [f"{parent}/d{i}" if parent else f"d{i}" for parent in level for i in range(fanout)]
+        directories.extend(level)
+
+    # One random block, repeated: cheap to generate but still hashed and copied in full
+    block = os.urandom(min(size, 1024 * 1024)) or b''
+    for index in range(max(1, int(files * scale))):
+        directory = directories[index % len(directories)]
+        name = f"f{index:06d}.bin"
+        content = (block * (size // len(block) + 1))[:size] if block else b''
+        yield (f"{directory}/{name}" if directory else name), content
+
+
+class SimulatedService:
+    """Latency, bandwidth and throttling model shared by the simulated shares."""
+
+    def __init__(self, latency_ms: float = 5.0, bandwidth_mbps: float = 400.0,
+                 throttle_above: int = 0, retry_total: int = 3, retry_backoff: float = 0.05):
+        """
+        Initialize the model.
+
+        Args:
+            latency_ms: Fixed latency per request
+            bandwidth_mbps: Per-stream transfer rate in MiB/s (0 = unlimited)
+            throttle_above: Answer 503 ServerBusy when more requests are in flight (0 = never)
+            retry_total: Client-side retries of a throttled request (as the SDK retry policy)
+            retry_backoff: First retry delay in seconds
+        """
+        self.latency = latency_ms / 1000.0
+        self.bytes_per_second = bandwidth_mbps * 1024 * 1024
+        self.throttle_above = throttle_above
+        self.retry_total = retry_total
+        self.retry_backoff = retry_backoff
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def _enter(self) -> bool:
+        """Count a request in flight; True if the service answers it with 503."""
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            busy = bool(self.throttle_above) and self.in_flight > self.throttle_above
+            if busy:
+                self.throttled += 1
+            return busy
+
+    def _leave(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    @contextlib.contextmanager
+    def request(self, payload: int = 0) -> Iterator[None]:
+        """
+        Simulate one request carrying payload bytes.
+
+        Throttled attempts are retried with exponential backoff like the SDK retry
+        policy does; only after retry_total attempts does the 503 reach the caller.
+        """
+        for attempt in range(self.retry_total + 1):
+            busy = self._enter()
+            try:
+                time.sleep(self.latency)
+                if not busy:
+                    if payload and self.bytes_per_second:
+                        time.sleep(payload / self.bytes_per_second)
+                    break
+            finally:
+                self._leave()
+            if attempt < self.retry_total:
+                time.sleep(self.retry_backoff * 2 ** attempt)
+        else:
+            error = HttpResponseError(message="ServerBusy: The server is currently unable to receive requests.")
+            error.status_code = 503
+            error.error_code = 'ServerBusy'
+            raise error
+        yield
+
+
+class _DownloadStream:
+    """Subset of StorageStreamDownloader used by the copier."""
+
+    def __init__(self, data: bytes, content_type: str = None):
+        self._data = data
+        self.properties = SimpleNamespace(content_settings=SimpleNamespace(content_type=content_type))
+
+    def readall(self) -> bytes:
+        return self._data
+
+    def readinto(self, stream) -> int:
+        return stream.write(self._data)
+
+    def chunks(self) -> Iterator[bytes]:
+        for offset in range(0, len(self._data), 4 * 1024 * 1024):
+            yield self._data[offset:offset + 4 * 1024 * 1024]
+
+
+class MemoryShare:
+    """In-memory file share implementing the ShareClient calls FileShareCopier makes."""
+
+    def __init__(self, name: str, service: SimulatedService):
+        self.share_name = name
+        self.service = service
+        self.files: Dict[str, bytearray] = {}
+        self.md5s: Dict[str, bytes] = {}
+        self.modified: Dict[str, datetime] = {}
+        self.directories = {""}
+        self._lock = threading.Lock()
+
+    def add_file(self, path: str, content: bytes) -> None:
+        """Seed a file without simulated cost."""
+        parts = path.split('/')[:-1]
+        for i in range(1, len(parts) + 1):
+            self.directories.add('/'.join(parts[:i]))
+        self.files[path] = bytearray(content)
+        self.modified[path] = datetime.now(timezone.utc)
+
+    def get_directory_client(self, path: str = "") -> '_MemoryDirectory':
+        return _MemoryDirectory(self, path)
+
+    def get_file_client(self, path: str) -> '_MemoryFile':
+        return _MemoryFile(self, path)
+
+
+class _MemoryDirectory:
+
+    def __init__(self, share: MemoryShare, path: str):
+        self.share = share
+        self.path = path
+
+    def list_directories_and_files(self, **kwargs) -> List[dict]:
+        with self.share.service.request():
+            if self.path not in self.share.directories:
+                raise ResourceNotFoundError(message=f"The specified resource does not exist: {self.path}")
+            prefix = f"{self.path}/" if self.path else ""
+            items = []
+            for directory in self.share.directories:
+                if directory and directory.startswith(prefix) and '/' not in directory[len(prefix):]:
+                    items.append({'name': directory[len(prefix):], 'is_directory': True,
+                                  'size': None, 'last_modified': None})
+            for path, content in list(self.share.files.items()):
+                if path.startswith(prefix) and '/' not in path[len(prefix):]:
+                    items.append({'name': path[len(prefix):], 'is_directory': False,
+                                  'size': len(content), 'last_modified': self.share.modified.get(path)})
+            return items
+
+    def create_directory(self) -> None:
+        with self.share.service.request():
+            with self.share._lock:
+                if self.path in self.share.directories:
+                    raise ResourceExistsError(message="The specified resource already exists.")
+                self.share.directories.add(self.path)
+
+
+class _MemoryFile:
+
+    def __init__(self, share: MemoryShare, path: str):
+        self.share = share
+        self.path = path
+        self.share_name = share.share_name
+        self.url = f"memory://{share.share_name}/{path}"
+
+    def _content(self) -> bytearray:
+        try:
+            return self.share.files[self.path]
+        except KeyError:
+            raise ResourceNotFoundError(message=f"The specified resource does not exist: {self.path}")
+
+    def get_file_properties(self):
+        with self.share.service.request():
+            return SimpleNamespace(
+                size=len(self._content()),
+                last_modified=self.share.modified.get(self.path),
+                content_settings=SimpleNamespace(content_md5=self.share.md5s.get(self.path), content_type=None),
+                copy=SimpleNamespace(status='success', progress=None),
+            )
+
+    def download_file(self, offset: int = None, length: int = None, **kwargs) -> _DownloadStream:
+        start = offset or 0
+        content = self._content()
+        end = len(content) if length is None else min(len(content), start + length)
+        with self.share.service.request(end - start):
+            return _DownloadStream(bytes(content[start:end]))
+
+    def create_file(self, size: int, **kwargs) -> None:
+        with self.share.service.request():
+            self.share.files[self.path] = bytearray(size)
+            self.share.modified[self.path] = datetime.now(timezone.utc)
+
+    def upload_range(self, data: bytes, offset: int, length: int, **kwargs) -> None:
+        with self.share.service.request(length):
+            self._content()[offset:offset + length] = data.read() if hasattr(data, 'read') else data
+
+    def set_http_headers(self, content_settings=None, **kwargs) -> None:
+        with self.share.service.request():
+            self.share.md5s[self.path] = bytes(content_settings.content_md5)
+
+    def delete_file(self, **kwargs) -> None:
+        with self.share.service.request():
+            del self.share.files[self.path]
+
+
+class MemoryService:
+    """Stand-in for ShareServiceClient holding MemoryShares by name."""
+
+    def __init__(self, service: SimulatedService):
+        self.service = service
+        self.shares: Dict[str, MemoryShare] = {}
+
+    def get_share_client(self, name: str) -> MemoryShare:
+        if name not in self.shares:
+            self.shares[name] = MemoryShare(name, self.service)
+        return self.shares[name]
+
+
+def prepare_memory(args, dataset: str) -> Tuple[MemoryService, MemoryService]:
+    """Create simulated source/destination services with the dataset in the source share."""
+    service = SimulatedService(args.latency_ms, args.bandwidth_mbps, args.throttle_above)
+    source, dest = MemoryService(service), MemoryService(service)
+    share = source.get_share_client('bench-src')
+    for path, content in generate_dataset(scale=args.scale, **DATASETS[dataset][1]):
+        share.add_file(path, content)
+    return source, dest
+
+
+def prepare_azure(args, dataset: str):
+    """Upload the dataset to a fresh share of the source account (reused across configurations)."""
+    from azure.storage.fileshare import ShareServiceClient
+
+    source = ShareServiceClient.from_connection_string(args.source_connection_string, connection_verify=False)
+    dest = ShareServiceClient.from_connection_string(args.dest_connection_string, connection_verify=False)
+    share = source.get_share_client('bench-src')
+    try:
+        share.create_share()
+    except ResourceExistsError:
+        share.delete_share(delete_snapshots=True)
+        share.create_share()
+
+    print(f"  Uploading dataset '{dataset}'...")
+    created = {""}
+    for path, content in generate_dataset(scale=args.scale, **DATASETS[dataset][1]):
+        parts = path.split('/')[:-1]
+        for i in range(1, len(parts) + 1):
+            directory = '/'.join(parts[:i])
+            if directory not in created:
+                share.get_directory_client(directory).create_directory()
+                created.add(directory)
+        share.get_file_client(path).upload_file(content)
+    return source, dest
+
+
+def reset_destination(args, dest) -> None:
+    """Start every configuration with an empty destination share."""
+    if args.backend == 'memory':
+        dest.shares.pop('bench-dst', None)
+        return
+
+    share = dest.get_share_client('bench-dst')
+    try:
+        share.delete_share(delete_snapshots=True)
+    except ResourceNotFoundError:
+        pass
+    # A deleted share name is unavailable for a short while
+    for _ in range(30):
+        try:
+            share.create_share()
+            return
+        except ResourceExistsError:
+            time.sleep(2)
+    raise RuntimeError("Could not recreate destination share 'bench-dst'")
+
+
+def run_configuration(args, source, dest, workers: int, range_workers: int, chunk_size_mb: int) -> Dict:
+    """Copy the source share once with one copier configuration and return its metrics."""
+    metrics = RunMetrics()
+    throttle = AdaptiveLimiter(max_limit=workers) if args.adaptive else None
+    copier = FileShareCopier(source, dest, workers=workers, range_workers=range_workers,
+                             chunk_size=chunk_size_mb * 1024 * 1024, metrics=metrics,
+                             throttle=throttle, list_workers=args.list_workers)
+
+    quiet = contextlib.ExitStack()
+    if not args.verbose:
+        # per-file prints and tqdm bars (stderr) would drown the table
+        quiet.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        quiet.enter_context(contextlib.redirect_stderr(io.StringIO()))
+    with quiet:
+        with metrics.phase('enumerate'):
+            plan = copier.build_file_plan('bench-src')
+        with metrics.phase('copy'):
+            successful, failed = copier.copy_share('bench-src', 'bench-dst', 'bench-src', plan=plan)
+
+    report = metrics.snapshot()
+    report.update({
+        'workers': workers, 'range_workers': range_workers, 'chunk_size_mb': chunk_size_mb,
+        'successful': successful, 'failed': failed,
+        'final_concurrency_limit': throttle.limit if throttle else workers,
+    })
+    return report
+
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v]
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark FileShareCopier on generated datasets',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--backend', choices=['memory', 'azure'], default='memory',
+                       help='Simulated in-process share (offline) or a real Azure Files endpoint')
+    parser.add_argument('--datasets', default='small,large,deep',
+                       help=f"Comma-separated datasets: {', '.join(DATASETS)} (default: all)")
+    parser.add_argument('--scale', type=float, default=1.0,
+                       help='Multiplier for the number of files in each dataset (default: 1.0)')
+    parser.add_argument('--workers', type=parse_int_list, default=[1, 8],
+                       help='Comma-separated --workers values to compare (default: 1,8)')
+    parser.add_argument('--range-workers', type=parse_int_list, default=[1],
+                       help='Comma-separated --range-workers values to compare (default: 1)')
+    parser.add_argument('--chunk-size-mb', type=parse_int_list, default=[4],
+                       help='Comma-separated range sizes in MiB to compare (default: 4)')
+    parser.add_argument('--list-workers', type=int, default=8,
+                       help='Directories listed concurrently (default: 8)')
+    parser.add_argument('--adaptive', action='store_true', default=False,
+                       help='Run the copier with the adaptive (AIMD) throttle')
+    parser.add_argument('--latency-ms', type=float, default=5.0,
+                       help='Memory backend: latency per request (default: 5)')
+    parser.add_argument('--bandwidth-mbps', type=float, default=400.0,
+                       help='Memory backend: per-stream MiB/s, 0 = unlimited (default: 400)')
+    parser.add_argument('--throttle-above', type=int, default=0,
+                       help='Memory backend: answer 503 ServerBusy above this many requests in flight (default: off)')
+    parser.add_argument('--source-connection-string', default=os.getenv('CTS_BENCH_SOURCE_CONNECTION_STRING'),
+                       help='Azure backend: source account connection string (or CTS_BENCH_SOURCE_CONNECTION_STRING)')
+    parser.add_argument('--dest-connection-string', default=os.getenv('CTS_BENCH_DEST_CONNECTION_STRING'),
+                       help='Azure backend: destination account connection string (or CTS_BENCH_DEST_CONNECTION_STRING)')
+    parser.add_argument('--report', required=False,
+                       help='Write all results as JSON to this file')
+    parser.add_argument('--verbose', action='store_true', default=False,
+                       help='Show the per-file output of the copier')
+
+    args = parser.parse_args()
+    args.datasets = [d for d in args.datasets.split(',') if d]
+    unknown = [d for d in args.datasets if d not in DATASETS]
+    if unknown:
+        parser.error(f"unknown dataset(s): {', '.join(unknown)}")
+    if any(not 1 <= c <= 4 for c in args.chunk_size_mb):
+        parser.error('--chunk-size-mb values must be between 1 and 4')
+    if args.backend == 'azure' and not (args.source_connection_string and args.dest_connection_string):
+        parser.error('--backend azure needs --source-connection-string and --dest-connection-string')
+    return args
+
+
+def main():
+    """Run every dataset x configuration and print a results table."""
+    args = parse_arguments()
+    results = []
+
+    print(f"{'dataset':<8} {'workers':>7} {'ranges':>6} {'chunk':>5} {'files':>7} {'bytes':>11} "
+          f"{'seconds':>8} {'MiB/s':>8} {'files/s':>8} {'retries':>7} {'failed':>6}")
+
+    for dataset in args.datasets:
+        if args.backend == 'memory':
+            source, dest = prepare_memory(args, dataset)
+        else:
+            source, dest = prepare_azure(args, dataset)
+
+        for workers, range_workers, chunk_size_mb in itertools.product(
+                args.workers, args.range_workers, args.chunk_size_mb):
+            reset_destination(args, dest)
+            report = run_configuration(args, source, dest, workers, range_workers, chunk_size_mb)
+            report['dataset'] = dataset
+            if args.backend == 'memory':
+                report['simulated_throttled_requests'] = source.service.throttled
+                source.service.throttled = 0
+            results.append(report)
+
+            copy_seconds = report['phase_seconds'].get('copy', 0.0)
+            retries = report.get('simulated_throttled_requests', report['retries_total'])
+            print(f"{dataset:<8} {workers:>7} {range_workers:>6} {chunk_size_mb:>5} "
+                  f"{report['files_copied']:>7,} {format_bytes(report['bytes_copied']):>11} "
+                  f"{copy_seconds:>8.2f} {report['bytes_per_second'] / (1024 * 1024):>8.1f} "
+                  f"{report['files_per_second']:>8.1f} {retries:>7} {report['failed']:>6}")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'backend': args.backend, 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Storage Account Index Module
+Persists a storage account -> (subscription, resource group) lookup table so
+discovery does not have to scan every subscription on each run.
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+
+@dataclass
+class IndexEntry:
+    """Location of a single storage account."""
+    subscription_id: str
+    resource_group: str
+    display_name: str
+    indexed_at: float
+
+
+class StorageAccountIndex:
+    """JSON-backed storage account location index with a time-to-live."""
+
+    def __init__(self, index_path: Union[str, Path], ttl_hours: float = 24.0):
+        """
+        Open (or create) an index file.
+
+        Args:
+            index_path: Path of the JSON index file
+            ttl_hours: Age after which entries (and the index as a whole) are stale
+        """
+        self.index_path = Path(index_path).expanduser()
+        self.ttl_seconds = ttl_hours * 3600
+        self._lock = threading.Lock()
+        self._entries: Dict[str, IndexEntry] = {}
+        self._refreshed_at = 0.0
+        self._load()
+
+    def _load(self) -> None:
+        """Read the index file; a missing or unreadable file gives an empty index."""
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+            self._refreshed_at = float(data.get('refreshed_at', 0.0))
+            self._entries = {name: IndexEntry(**entry) for name, entry in data.get('accounts', {}).items()}
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError, OSError) as e:
+            print(f"Warning: Ignoring unreadable account index {self.index_path}: {str(e)}")
+            self._entries = {}
+            self._refreshed_at = 0.0
+
+    def save(self) -> None:
+        """Write the index atomically."""
+        with self._lock:
+            data = {
+                'refreshed_at': self._refreshed_at,
+                'accounts': {name: asdict(entry) for name, entry in self._entries.items()},
+            }
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix(self.index_path.suffix + f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.index_path)
+
+    def _is_fresh(self, timestamp: float) -> bool:
+        return time.time() - timestamp < self.ttl_seconds
+
+    def lookup(self, storage_account_name: str) -> Optional[IndexEntry]:
+        """
+        Look up a storage account.
+
+        Args:
+            storage_account_name: Storage account name
+
+        Returns:
+            IndexEntry, or None if the account is not indexed or its entry is stale
+        """
+        with self._lock:
+            entry = self._entries.get(storage_account_name)
+        if entry and self._is_fresh(entry.indexed_at):
+            return entry
+        return None
+
+    def record(self, storage_account_name: str, subscription_id: str,
+               resource_group: str, display_name: str) -> None:
+        """Add or refresh the entry of a storage account (call save() to persist)."""
+        with self._lock:
+            self._entries[storage_account_name] = IndexEntry(
+                subscription_id, resource_group, display_name, time.time()
+            )
+
+    def forget(self, storage_account_name: str) -> None:
+        """Drop the entry of a storage account, e.g. after it turned out to be wrong."""
+        with self._lock:
+            self._entries.pop(storage_account_name, None)
+
+    def mark_refreshed(self, scan_started_at: float) -> None:
+        """
+        Record that every accessible subscription was scanned.
+
+        Args:
+            scan_started_at: time.time() when the full scan started; accounts not
+                recorded since then were deleted or are no longer accessible
+        """
+        with self._lock:
+            self._refreshed_at = time.time()
+            self._entries = {name: entry for name, entry in self._entries.items()
+                             if entry.indexed_at >= scan_started_at}
+
+    def is_stale(self) -> bool:
+        """Check if the last full scan is older than the TTL."""
+        return not self._is_fresh(self._refreshed_at)
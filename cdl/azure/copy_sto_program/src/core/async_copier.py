@@ -0,0 +1,391 @@
+"""
+Async Copy Module
+Asyncio variant of FileShareCopier built on azure.storage.fileshare.aio.
+
+Several files are copied under one event loop. Within a file, range N+1 is
+downloaded while range N is uploaded. A shared byte budget caps how much data
+is held in memory at once. Requires aiohttp (async transport of the Azure SDK).
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from azure.core.exceptions import ResourceExistsError
+from azure.storage.fileshare import ContentSettings
+from azure.storage.fileshare.aio import ShareServiceClient
+
+from src.core.file_plan import FileEntry, FilePlan
+from src.core.manifest import CopyManifest
+from src.core.metrics import RunMetrics
+from src.core.throttle import AdaptiveLimiter, is_transient_error
+
+
+# Seconds between checks for a free slot of the adaptive limiter
+SLOT_POLL_INTERVAL = 0.05
+
+
+class ByteBudget:
+    """Async semaphore counted in bytes, bounding the data in flight."""
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize the budget.
+
+        Args:
+            max_bytes: Maximum number of bytes that may be held at once
+        """
+        self.max_bytes = max_bytes
+        self.in_use = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, size: int) -> None:
+        """Wait until size bytes fit in the budget and reserve them."""
+        # A single range larger than the whole budget is allowed when nothing else is in flight
+        size = min(size, self.max_bytes)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_use + size <= self.max_bytes)
+            self.in_use += size
+
+    async def release(self, size: int) -> None:
+        """Return size bytes to the budget."""
+        size = min(size, self.max_bytes)
+        async with self._condition:
+            self.in_use -= size
+            self._condition.notify_all()
+
+
+class AsyncFileShareCopier:
+    """Copies a FilePlan between shares with asyncio."""
+
+    def __init__(self, source_account_url: str, source_key: str,
+                 dest_account_url: str, dest_key: str,
+                 workers: int = 8, max_inflight_bytes: int = 256 * 1024 * 1024,
+                 chunk_size: int = 4 * 1024 * 1024, deep_verify: bool = False,
+                 manifest: Optional[CopyManifest] = None, metrics: Optional[RunMetrics] = None,
+                 throttle: Optional[AdaptiveLimiter] = None, file_retries: int = 2):
+        """
+        Initialize async copier.
+
+        Args:
+            source_account_url: Source file endpoint (https://<account>.file.<suffix>)
+            source_key: Source storage account key
+            dest_account_url: Destination file endpoint
+            dest_key: Destination storage account key
+            workers: Number of files copied concurrently
+            max_inflight_bytes: Upper bound on downloaded-but-not-yet-uploaded bytes
+            chunk_size: Range size in bytes (at most 4 MiB per upload_range call)
+            deep_verify: Re-download every copied file to verify its MD5
+            manifest: Optional CopyManifest used to skip files verified by a previous run
+            metrics: Optional RunMetrics receiving per-file timings and sizes
+            throttle: Optional AdaptiveLimiter; files take a slot from it, throttled
+                      ranges are retried with backoff and failed files are re-queued
+            file_retries: Number of times files failed by throttling or transient errors
+                          are re-queued when throttle is set
+        """
+        self.source_account_url = source_account_url
+        self.source_key = source_key
+        self.dest_account_url = dest_account_url
+        self.dest_key = dest_key
+        self.workers = max(1, workers)
+        self.max_inflight_bytes = max_inflight_bytes
+        self.chunk_size = chunk_size
+        self.deep_verify = deep_verify
+        self.manifest = manifest
+        self.metrics = metrics
+        self.throttle = throttle
+        self.file_retries = file_retries
+        # source path -> exception of the last failed attempt, to decide what is re-queued
+        self._last_errors: Dict[str, Exception] = {}
+
+    async def _download_range(self, source_file_client, offset: int, length: int,
+                              budget: ByteBudget) -> Tuple[bytes, Optional[str]]:
+        """Reserve budget and download one range; returns (data, content_type)."""
+        async def download():
+            stream = await source_file_client.download_file(offset=offset, length=length,
+                                                            validate_content=True)
+            return await stream.readall(), stream.properties.content_settings.content_type
+
+        await budget.acquire(length)
+        try:
+            return await self._call(download)
+        except BaseException:
+            await budget.release(length)
+            raise
+
+    async def copy_file(self, source_file_client, dest_file_client, entry: FileEntry,
+                        budget: ByteBudget) -> bool:
+        """
+        Copy and verify a single file, overlapping the download of the next range
+        with the upload of the current one.
+        Returns True if copy was successful and verified.
+        """
+        file_path = entry.path
+        started = time.time()
+        verify_started = None
+        skipped = verified = False
+        self._last_errors.pop(file_path, None)
+        try:
+            if self.manifest and self.manifest.is_verified(file_path, entry.size, str(entry.last_modified)):
+                print(f"Skipping (already verified): {file_path}")
+                if self.metrics:
+                    self.metrics.record_skipped()
+                skipped = True
+                return True
+
+            print(f"Copying: {file_path} ({entry.size:,} bytes)")
+            await dest_file_client.create_file(size=entry.size)
+
+            source_md5 = hashlib.md5()
+            content_type = None
+            ranges = [(offset, min(self.chunk_size, entry.size - offset))
+                      for offset in range(0, entry.size, self.chunk_size)]
+
+            # Download of the next range, started before the current one is uploaded
+            next_download = None
+            if ranges:
+                next_download = asyncio.ensure_future(
+                    self._download_range(source_file_client, *ranges[0], budget))
+
+            try:
+                for index, (offset, length) in enumerate(ranges):
+                    data, content_type = await next_download
+                    next_download = None
+                    if index + 1 < len(ranges):
+                        next_download = asyncio.ensure_future(
+                            self._download_range(source_file_client, *ranges[index + 1], budget))
+                    try:
+                        source_md5.update(data)
+                        await self._call(dest_file_client.upload_range, data, offset=offset,
+                                         length=length, validate_content=True)
+                    finally:
+                        await budget.release(length)
+            finally:
+                if next_download is not None:
+                    # Copy failed midway: drop the prefetched range and give its bytes back
+                    next_download.cancel()
+                    try:
+                        await next_download
+                        await budget.release(ranges[index + 1][1])
+                    except BaseException:
+                        pass
+
+            verify_started = time.time()
+            verified = await self._verify(dest_file_client, entry.size, content_type, source_md5)
+
+            if self.manifest:
+                if verified:
+                    self.manifest.mark_verified(file_path, entry.size, str(entry.last_modified),
+                                                source_md5.hexdigest())
+                else:
+                    self.manifest.remove(file_path)
+            return verified
+
+        except Exception as e:
+            print(f"✗ Error copying file {file_path}: {str(e)}")
+            self._last_errors[file_path] = e
+            return False
+        finally:
+            if self.metrics and not skipped:
+                finished = time.time()
+                if verify_started is not None:
+                    self.metrics.add_time('transfer', verify_started - started)
+                    self.metrics.add_time('verify', finished - verify_started)
+                self.metrics.record_file(file_path, entry.size, finished - started, verified)
+
+    async def _call(self, func, *args, **kwargs):
+        """Await one request; a throttled request is retried on its own when throttle is set."""
+        if self.throttle:
+            return await self.throttle.call_async(func, *args, **kwargs)
+        return await func(*args, **kwargs)
+
+    async def _copy_with_slot(self, copy):
+        """
+        Run a file copy under a slot of the adaptive limiter and count its success.
+        The limiter waits on a threading condition, so free slots are polled instead
+        of blocking the event loop.
+        """
+        while not self.throttle.try_acquire():
+            await asyncio.sleep(SLOT_POLL_INTERVAL)
+        try:
+            copied = await copy()
+        finally:
+            self.throttle.release()
+        if copied:
+            self.throttle.on_success()
+        return copied
+
+    async def _verify(self, dest_file_client, file_size: int, content_type: Optional[str],
+                      source_md5) -> bool:
+        """Verify a copied file (stored Content-MD5, or full read-back with deep_verify)."""
+        if self.deep_verify:
+            dest_md5 = hashlib.md5()
+            stream = await dest_file_client.download_file()
+            async for chunk in stream.chunks():
+                dest_md5.update(chunk)
+            verified = dest_md5.digest() == source_md5.digest()
+        else:
+            await dest_file_client.set_http_headers(content_settings=ContentSettings(
+                content_type=content_type,
+                content_md5=bytearray(source_md5.digest())
+            ))
+            dest_props = await dest_file_client.get_file_properties()
+            dest_md5 = dest_props.content_settings.content_md5
+            verified = dest_props.size == file_size and bool(dest_md5) and \
+                bytes(dest_md5) == source_md5.digest()
+
+        if verified:
+            print(f"  Verified: MD5={source_md5.hexdigest()}")
+        else:
+            print(f"  VERIFICATION FAILED! Source MD5: {source_md5.hexdigest()}")
+        return verified
+
+    async def _create_directory(self, dest_share, directory: str) -> bool:
+        """Create one destination directory, tolerating an existing one."""
+        try:
+            await dest_share.get_directory_client(directory).create_directory()
+            print(f"Created directory: {directory}")
+        except ResourceExistsError:
+            print(f"Directory already exists: {directory}")
+        except Exception as e:
+            if getattr(e, 'status_code', None) != 409:
+                print(f"Warning: Error creating directory {directory}: {str(e)}")
+                return False
+            print(f"Directory already exists: {directory}")
+        return True
+
+    async def create_directories(self, dest_share, directories: Iterable[str],
+                                 known: Iterable[str] = ()) -> Set[str]:
+        """
+        Create destination directories level by level, each level concurrently.
+
+        Args:
+            dest_share: Destination ShareClient (aio)
+            directories: Destination directory paths (relative)
+            known: Directories already known to exist (skipped without a request)
+
+        Returns:
+            Directories that do not exist afterwards
+        """
+        existing = set(known)
+        levels: Dict[int, List[str]] = {}
+        for directory in set(directories) - existing:
+            levels.setdefault(directory.count('/'), []).append(directory)
+
+        slots = asyncio.Semaphore(self.workers)
+
+        async def create(directory: str) -> bool:
+            async with slots:
+                return await self._create_directory(dest_share, directory)
+
+        failed: Set[str] = set()
+        for depth in sorted(levels):
+            pending = [d for d in sorted(levels[depth])
+                       if ('/' not in d or d.rsplit('/', 1)[0] not in failed)]
+            failed.update(d for d in levels[depth] if d not in pending)
+            results = await asyncio.gather(*(create(d) for d in pending))
+            failed.update(d for d, ok in zip(pending, results) if not ok)
+        return failed
+
+    async def copy_share(self, source_share_name: str, dest_share_name: str, plan: FilePlan,
+                         dest_root_dir: str = None) -> Tuple[int, int]:
+        """
+        Copy every file of a FilePlan from the source share to the destination share.
+
+        Args:
+            source_share_name: Source share name
+            dest_share_name: Destination share name
+            plan: FilePlan of the source share (from FileShareCopier.build_file_plan, so
+                  already narrowed by the copier's include/exclude/shard filter)
+            dest_root_dir: Optional root directory in destination
+
+        Returns:
+            Tuple of (successful_count, failed_count); files below destination
+            directories that could not be created count as failures
+        """
+        budget = ByteBudget(self.max_inflight_bytes)
+        file_slots = asyncio.Semaphore(self.workers)
+        dest_root = dest_root_dir or ""
+
+        def dest_path(path: str) -> str:
+            return "/".join(p for p in (dest_root, path) if p)
+
+        hooks = [owner.response_hook for owner in (self.metrics, self.throttle) if owner]
+
+        def response_hook(pipeline_response):
+            for hook in hooks:
+                hook(pipeline_response)
+
+        client_options = {'raw_response_hook': response_hook} if hooks else {}
+
+        async with ShareServiceClient(self.source_account_url, credential=self.source_key,
+                                      connection_verify=False, **client_options) as source_service, \
+                ShareServiceClient(self.dest_account_url, credential=self.dest_key,
+                                   connection_verify=False, **client_options) as dest_service:
+            source_share = source_service.get_share_client(source_share_name)
+            dest_share = dest_service.get_share_client(dest_share_name)
+
+            if dest_root:
+                await self._create_directory(dest_share, dest_root)
+            known = [dest_path(d) for d in self.manifest.written_directories()] if self.manifest else []
+            missing = await self.create_directories(dest_share, (dest_path(d) for d in plan.directories), known)
+
+            entries = []
+            unreachable = 0
+            for entry in plan.files.values():
+                target = dest_path(entry.path)
+                if '/' in target and target.rsplit('/', 1)[0] in missing:
+                    print(f"✗ Skipping {entry.path}: destination directory could not be created")
+                    unreachable += 1
+                    continue
+                entries.append(entry)
+
+            async def copy_one(entry: FileEntry) -> bool:
+                async with file_slots:
+                    def copy():
+                        return self.copy_file(
+                            source_share.get_file_client(entry.path),
+                            dest_share.get_file_client(dest_path(entry.path)),
+                            entry, budget
+                        )
+                    return await (self._copy_with_slot(copy) if self.throttle else copy())
+
+            results = await asyncio.gather(*(copy_one(entry) for entry in entries))
+            successful = sum(1 for result in results if result)
+            retried, failed = await self._requeue_failed(
+                copy_one, [entry for entry, ok in zip(entries, results) if not ok])
+
+        return successful + retried, failed + unreachable + len(plan.errors)
+
+    async def _requeue_failed(self, copy_one, failed: List[FileEntry]) -> Tuple[int, int]:
+        """
+        Retry failed files after a jittered backoff, up to file_retries rounds.
+        Only used with a throttle, and only for files whose last attempt failed with
+        a throttling or transient error.
+
+        Returns:
+            Tuple of (successful_count, failed_count) for the failed files
+        """
+        successful = 0
+        permanent = 0
+        rounds = self.file_retries if self.throttle else 0
+
+        for attempt in range(rounds):
+            retryable = [entry for entry in failed if is_transient_error(self._last_errors.get(entry.path))]
+            permanent += len(failed) - len(retryable)
+            failed = retryable
+            if not failed:
+                break
+            delay = self.throttle.backoff_delay(attempt)
+            print(f"Re-queueing {len(failed)} failed file(s) in {delay:.1f}s "
+                  f"(concurrency limit {self.throttle.limit})...")
+            if self.metrics:
+                for _ in failed:
+                    self.metrics.record_retry('requeued_file')
+            await asyncio.sleep(delay)
+            results = await asyncio.gather(*(copy_one(entry) for entry in failed))
+            successful += sum(1 for result in results if result)
+            failed = [entry for entry, ok in zip(failed, results) if not ok]
+
+        return successful, permanent + len(failed)
@@ -3,32 +3,222 @@ Azure Discovery Module
 Handles discovery of subscriptions and resource groups for storage accounts.
 """
 
-from typing import Optional, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Optional, Tuple
 from azure.identity import ClientSecretCredential
 from azure.mgmt.resource import SubscriptionClient
 from azure.mgmt.storage import StorageManagementClient
-from azure.core.exceptions import HttpResponseError
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+
+from src.core.account_index import IndexEntry, StorageAccountIndex
+from src.core.client_pool import shared_pool
+from src.core.resource_graph import ResourceGraphQuery
 
 
 class AzureDiscovery:
     """Handles discovery of Azure resources."""
 
-    def __init__(self, credential: ClientSecretCredential, environment: str = 'global'):
+    def __init__(self, credential: ClientSecretCredential, environment: str = 'global',
+                 index: Optional[StorageAccountIndex] = None, use_resource_graph: bool = True,
+                 subscription_workers: int = 8):
         """
         Initialize the discovery service.
 
         Args:
             credential: Azure credential object
             environment: 'global' or 'china'
+            index: Optional storage account location index checked before scanning
+            use_resource_graph: Locate accounts with one Resource Graph query before
+                falling back to the per-subscription scan
+            subscription_workers: Number of subscriptions scanned concurrently by the fallback
         """
         self.credential = credential
         self.environment = environment
         self.base_url = 'https://management.chinacloudapi.cn' if environment == 'china' else None
+        self.index = index
+        self.use_resource_graph = use_resource_graph
+        self.subscription_workers = max(1, subscription_workers)
+        self._refresh_thread = None
+        self._resource_graph = None
+
+    def _query_storage_accounts(self, names=None) -> Optional[list]:
+        """
+        Locate storage accounts with Resource Graph.
+
+        Returns:
+            List of rows (name, subscriptionId, resourceGroup, subscriptionName), or None
+            if Resource Graph is disabled, not installed or the query failed
+        """
+        if not self.use_resource_graph:
+            return None
+
+        try:
+            if self._resource_graph is None:
+                self._resource_graph = ResourceGraphQuery(self.credential, self.base_url)
+            return self._resource_graph.find_storage_accounts(names)
+        except ImportError:
+            self.use_resource_graph = False
+            return None
+        except Exception as e:
+            print(f"    Resource Graph query failed, falling back to subscription scan: {str(e)}")
+            return None
+
+    def _find_with_resource_graph(self, storage_account_name: str) -> Optional[Tuple[str, str, str]]:
+        """Look up a single account with Resource Graph; returns (subscription_id, resource_group, display_name)."""
+        rows = self._query_storage_accounts([storage_account_name])
+        for row in rows or []:
+            if row['name'].lower() == storage_account_name.lower():
+                display_name = row.get('subscriptionName') or row['subscriptionId']
+                if self.index:
+                    self.index.record(storage_account_name, row['subscriptionId'],
+                                      row['resourceGroup'], display_name)
+                    self.index.save()
+                return row['subscriptionId'], row['resourceGroup'], display_name
+        return None
+
+    def _subscription_client(self) -> SubscriptionClient:
+        """Get the pooled subscription client for the configured cloud."""
+        return shared_pool.get(SubscriptionClient, self.credential, environment=self.environment)
+
+    def _storage_client(self, subscription_id: str) -> StorageManagementClient:
+        """Get the pooled storage management client of a subscription."""
+        return shared_pool.get(StorageManagementClient, self.credential, subscription_id, self.environment)
+
+    def _search_subscriptions(self, check: Callable[[Any, threading.Event], Any]) -> Optional[Tuple[Any, Any]]:
+        """
+        Run check(subscription, stop) for every accessible subscription on a bounded
+        thread pool and return the first non-None result. Once a result is found, queued
+        checks are cancelled and running ones see stop set.
+
+        Args:
+            check: Callable returning a result or None; 403/404 errors count as None
+
+        Returns:
+            Tuple of (subscription, result) or None if no check found anything
+        """
+        subscriptions = list(self._subscription_client().subscriptions.list())
+        stop = threading.Event()
+
+        def run(sub):
+            if stop.is_set():
+                return None
+            print('.', end='', flush=True)
+            try:
+                return check(sub, stop)
+            except HttpResponseError as e:
+                if e.status_code not in [404, 403]:
+                    print(f"    Error checking subscription {sub.subscription_id}: {e.message}")
+            except Exception as e:
+                print(f"    Unexpected error in subscription {sub.subscription_id}: {str(e)}")
+            return None
+
+        executor = ThreadPoolExecutor(max_workers=self.subscription_workers)
+        try:
+            futures = {executor.submit(run, sub): sub for sub in subscriptions}
+            for future in as_completed(futures):
+                result = future.result()
+                if result is not None:
+                    return futures[future], result
+            return None
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def build_index(self) -> int:
+        """
+        Record all storage accounts of every accessible subscription in the index.
+        Uses one Resource Graph query when available; the subscription scan fallback
+        saves the index after each subscription, so an interrupted scan keeps its progress.
+
+        Returns:
+            Number of storage accounts indexed
+        """
+        scan_started_at = time.time()
+        indexed = 0
+
+        rows = self._query_storage_accounts()
+        if rows is not None:
+            for row in rows:
+                self.index.record(row['name'], row['subscriptionId'], row['resourceGroup'],
+                                  row.get('subscriptionName') or row['subscriptionId'])
+            self.index.mark_refreshed(scan_started_at)
+            self.index.save()
+            return len(rows)
+
+        for sub in self._subscription_client().subscriptions.list():
+            try:
+                for account in self._storage_client(sub.subscription_id).storage_accounts.list():
+                    self.index.record(account.name, sub.subscription_id,
+                                      account.id.split('/')[4], sub.display_name)
+                    indexed += 1
+            except Exception:
+                # Subscriptions without storage access are skipped, as in the interactive scan
+                continue
+            self.index.save()
+
+        self.index.mark_refreshed(scan_started_at)
+        self.index.save()
+        return indexed
+
+    def refresh_index_in_background(self) -> None:
+        """Rebuild the index on a daemon thread if its last full scan is older than the TTL."""
+        if not self.index or not self.index.is_stale():
+            return
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+
+        def refresh():
+            try:
+                self.build_index()
+            except Exception as e:
+                print(f"\nWarning: Background refresh of storage account index failed: {str(e)}")
+
+        self._refresh_thread = threading.Thread(target=refresh, daemon=True)
+        self._refresh_thread.start()
+
+    def _lookup_index(self, storage_account_name: str,
+                      resource_group: Optional[str] = None) -> Optional[IndexEntry]:
+        """
+        Look up a storage account in the index and check it is still at the indexed location.
+
+        An entry whose account is no longer found there (moved, deleted or in a subscription
+        that is not accessible anymore) is forgotten, so the caller discovers it again.
+
+        Args:
+            storage_account_name: Storage account name
+            resource_group: Optional resource group the account must be in
+
+        Returns:
+            IndexEntry, or None if the account is not indexed or its entry was wrong
+        """
+        if not self.index:
+            return None
+        entry = self.index.lookup(storage_account_name)
+        self.refresh_index_in_background()
+        if not entry or (resource_group and entry.resource_group.lower() != resource_group.lower()):
+            return None
+
+        try:
+            self._storage_client(entry.subscription_id).storage_accounts.get_properties(
+                entry.resource_group, storage_account_name
+            )
+        except HttpResponseError as e:
+            if not isinstance(e, ResourceNotFoundError) and e.status_code not in [404, 403]:
+                # Not a wrong location; the lookups after discovery report it
+                return entry
+            print(f"    Indexed location of '{storage_account_name}' ({entry.display_name}, "
+                  f"{entry.resource_group}) is out of date, discovering it again")
+            self.index.forget(storage_account_name)
+            self.index.save()
+            return None
+        return entry
 
     def find_storage_account_location(self, storage_account_name: str) -> Optional[Tuple[str, str, str]]:
         """
         Find subscription ID and resource group for a storage account.
-        Searches across all accessible subscriptions.
+        Checks the index, then Resource Graph, then searches across all accessible subscriptions.
 
         Args:
             storage_account_name: Name of the storage account to find
@@ -38,53 +228,54 @@ class AzureDiscovery:
         """
         print(f"\nDiscovering location for storage account '{storage_account_name}'...")
 
+        entry = self._lookup_index(storage_account_name)
+        if entry:
+            print(f"    Found storage account '{storage_account_name}' in index")
+            print(f"    Subscription: {entry.display_name} ({entry.subscription_id})")
+            print(f"    Resource Group: {entry.resource_group}")
+            return entry.subscription_id, entry.resource_group, entry.display_name
+
+        result = self._find_with_resource_graph(storage_account_name)
+        if result:
+            subscription_id, resource_group, display_name = result
+            print(f"    Found storage account '{storage_account_name}' with Resource Graph")
+            print(f"    Subscription: {display_name} ({subscription_id})")
+            print(f"    Resource Group: {resource_group}")
+            return result
+
+        def check(sub, stop: threading.Event) -> Optional[str]:
+            # List all storage accounts in this subscription
+            storage_accounts = self._storage_client(sub.subscription_id).storage_accounts.list()
+
+            found = None
+            for account in storage_accounts:
+                # Extract resource group from account ID
+                # Format: /subscriptions/{sub}/resourceGroups/{rg}/providers/Microsoft.Storage/storageAccounts/{name}
+                id_parts = account.id.split('/')
+                resource_group = id_parts[4]
+
+                # Every account listed on the way is indexed for later runs
+                if self.index:
+                    self.index.record(account.name, sub.subscription_id, resource_group, sub.display_name)
+
+                if account.name == storage_account_name:
+                    found = resource_group
+                if (found and not self.index) or stop.is_set():
+                    break
+
+            if self.index:
+                self.index.save()
+            return found
+
         try:
-            # Create subscription client
-            if self.base_url:
-                sub_client = SubscriptionClient(self.credential, base_url=self.base_url)
-            else:
-                sub_client = SubscriptionClient(self.credential)
-
-            # Iterate through all subscriptions
-            subscriptions = sub_client.subscriptions.list()
-
-            for sub in subscriptions:
-                subscription_id = sub.subscription_id
-                # print(f"  Checking subscription: {sub.display_name} ({subscription_id})...")
-                print('.', end='', flush=True)
-
-                try:
-                    # Create storage client for this subscription
-                    if self.base_url:
-                        storage_client = StorageManagementClient(
-                            self.credential, subscription_id, base_url=self.base_url
-                        )
-                    else:
-                        storage_client = StorageManagementClient(self.credential, subscription_id)
-
-                    # List all storage accounts in this subscription
-                    storage_accounts = storage_client.storage_accounts.list()
-
-                    for account in storage_accounts:
-                        if account.name == storage_account_name:
-                            # Extract resource group from account ID
-                            # Format: /subscriptions/{sub}/resourceGroups/{rg}/providers/Microsoft.Storage/storageAccounts/{name}
-                            id_parts = account.id.split('/')
-                            resource_group = id_parts[4]
-
-                            print(f"    Found storage account '{storage_account_name}'")
-                            print(f"    Subscription: {sub.display_name} ({subscription_id})")
-                            print(f"    Resource Group: {resource_group}")
-
-                            return subscription_id, resource_group, sub.display_name
-
-                except HttpResponseError as e:
-                    if e.status_code not in [404, 403]:
-                        print(f"    Error checking subscription {subscription_id}: {e.message}")
-                    continue
-                except Exception as e:
-                    print(f"    Unexpected error in subscription {subscription_id}: {str(e)}")
-                    continue
+            result = self._search_subscriptions(check)
+            if result:
+                sub, resource_group = result
+                print(f"    Found storage account '{storage_account_name}'")
+                print(f"    Subscription: {sub.display_name} ({sub.subscription_id})")
+                print(f"    Resource Group: {resource_group}")
+
+                return sub.subscription_id, resource_group, sub.display_name
 
             print(f"\n  Storage account '{storage_account_name}' not found in any accessible subscription.")
             return None
@@ -108,48 +299,33 @@ class AzureDiscovery:
         print(f"\nDiscovering subscription ID for storage account '{storage_account_name}' "
               f"in resource group '{resource_group}'...")
 
+        entry = self._lookup_index(storage_account_name, resource_group)
+        if entry:
+            print(f"    Found in index: {entry.display_name} ({entry.subscription_id})")
+            return entry.subscription_id
+
+        result = self._find_with_resource_graph(storage_account_name)
+        if result and result[1].lower() == resource_group.lower():
+            print(f"    Found with Resource Graph: {result[2]} ({result[0]})")
+            return result[0]
+
+        def check(sub, stop: threading.Event) -> Optional[str]:
+            # Try to get the storage account
+            account = self._storage_client(sub.subscription_id).storage_accounts.get_properties(
+                resource_group, storage_account_name
+            )
+            return sub.subscription_id if account else None
+
         try:
-            # Create subscription client
-            if self.base_url:
-                sub_client = SubscriptionClient(self.credential, base_url=self.base_url)
-            else:
-                sub_client = SubscriptionClient(self.credential)
-
-            # Iterate through all subscriptions
-            subscriptions = sub_client.subscriptions.list()
-
-            for sub in subscriptions:
-                subscription_id = sub.subscription_id
-                # print(f"  Checking subscription: {sub.display_name} ({subscription_id})...")
-                print(".", end='.', flush=True)
-
-                try:
-                    # Create storage client for this subscription
-                    if self.base_url:
-                        storage_client = StorageManagementClient(
-                            self.credential, subscription_id, base_url=self.base_url
-                        )
-                    else:
-                        storage_client = StorageManagementClient(self.credential, subscription_id)
-
-                    # Try to get the storage account
-                    account = storage_client.storage_accounts.get_properties(
-                        resource_group, storage_account_name
-                    )
-
-                    if account:
-                        print(f"    \nFound in subscription: {sub.display_name} ({subscription_id})")
-                        return subscription_id
-
-                except HttpResponseError as e:
-                    if e.status_code in [404, 403]:
-                        continue
-                    else:
-                        print(f"    \nError checking subscription {subscription_id}: {e.message}")
-                        continue
-                except Exception as e:
-                    print(f"    Unexpected error in subscription {subscription_id}: {str(e)}")
-                    continue
+            result = self._search_subscriptions(check)
+            if result:
+                sub, subscription_id = result
+                print(f"    \nFound in subscription: {sub.display_name} ({subscription_id})")
+                if self.index:
+                    self.index.record(storage_account_name, subscription_id,
+                                      resource_group, sub.display_name)
+                    self.index.save()
+                return subscription_id
 
             print(f"\n  Storage account '{storage_account_name}' not found in resource group "
                   f"'{resource_group}' in any accessible subscription.")
@@ -159,3 +335,42 @@ class AzureDiscovery:
             print(f"\nError listing subscriptions: {str(e)}")
             return None
 
+    def locate_storage_account(self, storage_account_name: str,
+                               resource_group: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Discover subscription and resource group of a storage account. Only the
+        subscription is searched when the resource group is already known.
+
+        Args:
+            storage_account_name: Storage account name
+            resource_group: Optional resource group name
+
+        Returns:
+            Tuple of (subscription_id, resource_group)
+
+        Raises:
+            Exception: If the storage account cannot be found
+        """
+        if resource_group:
+            # Resource group provided, just find subscription
+            print(f"\nResource group provided: {resource_group}")
+            subscription_id = self.find_subscription_for_storage_account(
+                resource_group, storage_account_name
+            )
+
+            if not subscription_id:
+                raise Exception(
+                    f"Could not find storage account '{storage_account_name}' "
+                    f"in resource group '{resource_group}'"
+                )
+
+            return subscription_id, resource_group
+
+        # Discover both subscription and resource group
+        result = self.find_storage_account_location(storage_account_name)
+
+        if not result:
+            raise Exception(f"Could not find storage account '{storage_account_name}'")
+
+        subscription_id, resource_group, _ = result
+        return subscription_id, resource_group
@@ -4,14 +4,34 @@ Handles Azure storage account operations and file share copying.
 """
 
 import hashlib
-from typing import Tuple, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Tuple, Dict, Iterable, List, Optional, Set
 from azure.identity import ClientSecretCredential
 from azure.mgmt.storage import StorageManagementClient
-from azure.storage.fileshare import ShareFileClient, ShareDirectoryClient, ShareServiceClient
-from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from azure.storage.fileshare import (
+    ShareFileClient, ShareServiceClient,
+    ShareSasPermissions, ContentSettings, generate_share_sas
+)
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceNotFoundError
 from tqdm import tqdm
 import time
 
+from src.core.buffer_pool import BufferPool, BufferReader, BufferWriter
+from src.core.client_pool import shared_pool
+from src.core.manifest import CopyManifest
+from src.core.path_filter import PathFilter
+from src.core.metrics import RunMetrics
+from src.core.file_plan import FileEntry, FilePlan
+from src.core.share_lister import ShareLister
+from src.core.sync import diff_file_sets
+from src.core.throttle import AdaptiveLimiter, is_transient_error
+
+
+# Defaults of streamed copies: range size (the service maximum) and range data in memory
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_MAX_INFLIGHT_BYTES = 256 * 1024 * 1024
 
 class AzureStorageManager:
     """Manages Azure storage account operations."""
@@ -32,13 +52,8 @@ class AzureStorageManager:
         self.base_url = 'https://management.chinacloudapi.cn' if environment == 'china' else None
         self.storage_suffix = 'core.chinacloudapi.cn' if environment == 'china' else 'core.windows.net'
 
-        # Create storage management client
-        if self.base_url:
-            self.storage_client = StorageManagementClient(
-                credential, subscription_id, base_url=self.base_url
-            )
-        else:
-            self.storage_client = StorageManagementClient(credential, subscription_id)
+        # Storage management client, shared with other managers of the same subscription
+        self.storage_client = shared_pool.get(StorageManagementClient, credential, subscription_id, environment)
 
     def get_storage_account_details(self, resource_group: str, account_name: str) -> Dict[str, str]:
         """
@@ -77,13 +92,15 @@ class AzureStorageManager:
         keys = self.storage_client.storage_accounts.list_keys(resource_group, account_name)
         return keys.keys[0].value
 
-    def create_share_service_client(self, account_name: str, account_key: str) -> ShareServiceClient:
+    def create_share_service_client(self, account_name: str, account_key: str,
+                                    **kwargs) -> ShareServiceClient:
         """
         Create ShareServiceClient for file operations.
 
         Args:
             account_name: Storage account name
             account_key: Storage account key
+            **kwargs: Extra client options (e.g. raw_response_hook)
 
         Returns:
             ShareServiceClient object
@@ -91,7 +108,8 @@ class AzureStorageManager:
         return ShareServiceClient(
             account_url=f"https://{account_name}.file.{self.storage_suffix}",
             credential=account_key,
-            connection_verify=False
+            connection_verify=False,
+            **kwargs
         )
 
 
@@ -99,16 +117,68 @@ class FileShareCopier:
     """Handles file share copying operations."""
 
     def __init__(self, source_service_client: ShareServiceClient,
-                 dest_service_client: ShareServiceClient):
+                 dest_service_client: ShareServiceClient,
+                 workers: int = 1, server_side: bool = False,
+                 sas_expiry_hours: int = 24, copy_poll_interval: float = 2.0,
+                 deep_verify: bool = False, manifest: Optional[CopyManifest] = None,
+                 list_workers: int = 8, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 range_workers: int = 1, metrics: Optional[RunMetrics] = None,
+                 throttle: Optional[AdaptiveLimiter] = None, file_retries: int = 2,
+                 max_inflight_bytes: int = DEFAULT_MAX_INFLIGHT_BYTES,
+                 path_filter: Optional[PathFilter] = None,
+                 buffer_pool: Optional[BufferPool] = None):
         """
         Initialize file share copier.
 
         Args:
             source_service_client: Source ShareServiceClient
             dest_service_client: Destination ShareServiceClient
+            workers: Number of files copied concurrently (1 = sequential)
+            server_side: Copy with start_copy_from_url instead of streaming through this host
+            sas_expiry_hours: Lifetime of the read-only source SAS used for server-side copies
+            copy_poll_interval: Seconds between copy status checks in server-side mode
+            deep_verify: Re-download every copied file to verify its MD5 instead of
+                         checking the service-validated ranges and stored Content-MD5
+            manifest: Optional CopyManifest used to skip verified files and resume
+                      partially copied ones
+            list_workers: Number of directories listed (or created) concurrently
+            chunk_size: Range size in bytes for streamed copies (at most 4 MiB)
+            range_workers: Number of ranges of one file transferred concurrently
+            metrics: Optional RunMetrics receiving per-file timings and sizes
+            throttle: Optional AdaptiveLimiter; files take a slot from it, throttled
+                      ranges are retried with backoff and failed files are re-queued
+            file_retries: Number of times failed files are re-queued when throttle is set;
+                          only files that failed with a throttling or transient error are
+                          re-queued
+            max_inflight_bytes: Upper bound on the range buffers of all streamed copies;
+                                workers wait for a free buffer beyond it
+            path_filter: Optional PathFilter (include/exclude patterns, shard); listings
+                         only contain the files it selects
+            buffer_pool: Optional BufferPool shared with other copiers (e.g. the jobs of a
+                         batch), so max_inflight_bytes caps all of them together; replaces
+                         the copier's own pool of max_inflight_bytes
         """
         self.source_service_client = source_service_client
         self.dest_service_client = dest_service_client
+        self.workers = max(1, workers)
+        self.server_side = server_side
+        self.sas_expiry_hours = sas_expiry_hours
+        self.copy_poll_interval = copy_poll_interval
+        self.deep_verify = deep_verify
+        self.manifest = manifest
+        self.list_workers = list_workers
+        self.chunk_size = chunk_size
+        self.range_workers = max(1, range_workers)
+        self.metrics = metrics
+        self.throttle = throttle
+        self.file_retries = file_retries
+        self.buffer_pool = buffer_pool or BufferPool(chunk_size, max_inflight_bytes)
+        self.path_filter = path_filter
+        self._source_sas_tokens = {}
+        self._known_directories: Dict[str, Set[str]] = {}
+        self._directories_lock = threading.Lock()
+        # source path -> exception of the last failed attempt, to decide what is re-queued
+        self._last_errors: Dict[str, Exception] = {}
         self.successful_count = 0
         self.failed_count = 0
 
@@ -122,171 +192,738 @@ class FileShareCopier:
         Returns:
             Tuple of (total_size_bytes, file_count)
         """
-        total_size = 0
-        file_count = 0
+        plan = self.build_file_plan(share_name)
+        return plan.total_size, plan.file_count
 
-        share_client = self.source_service_client.get_share_client(share_name)
-
-        def traverse_directory(directory_client: ShareDirectoryClient, path: str = ""):
-            nonlocal total_size, file_count
-
-            try:
-                items = directory_client.list_directories_and_files()
-                for item in items:
-                    item_path = f"{path}/{item['name']}" if path else item['name']
-
-                    if item['is_directory']:
-                        subdir_client = share_client.get_directory_client(item_path)
-                        traverse_directory(subdir_client, item_path)
-                    else:
-                        file_client = share_client.get_file_client(item_path)
-                        properties = file_client.get_file_properties()
-                        total_size += properties.size
-                        file_count += 1
-            except Exception as e:
-                print(f"Error traversing directory {path}: {str(e)}")
+    def build_file_plan(self, share_name: str) -> FilePlan:
+        """
+        List a source share once. The resulting plan feeds the size/quota checks
+        and the copy itself, so no file is listed or queried twice.
 
-        root_dir_client = share_client.get_directory_client("")
-        traverse_directory(root_dir_client)
+        Args:
+            share_name: Source file share name
 
-        return total_size, file_count
+        Returns:
+            FilePlan with every file (size, last-modified) and directory of the share
+        """
+        share_client = self.source_service_client.get_share_client(share_name)
+        return self.list_files(share_client)
 
     def copy_file_with_verification(self, source_file_client: ShareFileClient,
                                     dest_file_client: ShareFileClient,
                                     file_path: str,
-                                    chunk_size: int = 4 * 1024 * 1024) -> bool:
+                                    chunk_size: Optional[int] = None,
+                                    source_entry: Optional[FileEntry] = None) -> bool:
         """
         Copy a single file and verify with MD5 checksum.
-        Handles large files by chunking.
+        Handles large files by chunking (chunk_size defaults to the copier's setting);
+        with range_workers > 1 several ranges of the file are transferred at once.
+        When source_entry (from a FilePlan) is given, the source properties request is skipped.
         Returns True if copy was successful and verified.
         """
+        started = time.time()
+        verify_started = None
+        file_size = source_entry.size if source_entry else 0
+        skipped = verified = False
         try:
-            source_props = source_file_client.get_file_properties()
-            file_size = source_props.size
-
-            print(f"Copying: {file_path} ({file_size:,} bytes)")
+            if source_entry is None:
+                source_props = source_file_client.get_file_properties()
+                source_entry = FileEntry(file_path, source_props.size, source_props.last_modified)
+            file_size = source_entry.size
+            content_type = None
 
-            # Create the file with the correct size first
-            dest_file_client.create_file(size=file_size)
+            if self._already_verified(file_path, source_entry):
+                skipped = True
+                return True
 
-            # Download and upload in chunks, and calculate MD5 on the fly
+            # Download and upload in chunks, and calculate MD5 on the fly.
+            # validate_content makes the service check a per-range MD5 on both legs.
             source_md5 = hashlib.md5()
-            offset = 0
-
-            download_stream = source_file_client.download_file()
-            bytes_remaining = file_size
+            offset = self._resume_offset(file_path, source_entry, dest_file_client)
 
-            # Initialize progress bar
-            with tqdm(total=file_size, unit='B', unit_scale=True, desc=f"Copying {file_path}") as pbar:
-                for chunk in download_stream.chunks():
+            if offset:
+                print(f"Resuming: {file_path} ({file_size:,} bytes) from offset {offset:,}")
+                # Rebuild the running MD5 from the part that is already at the destination
+                for chunk in source_file_client.download_file(offset=0, length=offset,
+                                                              validate_content=True).chunks():
                     source_md5.update(chunk)
-                    dest_file_client.upload_range(chunk, offset=offset, length=len(chunk))
-                    offset += len(chunk)
-                    pbar.update(len(chunk))
+            else:
+                print(f"Copying: {file_path} ({file_size:,} bytes)")
+
+                # Create the file with the correct size first
+                dest_file_client.create_file(size=file_size)
+                if self.manifest:
+                    self.manifest.start_file(file_path, file_size, str(source_entry.last_modified))
+
+            # Initialize progress bar (per-file bars would interleave in parallel mode)
+            with tqdm(total=file_size, initial=offset, unit='B', unit_scale=True,
+                      desc=f"Copying {file_path}", disable=self.workers > 1) as pbar:
+                offset, content_type = self._copy_ranges(
+                    source_file_client, dest_file_client, file_path, offset, file_size,
+                    chunk_size or self.chunk_size, source_md5, pbar
+                )
 
             source_md5_hex = source_md5.hexdigest()
 
             # close progress bar explicitly after file copy
             pbar.close()
 
-            print("Starting MD5 verification...")
-            start_time = time.time()
+            verify_started = time.time()
+            if self.deep_verify:
+                verified = self._verify_by_download(dest_file_client, source_md5_hex)
+            else:
+                verified = self._verify_by_properties(file_size, content_type, dest_file_client,
+                                                      source_md5.digest(), offset)
+
+            self._record_result(file_path, source_entry, verified, source_md5_hex)
+            return verified
+
+        except Exception as e:
+            print(f"✗ Error copying file {file_path}: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            self._last_errors[file_path] = e
+            return False
+        finally:
+            if not skipped:
+                self._record_metrics(file_path, file_size, verified, started, verify_started)
+
+    def _copy_ranges(self, source_file_client: ShareFileClient, dest_file_client: ShareFileClient,
+                     file_path: str, offset: int, file_size: int, chunk_size: int,
+                     source_md5, pbar) -> Tuple[int, Optional[str]]:
+        """
+        Transfer [offset, file_size) in ranges of chunk_size bytes.
+
+        With range_workers > 1 ranges are downloaded and uploaded concurrently. The MD5
+        is still fed strictly in file order: completed ranges wait for their
+        predecessors, and at most 2 * range_workers ranges are in flight. The manifest
+        checkpoint only advances over the contiguous prefix that has been written.
+
+        Each range in flight holds one buffer of the shared buffer pool, so the data
+        held by all workers together never exceeds max_inflight_bytes.
+
+        Returns:
+            Tuple of (end offset reached, source content type)
+        """
+        ranges = [(range_offset, min(chunk_size, file_size - range_offset))
+                  for range_offset in range(offset, file_size, chunk_size)]
+        content_type = None
+        pool = self.buffer_pool if chunk_size <= self.buffer_pool.buffer_size else \
+            BufferPool(chunk_size, chunk_size * 2 * self.range_workers)
+
+        def transfer_once(buffer: bytearray, range_offset: int, length: int):
+            # The range is read into a pooled buffer and uploaded from it without copies
+            stream = source_file_client.download_file(offset=range_offset, length=length,
+                                                      validate_content=True)
+            writer = BufferWriter(buffer)
+            stream.readinto(writer)
+            data = memoryview(buffer)[:writer.position]
+            dest_file_client.upload_range(BufferReader(data), offset=range_offset, length=len(data),
+                                          validate_content=True)
+            return data, stream.properties.content_settings.content_type
+
+        def transfer(buffer: bytearray, range_offset: int, length: int):
+            # A throttled range is retried on its own instead of failing the whole file
+            if self.throttle:
+                return self.throttle.call(transfer_once, buffer, range_offset, length)
+            return transfer_once(buffer, range_offset, length)
+
+        def complete(data: memoryview) -> None:
+            nonlocal offset
+            source_md5.update(data)
+            offset += len(data)
+            pbar.update(len(data))
+            if self.manifest:
+                self.manifest.update_progress(file_path, offset)
+
+        if self.range_workers == 1 or len(ranges) < 2:
+            with pool.buffer() as buffer:
+                for range_offset, length in ranges:
+                    data, content_type = transfer(buffer, range_offset, length)
+                    complete(data)
+            return offset, content_type
+
+        # window: index -> (buffer, future). A new buffer is only waited for while this
+        # file holds none; otherwise the oldest range is completed first to free one,
+        # so files sharing the pool cannot deadlock each other.
+        window = {}
+        next_index = 0
+        with ThreadPoolExecutor(max_workers=self.range_workers) as executor:
+            try:
+                for index in range(len(ranges)):
+                    while next_index < len(ranges) and next_index < index + 2 * self.range_workers:
+                        buffer = pool.acquire(blocking=not window)
+                        if buffer is None:
+                            break
+                        window[next_index] = (buffer, executor.submit(transfer, buffer, *ranges[next_index]))
+                        next_index += 1
+
+                    buffer, future = window.pop(index)
+                    try:
+                        data, content_type = future.result()
+                        complete(data)
+                    finally:
+                        pool.release(buffer)
+            except Exception:
+                for buffer, future in window.values():
+                    future.cancel()
+                for buffer, future in window.values():
+                    if not future.cancelled():
+                        try:
+                            future.result()
+                        except Exception:
+                            pass
+                    pool.release(buffer)
+                raise
+
+        return offset, content_type
+
+    def _already_verified(self, file_path: str, source) -> bool:
+        """
+        Check the manifest for a file that was verified by a previous run and is unchanged.
+
+        Args:
+            file_path: Relative source path
+            source: Source file properties or FileEntry
+
+        Returns:
+            True if the file can be skipped
+        """
+        if self.manifest and self.manifest.is_verified(file_path, source.size,
+                                                       str(source.last_modified)):
+            print(f"Skipping (already verified): {file_path}")
+            if self.metrics:
+                self.metrics.record_skipped()
+            return True
+        return False
+
+    def _resume_offset(self, file_path: str, source, dest_file_client: ShareFileClient) -> int:
+        """
+        Get the offset a partially copied file can be resumed from.
+
+        A file is only resumed if the source is unchanged since the manifest entry
+        was written and the destination file still exists with the full size.
+
+        Returns:
+            Number of bytes already at the destination (0 to copy from scratch)
+        """
+        if not self.manifest:
+            return 0
+
+        entry = self.manifest.get(file_path)
+        if not entry or not entry.bytes_copied or \
+                not entry.matches(source.size, str(source.last_modified)):
+            return 0
+
+        try:
+            if dest_file_client.get_file_properties().size != source.size:
+                return 0
+        except ResourceNotFoundError:
+            return 0
+
+        return entry.bytes_copied
+
+    def _record_metrics(self, file_path: str, size: int, verified: bool,
+                        started: float, verify_started: Optional[float]) -> None:
+        """Report a finished (or failed) file to the run metrics, if collected."""
+        if not self.metrics:
+            return
+
+        finished = time.time()
+        if verify_started is not None:
+            self.metrics.add_time('transfer', verify_started - started)
+            self.metrics.add_time('verify', finished - verify_started)
+        self.metrics.record_file(file_path, size, finished - started, verified)
+
+    def _record_result(self, file_path: str, source, verified: bool,
+                       md5_hex: str = None) -> None:
+        """Record a finished copy in the manifest (if one is used)."""
+        if not self.manifest:
+            return
+
+        if verified:
+            self.manifest.mark_verified(file_path, source.size,
+                                        str(source.last_modified), md5_hex)
+        else:
+            # Do not resume from data that failed verification
+            self.manifest.remove(file_path)
+
+    def _verify_by_download(self, dest_file_client: ShareFileClient, source_md5_hex: str) -> bool:
+        """
+        Verify destination file by downloading it in full and recomputing the MD5.
+
+        Args:
+            dest_file_client: Destination file client
+            source_md5_hex: MD5 hex digest computed while copying
+
+        Returns:
+            True if the hashes match
+        """
+        print("Starting MD5 verification...")
+        start_time = time.time()
+
+        # verify destination file by downloading in chunks and calculating MD5
+        dest_md5 = hashlib.md5()
+        dest_download_stream = dest_file_client.download_file()
+
+        for chunk in dest_download_stream.chunks():
+            dest_md5.update(chunk)
+
+        dest_md5_hex = dest_md5.hexdigest()
+        verification_time = time.time() - start_time
+        print(f"MD5 verification completed in {verification_time:.2f} seconds.")
+
+        if source_md5_hex == dest_md5_hex:
+            print(f"  Verified: MD5={source_md5_hex}")
+            return True
+        else:
+            print(f"  VERIFICATION FAILED!")
+            print(f"  Source MD5: {source_md5_hex}")
+            print(f"  Dest MD5:   {dest_md5_hex}")
+            return False
+
+    def _verify_by_properties(self, file_size: int, content_type: Optional[str],
+                              dest_file_client: ShareFileClient,
+                              source_md5: bytes, bytes_copied: int) -> bool:
+        """
+        Verify destination file without reading it back.
+
+        Every range was already MD5-checked by the service on upload, so it is enough
+        to confirm that the whole file was written, store the source MD5 as the
+        destination Content-MD5 and read it back from the file properties.
+
+        Args:
+            file_size: Source file size
+            content_type: Source content type to keep on the destination
+            dest_file_client: Destination file client
+            source_md5: MD5 digest computed while copying
+            bytes_copied: Number of bytes uploaded
+
+        Returns:
+            True if size and stored Content-MD5 match
+        """
+        if bytes_copied != file_size:
+            print(f"  VERIFICATION FAILED!")
+            print(f"  Source size:  {file_size:,}")
+            print(f"  Bytes copied: {bytes_copied:,}")
+            return False
+
+        dest_file_client.set_http_headers(content_settings=ContentSettings(
+            content_type=content_type,
+            content_md5=bytearray(source_md5)
+        ))
+        dest_props = dest_file_client.get_file_properties()
+        dest_md5 = dest_props.content_settings.content_md5
+
+        if dest_props.size == file_size and dest_md5 and bytes(dest_md5) == source_md5:
+            print(f"  Verified: MD5={source_md5.hex()}")
+            return True
+        else:
+            print(f"  VERIFICATION FAILED!")
+            print(f"  Source MD5: {source_md5.hex()}")
+            print(f"  Dest MD5:   {bytes(dest_md5).hex() if dest_md5 else None}")
+            return False
 
-            # verify destination file by downloading in chunks and calculating MD5
-            dest_md5 = hashlib.md5()
-            dest_download_stream = dest_file_client.download_file()
+    def get_source_sas(self, share_name: str) -> str:
+        """
+        Get a read-only SAS token for a source share (generated once per share).
 
-            for chunk in dest_download_stream.chunks():
-                dest_md5.update(chunk)
+        Args:
+            share_name: Source file share name
 
-            dest_md5_hex = dest_md5.hexdigest()
-            verification_time = time.time() - start_time
-            print(f"MD5 verification completed in {verification_time:.2f} seconds.")
+        Returns:
+            SAS token string (without leading '?')
+        """
+        if share_name not in self._source_sas_tokens:
+            credential = self.source_service_client.credential
+            self._source_sas_tokens[share_name] = generate_share_sas(
+                account_name=credential.account_name,
+                share_name=share_name,
+                account_key=credential.account_key,
+                permission=ShareSasPermissions(read=True),
+                expiry=datetime.now(timezone.utc) + timedelta(hours=self.sas_expiry_hours)
+            )
+        return self._source_sas_tokens[share_name]
+
+    def server_side_copy_file(self, source_file_client: ShareFileClient,
+                              dest_file_client: ShareFileClient,
+                              file_path: str) -> bool:
+        """
+        Copy a single file inside Azure with start_copy_from_url and poll until done.
+        Data never passes through this host. Verification compares size and, when the
+        source has one, the stored Content-MD5 (copied along with the file properties).
+        Returns True if copy was successful and verified.
+        """
+        started = time.time()
+        verify_started = None
+        file_size = 0
+        skipped = verified = False
+        try:
+            source_props = source_file_client.get_file_properties()
+            file_size = source_props.size
 
-            if source_md5_hex == dest_md5_hex:
-                print(f"  Verified: MD5={source_md5_hex}")
+            if self._already_verified(file_path, source_props):
+                skipped = True
                 return True
-            else:
+
+            print(f"Server-side copying: {file_path} ({file_size:,} bytes)")
+
+            source_url = f"{source_file_client.url}?{self.get_source_sas(source_file_client.share_name)}"
+            copy = dest_file_client.start_copy_from_url(source_url)
+            copy_status = copy.get('copy_status')
+
+            while copy_status == 'pending':
+                time.sleep(self.copy_poll_interval)
+                dest_props = dest_file_client.get_file_properties()
+                copy_status = dest_props.copy.status
+                if dest_props.copy.progress:
+                    print(f"  {file_path}: {dest_props.copy.progress} bytes")
+
+            if copy_status != 'success':
+                print(f"  COPY FAILED! Status: {copy_status}")
+                return False
+
+            verify_started = time.time()
+            if self.deep_verify:
+                source_md5 = hashlib.md5()
+                for chunk in source_file_client.download_file().chunks():
+                    source_md5.update(chunk)
+                verified = self._verify_by_download(dest_file_client, source_md5.hexdigest())
+                self._record_result(file_path, source_props, verified, source_md5.hexdigest())
+                return verified
+
+            dest_props = dest_file_client.get_file_properties()
+            if dest_props.size != file_size:
                 print(f"  VERIFICATION FAILED!")
-                print(f"  Source MD5: {source_md5_hex}")
-                print(f"  Dest MD5:   {dest_md5_hex}")
+                print(f"  Source size: {file_size:,}")
+                print(f"  Dest size:   {dest_props.size:,}")
                 return False
 
+            source_md5 = source_props.content_settings.content_md5
+            if source_md5 and source_md5 != dest_props.content_settings.content_md5:
+                print(f"  VERIFICATION FAILED! Content-MD5 mismatch")
+                return False
+
+            print(f"  Verified: size={file_size:,}" + (f", MD5={bytes(source_md5).hex()}" if source_md5 else ""))
+            self._record_result(file_path, source_props, True,
+                                bytes(source_md5).hex() if source_md5 else None)
+            verified = True
+            return True
+
         except Exception as e:
             print(f"✗ Error copying file {file_path}: {str(e)}")
             import traceback
             traceback.print_exc()
+            self._last_errors[file_path] = e
             return False
+        finally:
+            if not skipped:
+                self._record_metrics(file_path, file_size, verified, started, verify_started)
 
-    def copy_files_recursive(self, source_share_client, dest_share_client,
-                            source_path: str = "", dest_path: str = "") -> Tuple[int, int]:
+    def _known_destination_directories(self, dest_share_client) -> Set[str]:
+        """Destination directories known to exist (created or seen during this run)."""
+        share_name = getattr(dest_share_client, 'share_name', None) or str(id(dest_share_client))
+        with self._directories_lock:
+            return self._known_directories.setdefault(share_name, {""})
+
+    def _create_destination_directory(self, dest_share_client, dest_item_path: str) -> bool:
         """
-        Recursively copy all files from source to destination.
+        Create a directory in the destination share, tolerating existing ones.
+        Directories already known to exist are skipped without a request.
 
         Args:
-            source_share_client: Source share client
             dest_share_client: Destination share client
-            source_path: Source path (relative)
-            dest_path: Destination path (relative)
+            dest_item_path: Directory path (relative)
 
         Returns:
-            Tuple of (successful_count, failed_count)
+            True if the directory exists afterwards
+        """
+        known = self._known_destination_directories(dest_share_client)
+        if dest_item_path in known:
+            return True
+
+        try:
+            dest_share_client.get_directory_client(dest_item_path).create_directory()
+            print(f"Created directory: {dest_item_path}")
+        except ResourceExistsError:
+            print(f"Directory already exists: {dest_item_path}")
+        except HttpResponseError as e:
+            if e.status_code != 409:
+                print(f"Warning: Error creating directory {dest_item_path}: {str(e)}")
+                return False
+            print(f"Directory already exists: {dest_item_path}")
+        except Exception as e:
+            print(f"Warning: Error creating directory {dest_item_path}: {str(e)}")
+            return False
+
+        with self._directories_lock:
+            known.add(dest_item_path)
+        return True
+
+    def create_directories(self, dest_share_client, directories: Iterable[str],
+                           known: Optional[Iterable[str]] = None) -> Set[str]:
+        """
+        Create a set of destination directories, one tree level at a time.
+
+        All directories of a level are created concurrently (list_workers at once) once
+        their parents exist. Directories in known, or created earlier in this run, are
+        skipped without a request; children of a directory that could not be created
+        are not attempted.
+
+        Args:
+            dest_share_client: Destination share client
+            directories: Destination directory paths (relative)
+            known: Directories already known to exist (e.g. from a destination listing
+                   or a manifest of an earlier run)
+
+        Returns:
+            Directories that do not exist afterwards
+        """
+        existing = self._known_destination_directories(dest_share_client)
+        with self._directories_lock:
+            existing.update(known or ())
+
+        levels: Dict[int, List[str]] = {}
+        for directory in set(directories):
+            if directory not in existing:
+                levels.setdefault(directory.count('/'), []).append(directory)
+        if not levels:
+            return set()
+
+        print(f"Creating {sum(len(level) for level in levels.values()):,} destination directories "
+              f"in {len(levels)} level(s)...")
+
+        failed: Set[str] = set()
+        with ThreadPoolExecutor(max_workers=max(1, self.list_workers)) as executor:
+            for depth in sorted(levels):
+                pending = []
+                for directory in sorted(levels[depth]):
+                    parent = directory.rsplit('/', 1)[0] if '/' in directory else ""
+                    if parent in failed:
+                        failed.add(directory)
+                    else:
+                        pending.append(directory)
+
+                created = executor.map(
+                    lambda d: self._create_destination_directory(dest_share_client, d), pending
+                )
+                failed.update(d for d, ok in zip(pending, created) if not ok)
+
+        return failed
+
+    def copy_file(self, source_share_client, dest_share_client,
+                  source_item_path: str, dest_item_path: str,
+                  source_entry: Optional[FileEntry] = None) -> bool:
+        """
+        Copy a single file between shares by relative path, with the configured mode
+        and under a slot of the throttle if one is set.
+
+        Returns:
+            True if copy was successful and verified
+        """
+        source_file_client = source_share_client.get_file_client(source_item_path)
+        dest_file_client = dest_share_client.get_file_client(dest_item_path)
+        self._last_errors.pop(source_item_path, None)
+
+        if not self.throttle:
+            return self._copy_file_client(source_file_client, dest_file_client, source_item_path, source_entry)
+
+        with self.throttle.slot():
+            copied = self._copy_file_client(source_file_client, dest_file_client, source_item_path, source_entry)
+        # Successes count once per file (throttled ranges are retried without counting)
+        if copied:
+            self.throttle.on_success()
+        return copied
+
+    def _copy_file_client(self, source_file_client: ShareFileClient, dest_file_client: ShareFileClient,
+                          file_path: str, source_entry: Optional[FileEntry] = None) -> bool:
+        """Copy a single file with the configured mode (server-side or streamed)."""
+        if self.server_side:
+            return self.server_side_copy_file(source_file_client, dest_file_client, file_path)
+        return self.copy_file_with_verification(source_file_client, dest_file_client, file_path,
+                                                source_entry=source_entry)
+
+    def _requeue_failed(self, source_share_client, dest_share_client,
+                        failed_jobs: List[Tuple[str, str, Optional[FileEntry]]]) -> Tuple[int, int]:
+        """
+        Retry failed files after a jittered backoff, up to file_retries rounds.
+        Only used with a throttle; a manifest lets retried files resume where they stopped.
+        Only files whose last attempt failed with a throttling or transient error are
+        re-queued; a failed verification, a missing source or a 403 fail right away.
+
+        Returns:
+            Tuple of (successful_count, failed_count) for the failed files
         """
         successful = 0
-        failed = 0
+        permanent = 0
+        rounds = self.file_retries if self.throttle else 0
 
-        # Get directory clients
-        if source_path:
-            source_dir_client = source_share_client.get_directory_client(source_path)
-        else:
-            source_dir_client = source_share_client.get_directory_client("")
+        for attempt in range(rounds):
+            retryable = [job for job in failed_jobs if is_transient_error(self._last_errors.get(job[0]))]
+            permanent += len(failed_jobs) - len(retryable)
+            failed_jobs = retryable
+            if not failed_jobs:
+                break
+            delay = self.throttle.backoff_delay(attempt)
+            print(f"Re-queueing {len(failed_jobs)} failed file(s) in {delay:.1f}s "
+                  f"(concurrency limit {self.throttle.limit})...")
+            if self.metrics:
+                for _ in failed_jobs:
+                    self.metrics.record_retry('requeued_file')
+            time.sleep(delay)
+            retried, failed_jobs = self._run_jobs_once(source_share_client, dest_share_client, failed_jobs)
+            successful += retried
 
-        try:
-            items = source_dir_client.list_directories_and_files()
+        return successful, permanent + len(failed_jobs)
 
-            for item in items:
-                item_name = item['name']
-                source_item_path = f"{source_path}/{item_name}" if source_path else item_name
-                dest_item_path = f"{dest_path}/{item_name}" if dest_path else item_name
+    def copy_plan(self, source_share_client, dest_share_client, plan: FilePlan,
+                  source_root: str = "", dest_root: str = "") -> Tuple[int, int]:
+        """
+        Copy every file of a FilePlan, creating the destination directories first.
 
-                if item['is_directory']:
-                    # Create directory in destination
-                    try:
-                        dest_dir_client = dest_share_client.get_directory_client(dest_item_path)
-                        dest_dir_client.create_directory()
-                        print(f"Created directory: {dest_item_path}")
-                    except (HttpResponseError, ResourceNotFoundError, Exception) as e:
-                        if 'ResourceAlreadyExists' in str(e) or 'already exists' in str(e).lower() or (hasattr(e, 'status_code') and e.status_code == 409):
-                            print(f"Directory already exists: {dest_item_path}")
-                        else:
-                            print(f"Warning: Error creating directory {dest_item_path}: {str(e)}")
-
-                    # Recursively copy subdirectory
-                    sub_success, sub_failed = self.copy_files_recursive(
-                        source_share_client, dest_share_client,
-                        source_item_path, dest_item_path
-                    )
-                    successful += sub_success
-                    failed += sub_failed
+        Args:
+            source_share_client: Source share client
+            dest_share_client: Destination share client
+            plan: Plan listed below source_root
+            source_root: Source directory the plan was listed from (relative)
+            dest_root: Destination directory to copy into (relative)
+
+        Returns:
+            Tuple of (successful_count, failed_count); directories that could not be
+            listed count as failures
+        """
+        known = None
+        if self.manifest:
+            known = [_join_path(dest_root, d[len(source_root):].lstrip('/'))
+                     for d in self.manifest.written_directories()
+                     if not source_root or d == source_root or d.startswith(source_root + '/')]
+        missing = self.create_directories(
+            dest_share_client, (_join_path(dest_root, d) for d in plan.directories), known
+        )
+
+        jobs = []
+        unreachable = 0
+        for path, entry in plan.files.items():
+            dest_path = _join_path(dest_root, path)
+            if '/' in dest_path and dest_path.rsplit('/', 1)[0] in missing:
+                print(f"✗ Skipping {path}: destination directory could not be created")
+                unreachable += 1
+                continue
+            jobs.append((_join_path(source_root, path), dest_path, entry))
+        successful, failed = self.run_file_jobs(source_share_client, dest_share_client, jobs)
+        failed += unreachable
+
+        return successful, failed + len(plan.errors)
+
+    def run_file_jobs(self, source_share_client, dest_share_client,
+                      jobs: List[Tuple[str, str, Optional[FileEntry]]]) -> Tuple[int, int]:
+        """
+        Copy a list of files, using the worker pool if configured.
+
+        Args:
+            source_share_client: Source share client
+            dest_share_client: Destination share client
+            jobs: Files to copy as (source_path, dest_path, source_entry) tuples
+
+        Returns:
+            Tuple of (successful_count, failed_count)
+        """
+        successful, failed_jobs = self._run_jobs_once(source_share_client, dest_share_client, jobs)
+        retried, failed = self._requeue_failed(source_share_client, dest_share_client, failed_jobs)
+        return successful + retried, failed
+
+    def _run_jobs_once(self, source_share_client, dest_share_client,
+                       jobs: List[Tuple[str, str, Optional[FileEntry]]]
+                       ) -> Tuple[int, List[Tuple[str, str, Optional[FileEntry]]]]:
+        """
+        Copy a list of files once.
+
+        Returns:
+            Tuple of (successful_count, failed jobs)
+        """
+        successful = 0
+        failed_jobs = []
+
+        if self.workers == 1:
+            for job in jobs:
+                if self.copy_file(source_share_client, dest_share_client, *job):
+                    successful += 1
                 else:
-                    # Copy file
-                    source_file_client = source_share_client.get_file_client(source_item_path)
-                    dest_file_client = dest_share_client.get_file_client(dest_item_path)
+                    failed_jobs.append(job)
+            return successful, failed_jobs
 
-                    if self.copy_file_with_verification(source_file_client, dest_file_client, source_item_path):
+        total_bytes = sum(entry.size for _, _, entry in jobs if entry)
+        print(f"Copying {len(jobs):,} files ({total_bytes:,} bytes) with {self.workers} workers...")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self.copy_file, source_share_client, dest_share_client, *job): job
+                for job in jobs
+            }
+
+            with tqdm(total=total_bytes, unit='B', unit_scale=True, desc="Total") as pbar:
+                for future in as_completed(futures):
+                    job = futures[future]
+                    if future.result():
                         successful += 1
                     else:
-                        failed += 1
+                        failed_jobs.append(job)
+                    if job[2]:
+                        pbar.update(job[2].size)
 
-        except Exception as e:
-            print(f"Error processing directory {source_path}: {str(e)}")
-            if 'ResourceAlreadyExists' not in str(e) and 'already exists' not in str(e).lower():
-                failed += 1
+        return successful, failed_jobs
 
-        return successful, failed
+    def list_files(self, share_client, root: str = "") -> FilePlan:
+        """
+        List all files and directories below a directory.
+        Directories are listed concurrently (breadth-first) and sizes and timestamps
+        come from the listing itself (no per-file requests).
+
+        Args:
+            share_client: Share client
+            root: Directory to list (relative); returned paths are relative to it
+
+        Returns:
+            FilePlan (empty if root does not exist), restricted to the files selected
+            by path_filter. Subdirectories that could not be listed are recorded in
+            plan.errors.
+
+        path_filter always sees the returned relative paths: source shares are listed
+        from their root, and a destination root directory mirrors the source share
+        root, so copy, sync and extraneous-file detection select the same files.
+        """
+        plan = ShareLister(share_client, root, self.list_workers).to_plan()
+        return self.path_filter.apply(plan) if self.path_filter else plan
+
+    def _load_content_md5(self, share_client, root: str, entries: List[FileEntry]) -> None:
+        """Fill in the stored Content-MD5 of the given entries (one request per file)."""
+        for entry in entries:
+            file_path = _join_path(root, entry.path)
+            try:
+                props = share_client.get_file_client(file_path).get_file_properties()
+                entry.content_md5 = props.content_settings.content_md5
+            except Exception as e:
+                print(f"Warning: Could not read properties of {file_path}: {str(e)}")
+
+    def _create_root_directory(self, dest_share_client, dest_root_dir: str) -> None:
+        """Create the destination root directory, tolerating an existing one."""
+        dest_root_dir_client = dest_share_client.get_directory_client(dest_root_dir)
+        try:
+            dest_root_dir_client.create_directory()
+            print(f"Created root directory in destination: {dest_root_dir}")
+        except ResourceExistsError:
+            pass
+        except (ResourceNotFoundError, Exception) as e:
+            if 'ResourceAlreadyExists' not in str(e):
+                print(f"Error creating root directory in destination: {str(e)}")
+                raise
+
+        known = self._known_destination_directories(dest_share_client)
+        with self._directories_lock:
+            known.add(dest_root_dir)
 
     def copy_share(self, source_share_name: str, dest_share_name: str,
-                   dest_root_dir: str = None) -> Tuple[int, int]:
+                   dest_root_dir: str = None, plan: Optional[FilePlan] = None) -> Tuple[int, int]:
         """
         Copy entire file share from source to destination.
 
@@ -294,6 +931,7 @@ class FileShareCopier:
             source_share_name: Source share name
             dest_share_name: Destination share name
             dest_root_dir: Optional root directory in destination
+            plan: FilePlan from build_file_plan (listed here if not given)
 
         Returns:
             Tuple of (successful_count, failed_count)
@@ -301,18 +939,101 @@ class FileShareCopier:
         source_share_client = self.source_service_client.get_share_client(source_share_name)
         dest_share_client = self.dest_service_client.get_share_client(dest_share_name)
 
+        if plan is None:
+            plan = self.list_files(source_share_client)
+
         # Create destination root directory if specified
         if dest_root_dir:
-            dest_root_dir_client = dest_share_client.get_directory_client(dest_root_dir)
-            try:
-                dest_root_dir_client.create_directory()
-                print(f"Created root directory in destination: {dest_root_dir}")
-            except (ResourceNotFoundError, Exception) as e:
-                if 'ResourceAlreadyExists' not in str(e):
-                    print(f"Error creating root directory in destination: {str(e)}")
-                    raise
-
-        return self.copy_files_recursive(
-            source_share_client, dest_share_client,
-            source_path="", dest_path=dest_root_dir or ""
-        )
+            self._create_root_directory(dest_share_client, dest_root_dir)
+
+        return self.copy_plan(source_share_client, dest_share_client, plan,
+                              dest_root=dest_root_dir or "")
+
+    def sync_share(self, source_share_name: str, dest_share_name: str,
+                   dest_root_dir: str = None, delete_extraneous: bool = False,
+                   compare_md5: bool = False, plan: Optional[FilePlan] = None) -> Tuple[int, int]:
+        """
+        Incrementally sync a file share: copy only new or changed files.
+
+        Source and destination are each listed once; files are compared by size and
+        last-modified time (see sync.needs_copy).
+
+        Args:
+            source_share_name: Source share name
+            dest_share_name: Destination share name
+            dest_root_dir: Optional root directory in destination
+            delete_extraneous: Delete destination files that no longer exist in the source;
+                               files below source directories that failed to list are kept
+            compare_md5: For files with equal size, compare stored Content-MD5 when both
+                         sides have one (costs one properties request per file and side)
+            plan: Source FilePlan from build_file_plan (listed here if not given)
+
+        Returns:
+            Tuple of (successful_count, failed_count)
+        """
+        source_share_client = self.source_service_client.get_share_client(source_share_name)
+        dest_share_client = self.dest_service_client.get_share_client(dest_share_name)
+        dest_root = dest_root_dir or ""
+
+        print("Listing source and destination...")
+        if plan is None:
+            plan = self.list_files(source_share_client)
+        source_files = plan.files
+        dest_plan = self.list_files(dest_share_client, dest_root)
+        dest_files = dest_plan.files
+
+        if compare_md5:
+            same_size = [path for path, entry in source_files.items()
+                         if path in dest_files and dest_files[path].size == entry.size]
+            self._load_content_md5(source_share_client, "", [source_files[p] for p in same_size])
+            self._load_content_md5(dest_share_client, dest_root, [dest_files[p] for p in same_size])
+
+        to_copy, extraneous = diff_file_sets(source_files, dest_files)
+
+        print(f"  Source files: {len(source_files):,}, destination files: {len(dest_files):,}")
+        print(f"  New or changed: {len(to_copy):,}, unchanged: {len(source_files) - len(to_copy):,}, "
+              f"extraneous: {len(extraneous):,}")
+
+        if dest_root_dir:
+            self._create_root_directory(dest_share_client, dest_root_dir)
+
+        # Copy only the delta, creating just the directories the destination is missing
+        delta = FilePlan(files={path: source_files[path] for path in to_copy})
+        for path in to_copy:
+            parts = path.split('/')[:-1]
+            for i in range(1, len(parts) + 1):
+                delta.directories.add('/'.join(parts[:i]))
+        delta.directories -= dest_plan.directories
+
+        successful, failed = self.copy_plan(source_share_client, dest_share_client, delta,
+                                            dest_root=dest_root)
+        failed += len(plan.errors)
+
+        if delete_extraneous:
+            if plan.errors:
+                # A directory that failed to list looks empty; keep everything below it
+                kept = [path for path in extraneous if _under_any(path, plan.errors)]
+                if kept:
+                    print(f"⚠ Not deleting {len(kept):,} extraneous file(s) below "
+                          f"{len(plan.errors):,} source directories that could not be listed")
+                extraneous = [path for path in extraneous if not _under_any(path, plan.errors)]
+            for path in extraneous:
+                dest_path = _join_path(dest_root, path)
+                try:
+                    dest_share_client.get_file_client(dest_path).delete_file()
+                    print(f"Deleted extraneous file: {dest_path}")
+                except Exception as e:
+                    print(f"✗ Error deleting extraneous file {dest_path}: {str(e)}")
+                    failed += 1
+
+        return successful, failed
+
+
+def _join_path(*parts: str) -> str:
+    """Join relative share paths, skipping empty parts."""
+    return "/".join(part for part in parts if part)
+
+
+def _under_any(path: str, directories: Iterable[str]) -> bool:
+    """Check if a relative path lies below any of the directories ('' is the root)."""
+    return any(not directory or path.startswith(directory + '/') for directory in directories)
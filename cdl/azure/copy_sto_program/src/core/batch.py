@@ -0,0 +1,329 @@
+"""
+Batch Module
+Copies many share pairs listed in a job file (YAML or CSV) with one credential,
+cached storage account lookups and one pooled ShareServiceClient per account.
+"""
+
+import csv
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from azure.storage.fileshare import ShareServiceClient
+
+from src.core.azure_storage import (
+    AzureStorageManager, FileShareCopier, DEFAULT_CHUNK_SIZE, DEFAULT_MAX_INFLIGHT_BYTES
+)
+from src.core.buffer_pool import BufferPool
+from src.core.manifest import CopyManifest
+from src.core.utils import check_quota, check_storage_tiers
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+@dataclass
+class BatchJob:
+    """One source/destination share pair of a job file."""
+    source_storage_account: str
+    source_share: str
+    dest_storage_account: str
+    dest_share: str
+    source_resource_group: Optional[str] = None
+    dest_resource_group: Optional[str] = None
+    dest_root_dir: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """Short label used in output."""
+        return (f"{self.source_storage_account}/{self.source_share} -> "
+                f"{self.dest_storage_account}/{self.dest_share}")
+
+    @property
+    def manifest_name(self) -> str:
+        """File name of this pair's manifest inside a manifest directory."""
+        return (f"{self.source_storage_account}.{self.source_share}__"
+                f"{self.dest_storage_account}.{self.dest_share}.sqlite")
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one job."""
+    job: BatchJob
+    status: str
+    successful: int = 0
+    failed: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable form for the run report."""
+        return {
+            'source': f"{self.job.source_storage_account}/{self.job.source_share}",
+            'destination': f"{self.job.dest_storage_account}/{self.job.dest_share}",
+            'status': self.status, 'successful': self.successful, 'failed': self.failed,
+            'bytes': self.bytes, 'seconds': round(self.seconds, 3), 'error': self.error,
+        }
+
+
+JOB_FIELDS = [f.name for f in fields(BatchJob)]
+REQUIRED_JOB_FIELDS = ['source_storage_account', 'source_share', 'dest_storage_account', 'dest_share']
+
+
+def _job_from_row(row: Dict, position: str) -> BatchJob:
+    row = {key.strip().replace('-', '_'): (str(value).strip() if value is not None else '')
+           for key, value in row.items() if key}
+    unknown = set(row) - set(JOB_FIELDS)
+    if unknown:
+        raise ValueError(f"{position}: unknown field(s) {', '.join(sorted(unknown))}")
+    missing = [name for name in REQUIRED_JOB_FIELDS if not row.get(name)]
+    if missing:
+        raise ValueError(f"{position}: missing {', '.join(missing)}")
+    return BatchJob(**{key: value or None for key, value in row.items()})
+
+
+def load_jobs(job_file: Union[str, Path]) -> List[BatchJob]:
+    """
+    Read share pairs from a job file.
+
+    CSV files need a header row with the BatchJob field names (lines starting with
+    '#' are ignored). YAML files hold a list of mappings, or a mapping with a 'jobs' list.
+
+    Args:
+        job_file: Path of a .csv, .yaml or .yml file
+
+    Returns:
+        Jobs in file order
+
+    Raises:
+        ValueError: If the file is malformed
+        ImportError: If a YAML file is given and PyYAML is not installed
+    """
+    job_file = Path(job_file)
+
+    if job_file.suffix.lower() in ('.yaml', '.yml'):
+        if yaml is None:
+            raise ImportError("PyYAML is required for YAML job files (pip install PyYAML)")
+        with open(job_file) as f:
+            data = yaml.safe_load(f) or []
+        if isinstance(data, dict):
+            data = data.get('jobs', [])
+        if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+            raise ValueError(f"{job_file}: expected a list of jobs")
+        return [_job_from_row(item, f"{job_file} job {i + 1}") for i, item in enumerate(data)]
+
+    with open(job_file, newline='') as f:
+        lines = [line for line in f if line.strip() and not line.lstrip().startswith('#')]
+    return [_job_from_row(row, f"{job_file} row {i + 2}")
+            for i, row in enumerate(csv.DictReader(lines))]
+
+
+@dataclass
+class AccountHandle:
+    """Everything needed to copy from or to one storage account."""
+    name: str
+    subscription_id: str
+    resource_group: str
+    details: Dict[str, str]
+    service_client: ShareServiceClient
+
+
+class AccountPool:
+    """Locates each storage account once and shares its details, key and client across jobs."""
+
+    def __init__(self, credential, environment: str, discovery,
+                 client_options: Optional[Dict] = None):
+        """
+        Initialize the pool.
+
+        Args:
+            credential: Azure credential object
+            environment: 'global' or 'china'
+            discovery: AzureDiscovery used to locate accounts (with its index, if any)
+            client_options: Extra ShareServiceClient options (e.g. raw_response_hook)
+        """
+        self.credential = credential
+        self.environment = environment
+        self.discovery = discovery
+        self.client_options = client_options or {}
+        self._accounts: Dict[str, AccountHandle] = {}
+        self._managers: Dict[str, AzureStorageManager] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _manager(self, subscription_id: str) -> AzureStorageManager:
+        with self._lock:
+            if subscription_id not in self._managers:
+                self._managers[subscription_id] = AzureStorageManager(
+                    self.credential, subscription_id, self.environment
+                )
+            return self._managers[subscription_id]
+
+    def get(self, account_name: str, resource_group: Optional[str] = None) -> AccountHandle:
+        """
+        Get an account, looking it up on first use.
+
+        Concurrent jobs asking for the same account wait for one lookup.
+
+        Args:
+            account_name: Storage account name
+            resource_group: Optional resource group (skips discovery of it)
+
+        Returns:
+            AccountHandle
+        """
+        key = account_name.lower()
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            if key in self._accounts:
+                return self._accounts[key]
+
+            subscription_id, resource_group = self.discovery.locate_storage_account(
+                account_name, resource_group
+            )
+            manager = self._manager(subscription_id)
+            details = manager.get_storage_account_details(resource_group, account_name)
+            account_key = manager.get_storage_account_key(resource_group, account_name)
+            handle = AccountHandle(
+                account_name, subscription_id, resource_group, details,
+                manager.create_share_service_client(account_name, account_key, **self.client_options)
+            )
+            self._accounts[key] = handle
+            print(f"  ✓ {account_name}: subscription {subscription_id}, resource group {resource_group}")
+            return handle
+
+    def prefetch(self, accounts: List[Tuple[str, Optional[str]]], workers: int = 8) -> None:
+        """
+        Look up several accounts concurrently; failures are reported and retried by the jobs.
+
+        Args:
+            accounts: (account_name, resource_group) pairs
+            workers: Accounts looked up at once
+        """
+        def lookup(account: Tuple[str, Optional[str]]) -> None:
+            try:
+                self.get(*account)
+            except Exception as e:
+                print(f"  ✗ {account[0]}: {str(e)}")
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            list(executor.map(lookup, accounts))
+
+
+class BatchRunner:
+    """Runs the jobs of a job file concurrently against a shared AccountPool."""
+
+    def __init__(self, accounts: AccountPool, copier_options: Dict, job_workers: int = 4,
+                 manifest_dir: Optional[Union[str, Path]] = None, sync: bool = False,
+                 delete_extraneous: bool = False, compare_md5: bool = False):
+        """
+        Initialize the runner.
+
+        Args:
+            accounts: AccountPool shared by all jobs
+            copier_options: FileShareCopier keyword arguments applied to every job; pass
+                            one shared throttle to cap the files in flight across jobs.
+                            All jobs share one buffer pool of max_inflight_bytes.
+            job_workers: Share pairs copied at once
+            manifest_dir: Directory holding one manifest per pair (None for no manifests)
+            sync: Incremental sync instead of a full copy
+            delete_extraneous: With sync, delete destination files missing at the source
+            compare_md5: With sync, compare stored Content-MD5 of equally sized files
+        """
+        self.accounts = accounts
+        self.copier_options = dict(copier_options)
+        if 'buffer_pool' not in self.copier_options:
+            # One pool for all jobs, so --max-inflight-mb caps the whole batch
+            self.copier_options['buffer_pool'] = BufferPool(
+                self.copier_options.get('chunk_size', DEFAULT_CHUNK_SIZE),
+                self.copier_options.get('max_inflight_bytes', DEFAULT_MAX_INFLIGHT_BYTES)
+            )
+        self.job_workers = max(1, job_workers)
+        self.manifest_dir = Path(manifest_dir) if manifest_dir else None
+        self.sync = sync
+        self.delete_extraneous = delete_extraneous
+        self.compare_md5 = compare_md5
+
+    def run_job(self, job: BatchJob) -> BatchResult:
+        """
+        Check and copy one share pair.
+
+        Returns:
+            BatchResult (status success, failed, cancelled or error)
+        """
+        started = time.time()
+        print(f"\n▶ {job.name}")
+        try:
+            source = self.accounts.get(job.source_storage_account, job.source_resource_group)
+            dest = self.accounts.get(job.dest_storage_account, job.dest_resource_group)
+
+            if not check_storage_tiers(source.details, dest.details):
+                return BatchResult(job, 'cancelled', seconds=time.time() - started,
+                                   error='storage tier check failed')
+
+            manifest = CopyManifest(self.manifest_dir / job.manifest_name) if self.manifest_dir else None
+            try:
+                copier = FileShareCopier(source.service_client, dest.service_client,
+                                         manifest=manifest, **self.copier_options)
+                plan = copier.build_file_plan(job.source_share)
+                quota = dest.service_client.get_share_client(job.dest_share).get_share_properties().quota
+                if not check_quota(plan.total_size, quota * 1024 * 1024 * 1024, interactive=False):
+                    return BatchResult(job, 'cancelled', bytes=plan.total_size,
+                                       seconds=time.time() - started, error='destination quota too small')
+
+                dest_root_dir = job.dest_root_dir or job.source_share
+                if self.sync:
+                    successful, failed = copier.sync_share(
+                        job.source_share, job.dest_share, dest_root_dir=dest_root_dir,
+                        delete_extraneous=self.delete_extraneous, compare_md5=self.compare_md5,
+                        plan=plan
+                    )
+                else:
+                    successful, failed = copier.copy_share(
+                        job.source_share, job.dest_share, dest_root_dir=dest_root_dir, plan=plan
+                    )
+            finally:
+                if manifest:
+                    manifest.close()
+
+            status = 'success' if failed == 0 else 'failed'
+            print(f"{'✓' if status == 'success' else '✗'} {job.name}: "
+                  f"{successful} copied, {failed} failed")
+            return BatchResult(job, status, successful, failed, plan.total_size, time.time() - started)
+
+        except Exception as e:
+            print(f"✗ {job.name}: {str(e)}")
+            return BatchResult(job, 'error', seconds=time.time() - started, error=str(e))
+
+    def run(self, jobs: List[BatchJob]) -> List[BatchResult]:
+        """
+        Run all jobs, job_workers at a time.
+
+        Args:
+            jobs: Jobs from load_jobs
+
+        Returns:
+            One BatchResult per job, in job order
+        """
+        if self.manifest_dir:
+            self.manifest_dir.mkdir(parents=True, exist_ok=True)
+
+        accounts = {}
+        for job in jobs:
+            accounts.setdefault(job.source_storage_account.lower(),
+                                (job.source_storage_account, job.source_resource_group))
+            accounts.setdefault(job.dest_storage_account.lower(),
+                                (job.dest_storage_account, job.dest_resource_group))
+        print(f"Locating {len(accounts)} storage account(s) for {len(jobs)} job(s)...")
+        self.accounts.prefetch(list(accounts.values()))
+
+        with ThreadPoolExecutor(max_workers=self.job_workers) as executor:
+            return list(executor.map(self.run_job, jobs))
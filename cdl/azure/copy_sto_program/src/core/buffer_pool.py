@@ -0,0 +1,119 @@
+"""
+Buffer Pool Module
+Fixed set of reusable range buffers that caps the memory held by streamed copies.
+"""
+
+import io
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+
+class BufferPool:
+    """
+    Reusable bytearrays of buffer_size bytes, at most max_buffers of them.
+
+    Buffers are allocated on first use and handed out again after release, so the
+    copy loop allocates nothing per range and never holds more than
+    max_buffers * buffer_size bytes of range data.
+    """
+
+    def __init__(self, buffer_size: int, max_bytes: int):
+        """
+        Initialize the pool.
+
+        Args:
+            buffer_size: Size of each buffer in bytes (the largest range copied)
+            max_bytes: Upper bound on the memory of all buffers (at least one buffer)
+        """
+        self.buffer_size = buffer_size
+        self.max_buffers = max(1, max_bytes // buffer_size)
+        self.allocated = 0
+        self._free: List[bytearray] = []
+        self._condition = threading.Condition()
+
+    def acquire(self, blocking: bool = True) -> Optional[bytearray]:
+        """
+        Take a buffer from the pool.
+
+        Args:
+            blocking: Wait for a buffer to be released when all are in use
+
+        Returns:
+            A buffer, or None if blocking is False and none is free
+        """
+        with self._condition:
+            while True:
+                if self._free:
+                    return self._free.pop()
+                if self.allocated < self.max_buffers:
+                    self.allocated += 1
+                    return bytearray(self.buffer_size)
+                if not blocking:
+                    return None
+                self._condition.wait()
+
+    def release(self, buffer: bytearray) -> None:
+        """Return a buffer to the pool."""
+        with self._condition:
+            self._free.append(buffer)
+            self._condition.notify()
+
+    @contextmanager
+    def buffer(self) -> Iterator[bytearray]:
+        """Hold a buffer for the duration of the block."""
+        buffer = self.acquire()
+        try:
+            yield buffer
+        finally:
+            self.release(buffer)
+
+
+class BufferWriter(io.RawIOBase):
+    """Writable stream filling a preallocated buffer (target of StorageStreamDownloader.readinto)."""
+
+    def __init__(self, buffer: bytearray):
+        self._view = memoryview(buffer)
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        length = len(data)
+        if self.position + length > len(self._view):
+            raise ValueError("Range does not fit in the copy buffer")
+        self._view[self.position:self.position + length] = data
+        self.position += length
+        return length
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable read-only stream over a memoryview, used as upload body without copying it."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = max(0, min(len(self._view), base + offset))
+        return self._position
+
+    def readinto(self, target) -> int:
+        length = min(len(target), len(self._view) - self._position)
+        target[:length] = self._view[self._position:self._position + length]
+        self._position += length
+        return length
+
+    def __len__(self) -> int:
+        return len(self._view)
@@ -0,0 +1,70 @@
+"""
+Client Pool Module
+Process-wide cache of Azure management clients, so every component of a run shares
+one client (and its HTTP session and the credential's token cache) per subscription.
+"""
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+CHINA_ARM_ENDPOINT = 'https://management.chinacloudapi.cn'
+# Same as MGMT_CLIENT_KWARGS in cdl/azure/azure_clients.py, which this standalone program cannot import
+CHINA_CLIENT_KWARGS = {
+    'base_url': CHINA_ARM_ENDPOINT,
+    'credential_scopes': [f'{CHINA_ARM_ENDPOINT}/.default'],
+}
+
+
+class ClientPool:
+    """Management clients keyed by (environment, subscription, client type, credential)."""
+
+    def __init__(self):
+        self._clients: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, client_class, credential, subscription_id: Optional[str] = None,
+            environment: str = 'global', **kwargs) -> Any:
+        """
+        Get the client for a subscription, creating it on first use.
+
+        Args:
+            client_class: SDK client class (e.g. StorageManagementClient)
+            credential: Azure credential object
+            subscription_id: Subscription ID (None for tenant-level clients such as SubscriptionClient)
+            environment: 'global' or 'china' (china clients use the China Resource Manager endpoint)
+            **kwargs: Extra client options, only used when the client is created
+
+        Returns:
+            Shared client instance
+        """
+        key = (environment, subscription_id, client_class, credential)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                if environment == 'china':
+                    kwargs = {**CHINA_CLIENT_KWARGS, **kwargs}
+                args = (credential, subscription_id) if subscription_id else (credential,)
+                client = client_class(*args, **kwargs)
+                self._clients[key] = client
+            return client
+
+    def clear(self) -> None:
+        """Close and forget all clients."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            close = getattr(client, 'close', None)
+            if close:
+                try:
+                    close()
+                except Exception:
+                    pass
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+# Shared by all components of the process
+shared_pool = ClientPool()
@@ -0,0 +1,39 @@
+"""
+File Plan Module
+In-memory result of a single share listing, shared by sizing, quota checks and copying.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+
+@dataclass
+class FileEntry:
+    """A file found while listing a share."""
+    path: str
+    size: int
+    last_modified: Optional[datetime] = None
+    content_md5: Optional[bytes] = None
+
+
+@dataclass
+class FilePlan:
+    """All files and directories below a share directory, keyed by relative path."""
+    files: Dict[str, FileEntry] = field(default_factory=dict)
+    directories: Set[str] = field(default_factory=set)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def total_size(self) -> int:
+        """Total size of all files in bytes."""
+        return sum(entry.size for entry in self.files.values())
+
+    @property
+    def file_count(self) -> int:
+        """Number of files."""
+        return len(self.files)
+
+    def sorted_directories(self) -> List[str]:
+        """Directories ordered so that parents come before their children."""
+        return sorted(self.directories, key=lambda d: (d.count('/'), d))
@@ -0,0 +1,140 @@
+"""
+Copy Manifest Module
+Persists per-file copy progress in a local SQLite file so interrupted runs can resume.
+"""
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Set, Union
+
+
+STATUS_PARTIAL = 'partial'
+STATUS_VERIFIED = 'verified'
+
+
+@dataclass
+class ManifestEntry:
+    """Copy state of a single file."""
+    path: str
+    size: int
+    last_modified: str
+    bytes_copied: int = 0
+    md5: Optional[str] = None
+    status: str = STATUS_PARTIAL
+
+    def matches(self, size: int, last_modified: str) -> bool:
+        """Check whether the entry still describes the same source file."""
+        return self.size == size and self.last_modified == last_modified
+
+
+class CopyManifest:
+    """SQLite-backed checkpoint of copied files, keyed by relative source path."""
+
+    def __init__(self, manifest_path: Union[str, Path]):
+        """
+        Open (or create) a manifest file.
+
+        Args:
+            manifest_path: Path of the SQLite manifest file
+        """
+        self.manifest_path = Path(manifest_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.manifest_path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_modified TEXT NOT NULL,
+                bytes_copied INTEGER NOT NULL DEFAULT 0,
+                md5 TEXT,
+                status TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, path: str) -> Optional[ManifestEntry]:
+        """
+        Get the recorded state of a file.
+
+        Args:
+            path: Relative source path
+
+        Returns:
+            ManifestEntry or None if the file was never recorded
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, size, last_modified, bytes_copied, md5, status FROM files WHERE path = ?",
+                (path,)
+            ).fetchone()
+        return ManifestEntry(*row) if row else None
+
+    def is_verified(self, path: str, size: int, last_modified: str) -> bool:
+        """Check if a file was already copied and verified and has not changed since."""
+        entry = self.get(path)
+        return bool(entry and entry.status == STATUS_VERIFIED and entry.matches(size, last_modified))
+
+    def start_file(self, path: str, size: int, last_modified: str) -> None:
+        """Record that a fresh copy of a file has started."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, last_modified, bytes_copied, md5, status) "
+                "VALUES (?, ?, ?, 0, NULL, ?)",
+                (path, size, last_modified, STATUS_PARTIAL)
+            )
+            self._conn.commit()
+
+    def update_progress(self, path: str, bytes_copied: int) -> None:
+        """Record the end offset of the last range successfully written to the destination."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE files SET bytes_copied = ? WHERE path = ?",
+                (bytes_copied, path)
+            )
+            self._conn.commit()
+
+    def mark_verified(self, path: str, size: int, last_modified: str, md5: Optional[str] = None) -> None:
+        """Record that a file was copied completely and verified."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, last_modified, bytes_copied, md5, status) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, size, last_modified, size, md5, STATUS_VERIFIED)
+            )
+            self._conn.commit()
+
+    def written_directories(self) -> Set[str]:
+        """
+        Directories (relative source paths) that already received data in an earlier run.
+
+        Returns:
+            Parent directories, and all their ancestors, of files that are verified or
+            have at least one range written
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM files WHERE status = ? OR bytes_copied > 0",
+                (STATUS_VERIFIED,)
+            ).fetchall()
+
+        directories = set()
+        for (path,) in rows:
+            parts = path.split('/')[:-1]
+            for i in range(1, len(parts) + 1):
+                directories.add('/'.join(parts[:i]))
+        return directories
+
+    def remove(self, path: str) -> None:
+        """Forget a file so the next run copies it from scratch."""
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
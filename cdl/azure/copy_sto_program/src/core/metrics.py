@@ -0,0 +1,173 @@
+"""
+Run Metrics Module
+Collects throughput, phase timings, retries and the slowest files of a copy run
+and writes them as a JSON run report.
+"""
+
+import heapq
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+
+# HTTP statuses the Azure SDK retries; seeing them means the service is throttling or struggling
+RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+class RunMetrics:
+    """Thread-safe counters and timings of one copy run."""
+
+    def __init__(self, slowest_count: int = 10):
+        """
+        Initialize metrics.
+
+        Args:
+            slowest_count: Number of slowest files kept for the report
+        """
+        self.started_at = time.time()
+        self.slowest_count = slowest_count
+        self.phases: Dict[str, float] = {}
+        self._running: Dict[str, List[float]] = {}
+        self.cumulative: Dict[str, float] = {}
+        self.retries: Dict[str, int] = {}
+        self.bytes_copied = 0
+        self.files_copied = 0
+        self.files_failed = 0
+        self.files_skipped = 0
+        self._slowest: List[Tuple[float, str, int]] = []
+        self._lock = threading.Lock()
+        self._stop_periodic = threading.Event()
+        self._periodic_thread = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a run phase (discover, enumerate, copy, ...) by wall clock."""
+        start = time.time()
+        with self._lock:
+            self._running.setdefault(name, []).append(start)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._running[name].remove(start)
+                self.phases[name] = self.phases.get(name, 0.0) + time.time() - start
+
+    def _phase_seconds(self, name: str, now: float) -> float:
+        """Time spent in a phase so far, including runs of it still in progress."""
+        return self.phases.get(name, 0.0) + sum(now - start for start in self._running.get(name, []))
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Add per-file time (e.g. verify) that is summed across workers."""
+        with self._lock:
+            self.cumulative[name] = self.cumulative.get(name, 0.0) + seconds
+
+    def record_file(self, path: str, size: int, seconds: float, success: bool) -> None:
+        """Record a copied (or failed) file."""
+        with self._lock:
+            if success:
+                self.files_copied += 1
+                self.bytes_copied += size
+            else:
+                self.files_failed += 1
+
+            entry = (seconds, path, size)
+            if len(self._slowest) < self.slowest_count:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def record_skipped(self) -> None:
+        """Record a file skipped because it was already verified."""
+        with self._lock:
+            self.files_skipped += 1
+
+    def record_retry(self, reason: str) -> None:
+        """Record one retried request."""
+        with self._lock:
+            self.retries[reason] = self.retries.get(reason, 0) + 1
+
+    def response_hook(self, pipeline_response) -> None:
+        """
+        raw_response_hook for Azure SDK clients. The storage pipeline calls it for
+        every attempt, so retryable responses count the retries the SDK makes.
+        """
+        status = pipeline_response.http_response.status_code
+        if status in RETRYABLE_STATUSES:
+            self.record_retry(str(status))
+
+    def snapshot(self) -> Dict:
+        """Current metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            now = time.time()
+            elapsed = now - self.started_at
+            # Periodic snapshots are taken during the copy phase, so its running time counts too
+            copy_seconds = self._phase_seconds('copy', now) or elapsed
+            return {
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(self.started_at)),
+                'elapsed_seconds': round(elapsed, 3),
+                'bytes_copied': self.bytes_copied,
+                'files_copied': self.files_copied,
+                'files_failed': self.files_failed,
+                'files_skipped': self.files_skipped,
+                'bytes_per_second': round(self.bytes_copied / copy_seconds, 1) if copy_seconds else 0.0,
+                'files_per_second': round(self.files_copied / copy_seconds, 3) if copy_seconds else 0.0,
+                'phase_seconds': {name: round(seconds, 3) for name, seconds in self.phases.items()},
+                'cumulative_seconds': {name: round(seconds, 3) for name, seconds in self.cumulative.items()},
+                'retries': dict(self.retries),
+                'retries_total': sum(self.retries.values()),
+                'slowest_files': [
+                    {'path': path, 'size': size, 'seconds': round(seconds, 3)}
+                    for seconds, path, size in sorted(self._slowest, reverse=True)
+                ],
+            }
+
+    def write_report(self, report_path: Union[str, Path], extra: Optional[Dict] = None) -> None:
+        """
+        Write the run report as JSON.
+
+        Args:
+            report_path: Output file
+            extra: Additional top-level fields (run parameters, result, ...)
+        """
+        report = dict(extra or {})
+        report.update(self.snapshot())
+        report_path = Path(report_path)
+        tmp_path = report_path.with_suffix(report_path.suffix + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        tmp_path.replace(report_path)
+
+    def start_periodic(self, interval: float, report_path: Optional[Union[str, Path]] = None,
+                       extra: Optional[Dict] = None) -> None:
+        """
+        Print a status line every interval seconds (and rewrite the report if a path is given).
+
+        Args:
+            interval: Seconds between emissions
+            report_path: Optional report file refreshed on each emission
+            extra: Additional report fields
+        """
+        def emit():
+            while not self._stop_periodic.wait(interval):
+                snapshot = self.snapshot()
+                print(f"[metrics] {snapshot['files_copied']:,} files, {snapshot['bytes_copied']:,} bytes, "
+                      f"{snapshot['bytes_per_second']:,.0f} B/s, {snapshot['retries_total']} retries")
+                if report_path:
+                    try:
+                        self.write_report(report_path, extra)
+                    except OSError as e:
+                        print(f"Warning: Could not write run report: {str(e)}")
+
+        self._stop_periodic.clear()
+        self._periodic_thread = threading.Thread(target=emit, daemon=True)
+        self._periodic_thread.start()
+
+    def stop_periodic(self) -> None:
+        """Stop periodic emission."""
+        self._stop_periodic.set()
+        if self._periodic_thread:
+            self._periodic_thread.join()
+            self._periodic_thread = None
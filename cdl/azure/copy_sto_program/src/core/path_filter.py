@@ -0,0 +1,119 @@
+"""
+Path Filter Module
+Include/exclude patterns and deterministic path-hash sharding for share copies.
+"""
+
+import fnmatch
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from src.core.file_plan import FilePlan
+
+
+REGEX_PREFIX = 're:'
+
+
+def compile_pattern(pattern: str) -> Callable[[str], bool]:
+    """
+    Compile a glob or regex pattern matched against relative file paths.
+
+    Globs use fnmatch syntax and are matched against the whole path ('*' also
+    matches '/', so '*.tmp' excludes temp files at any depth). Patterns starting
+    with 're:' are regular expressions searched anywhere in the path.
+
+    Args:
+        pattern: Glob, or regular expression prefixed with 're:'
+
+    Returns:
+        Predicate telling whether a path matches
+
+    Raises:
+        re.error: If a regular expression is invalid
+    """
+    if pattern.startswith(REGEX_PREFIX):
+        return lambda path, regex=re.compile(pattern[len(REGEX_PREFIX):]): bool(regex.search(path))
+    return lambda path, regex=re.compile(fnmatch.translate(pattern)): bool(regex.match(path))
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification 'i/N' (0 <= i < N).
+
+    Raises:
+        ValueError: If the specification is malformed or out of range
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{value}', expected i/N (e.g. 0/4)")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{value}', index must be between 0 and {count - 1}")
+    return index, count
+
+
+def shard_of(path: str, count: int) -> int:
+    """Shard (0..count-1) a relative path belongs to; stable across processes and hosts."""
+    digest = hashlib.md5(path.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count
+
+
+@dataclass
+class PathFilter:
+    """Selects the files of a share to copy."""
+    include: List[str] = field(default_factory=list)
+    exclude: List[str] = field(default_factory=list)
+    shard: Optional[Tuple[int, int]] = None
+
+    def __post_init__(self):
+        self._include = [compile_pattern(p) for p in self.include]
+        self._exclude = [compile_pattern(p) for p in self.exclude]
+
+    @property
+    def active(self) -> bool:
+        """Check if the filter selects anything less than the whole share."""
+        return bool(self.include or self.exclude or (self.shard and self.shard[1] > 1))
+
+    def matches(self, path: str) -> bool:
+        """
+        Check if a file is selected.
+
+        A file is selected if it matches any include pattern (or there are none),
+        matches no exclude pattern, and hashes to this shard.
+
+        Args:
+            path: File path relative to the share root
+        """
+        if self._include and not any(matches(path) for matches in self._include):
+            return False
+        if any(matches(path) for matches in self._exclude):
+            return False
+        if self.shard and self.shard[1] > 1:
+            return shard_of(path, self.shard[1]) == self.shard[0]
+        return True
+
+    def apply(self, plan: FilePlan) -> FilePlan:
+        """
+        Restrict a plan to the selected files.
+
+        Only the directories leading to selected files are kept, so empty source
+        directories are not recreated by a filtered or sharded copy.
+
+        Args:
+            plan: Unfiltered plan
+
+        Returns:
+            New FilePlan (the plan itself if the filter is not active)
+        """
+        if not self.active:
+            return plan
+
+        filtered = FilePlan(errors=list(plan.errors))
+        for path, entry in plan.files.items():
+            if self.matches(path):
+                filtered.files[path] = entry
+                parts = path.split('/')[:-1]
+                for i in range(1, len(parts) + 1):
+                    filtered.directories.add('/'.join(parts[:i]))
+        return filtered
@@ -0,0 +1,238 @@
+"""
+Planner Module
+Dry-run report for CTS --plan: size histogram of a FilePlan, a short measured
+throughput probe and an estimate of the full copy duration.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.core.file_plan import FileEntry, FilePlan
+from src.core.utils import format_bytes
+
+
+# Upper bounds (exclusive) of the histogram buckets; the last bucket is open-ended
+SIZE_BUCKETS = [
+    4 * 1024,
+    64 * 1024,
+    1024 * 1024,
+    16 * 1024 * 1024,
+    256 * 1024 * 1024,
+    4 * 1024 * 1024 * 1024,
+]
+
+
+@dataclass
+class HistogramBucket:
+    """Files of a plan within one size range."""
+    label: str
+    files: int = 0
+    bytes: int = 0
+
+
+@dataclass
+class TransferModel:
+    """Per-file time as overhead + size * seconds_per_byte, fitted from a probe."""
+    per_file_seconds: float
+    seconds_per_byte: float
+    probe_files: int
+    probe_bytes: int
+    probe_seconds: float
+
+    def estimate(self, file_count: int, total_bytes: int, workers: int) -> float:
+        """
+        Estimate the wall time of a copy.
+
+        Args:
+            file_count: Number of files to copy
+            total_bytes: Total bytes to copy
+            workers: Files copied concurrently
+
+        Returns:
+            Estimated duration in seconds
+        """
+        busy = file_count * self.per_file_seconds + total_bytes * self.seconds_per_byte
+        return busy / max(1, min(workers, file_count))
+
+
+def _bucket_index(size: int) -> int:
+    for index, limit in enumerate(SIZE_BUCKETS):
+        if size < limit:
+            return index
+    return len(SIZE_BUCKETS)
+
+
+def size_histogram(plan: FilePlan) -> List[HistogramBucket]:
+    """
+    Count files and bytes per size bucket.
+
+    Args:
+        plan: Listed share
+
+    Returns:
+        One HistogramBucket per entry of SIZE_BUCKETS plus the open-ended last bucket
+    """
+    bounds = [0] + SIZE_BUCKETS
+    buckets = [HistogramBucket(f"{format_bytes(low)} - {format_bytes(high)}")
+               for low, high in zip(bounds, SIZE_BUCKETS)]
+    buckets.append(HistogramBucket(f">= {format_bytes(SIZE_BUCKETS[-1])}"))
+
+    for entry in plan.files.values():
+        bucket = buckets[_bucket_index(entry.size)]
+        bucket.files += 1
+        bucket.bytes += entry.size
+    return buckets
+
+
+def select_probe_sample(plan: FilePlan, max_files: int, max_bytes: int) -> List[FileEntry]:
+    """
+    Pick a small set of files spread over all size buckets.
+
+    Buckets are visited round-robin (smallest files of each bucket first) so the
+    sample covers both per-file overhead and bandwidth, within max_files and max_bytes.
+
+    Args:
+        plan: Listed share
+        max_files: Maximum number of files in the sample
+        max_bytes: Maximum total size of the sample
+
+    Returns:
+        Sampled file entries
+    """
+    by_bucket: Dict[int, List[FileEntry]] = {}
+    for entry in sorted(plan.files.values(), key=lambda e: (e.size, e.path)):
+        by_bucket.setdefault(_bucket_index(entry.size), []).append(entry)
+
+    sample = []
+    sample_bytes = 0
+    queues = [by_bucket[index] for index in sorted(by_bucket)]
+    while queues and len(sample) < max_files:
+        remaining = []
+        for queue in queues:
+            if len(sample) >= max_files:
+                break
+            entry = queue.pop(0)
+            if sample_bytes + entry.size > max_bytes:
+                # Larger files of this bucket will not fit either
+                continue
+            sample.append(entry)
+            sample_bytes += entry.size
+            if queue:
+                remaining.append(queue)
+        queues = remaining
+    return sample
+
+
+def fit_transfer_model(samples: List[Tuple[int, float]], probe_seconds: float) -> Optional[TransferModel]:
+    """
+    Least-squares fit of seconds = per_file + size * per_byte over probed files.
+
+    Args:
+        samples: (size, seconds) of each probed file
+        probe_seconds: Wall time of the whole probe
+
+    Returns:
+        TransferModel, or None without samples
+    """
+    if not samples:
+        return None
+
+    count = len(samples)
+    mean_size = sum(size for size, _ in samples) / count
+    mean_seconds = sum(seconds for _, seconds in samples) / count
+    variance = sum((size - mean_size) ** 2 for size, _ in samples)
+
+    if variance:
+        per_byte = sum((size - mean_size) * (seconds - mean_seconds) for size, seconds in samples) / variance
+    else:
+        per_byte = 0.0
+    per_byte = max(0.0, per_byte)
+    per_file = max(0.0, mean_seconds - per_byte * mean_size)
+
+    if not variance and mean_size:
+        # All probed files have the same size: attribute the time to their bytes
+        per_byte, per_file = mean_seconds / mean_size, 0.0
+
+    return TransferModel(per_file, per_byte, count,
+                         sum(size for size, _ in samples), probe_seconds)
+
+
+def run_probe(copier, source_share_name: str, dest_share_name: str,
+              sample: List[FileEntry], probe_dir: str) -> Optional[TransferModel]:
+    """
+    Copy the sample into a scratch directory of the destination, time it and clean up.
+
+    Args:
+        copier: FileShareCopier configured like the real run, but without a manifest
+        source_share_name: Source share name
+        dest_share_name: Destination share name
+        sample: Files to copy (from select_probe_sample)
+        probe_dir: Destination directory for the probe files (deleted afterwards)
+
+    Returns:
+        TransferModel fitted from the verified probe files, or None if none succeeded
+    """
+    source_share_client = copier.source_service_client.get_share_client(source_share_name)
+    dest_share_client = copier.dest_service_client.get_share_client(dest_share_name)
+    jobs = [(entry.path, f"{probe_dir}/{index:05d}_{entry.path.rsplit('/', 1)[-1]}", entry)
+            for index, entry in enumerate(sample)]
+
+    def timed_copy(job) -> Tuple[int, float, bool]:
+        file_started = time.time()
+        copied = copier.copy_file(source_share_client, dest_share_client, *job)
+        return job[2].size, time.time() - file_started, copied
+
+    if copier.create_directories(dest_share_client, [probe_dir]):
+        print(f"  ✗ Could not create probe directory {probe_dir}")
+        return None
+
+    started = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=copier.workers) as executor:
+            results = list(executor.map(timed_copy, jobs))
+    finally:
+        probe_seconds = time.time() - started
+        for _, dest_path, _ in jobs:
+            try:
+                dest_share_client.get_file_client(dest_path).delete_file()
+            except Exception:
+                pass
+        try:
+            dest_share_client.get_directory_client(probe_dir).delete_directory()
+        except Exception as e:
+            print(f"  Warning: Could not remove probe directory {probe_dir}: {str(e)}")
+
+    failed = sum(1 for _, _, copied in results if not copied)
+    if failed:
+        print(f"  ⚠ {failed} probe file(s) failed and are not used for the estimate")
+    return fit_transfer_model([(size, seconds) for size, seconds, copied in results if copied],
+                              probe_seconds)
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as h/m/s."""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m {seconds:02d}s"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+def print_plan(plan: FilePlan, histogram: List[HistogramBucket]) -> None:
+    """Print totals and the size histogram of a plan."""
+    total_size = plan.total_size
+    print(f"  Files: {plan.file_count:,}")
+    print(f"  Directories: {len(plan.directories):,}")
+    print(f"  Total size: {total_size:,} bytes ({format_bytes(total_size)})")
+    if plan.errors:
+        print(f"  ⚠ Directories that could not be listed: {len(plan.errors):,}")
+
+    print(f"\n  {'Size':<26} {'Files':>10} {'Bytes':>12} {'% bytes':>8}")
+    for bucket in histogram:
+        share = 100.0 * bucket.bytes / total_size if total_size else 0.0
+        print(f"  {bucket.label:<26} {bucket.files:>10,} {format_bytes(bucket.bytes):>12} {share:>7.1f}%")
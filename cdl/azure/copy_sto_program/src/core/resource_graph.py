@@ -0,0 +1,94 @@
+"""
+Resource Graph Module
+Locates resources across all accessible subscriptions with a single Azure Resource Graph query.
+"""
+
+from typing import Dict, List, Optional
+
+try:
+    from azure.mgmt.resourcegraph import ResourceGraphClient
+    from azure.mgmt.resourcegraph.models import QueryRequest, QueryRequestOptions
+except ImportError:
+    ResourceGraphClient = None
+
+
+STORAGE_ACCOUNTS_QUERY = """
+resources
+| where type =~ 'microsoft.storage/storageaccounts'{name_filter}
+| join kind=leftouter (
+    resourcecontainers
+    | where type =~ 'microsoft.resources/subscriptions'
+    | project subscriptionId, subscriptionName = name
+  ) on subscriptionId
+| project name, subscriptionId, resourceGroup, subscriptionName
+"""
+
+
+def kql_string(value: str) -> str:
+    """Quote a value as a KQL string literal."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+class ResourceGraphQuery:
+    """Runs Resource Graph queries over every subscription the credential can read."""
+
+    def __init__(self, credential, base_url: Optional[str] = None, page_size: int = 1000):
+        """
+        Initialize the query client.
+
+        Args:
+            credential: Azure credential object
+            base_url: Resource Manager endpoint (None for Azure Global)
+            page_size: Rows requested per page
+
+        Raises:
+            ImportError: If azure-mgmt-resourcegraph is not installed
+        """
+        if ResourceGraphClient is None:
+            raise ImportError("azure-mgmt-resourcegraph is not installed")
+
+        if base_url:
+            self.client = ResourceGraphClient(credential, base_url=base_url,
+                                              credential_scopes=[f'{base_url}/.default'])
+        else:
+            self.client = ResourceGraphClient(credential)
+        self.page_size = page_size
+
+    def query(self, query: str) -> List[Dict]:
+        """
+        Run a query and return all rows, following skip tokens across pages.
+
+        Args:
+            query: KQL query text
+
+        Returns:
+            List of rows as dictionaries
+        """
+        rows = []
+        skip_token = None
+
+        while True:
+            response = self.client.resources(QueryRequest(
+                query=query,
+                options=QueryRequestOptions(result_format='objectArray', top=self.page_size,
+                                            skip_token=skip_token)
+            ))
+            rows.extend(response.data)
+            skip_token = response.skip_token
+            if not skip_token:
+                return rows
+
+    def find_storage_accounts(self, names: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Locate storage accounts.
+
+        Args:
+            names: Storage account names to look for (None for all accounts)
+
+        Returns:
+            Rows with name, subscriptionId, resourceGroup and subscriptionName
+        """
+        name_filter = ""
+        if names:
+            name_filter = f"\n| where name in~ ({', '.join(kql_string(n) for n in names)})"
+        return self.query(STORAGE_ACCOUNTS_QUERY.format(name_filter=name_filter))
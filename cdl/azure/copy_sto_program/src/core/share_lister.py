@@ -0,0 +1,146 @@
+"""
+Share Lister Module
+Breadth-first, concurrent listing of a file share that streams results through a queue.
+"""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterator, List, Optional, Tuple
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from src.core.file_plan import FileEntry, FilePlan
+
+
+# (is_directory, relative_path, file_entry or None)
+ListedItem = Tuple[bool, str, Optional[FileEntry]]
+
+_DONE = object()
+
+
+class ShareLister:
+    """
+    Lists a share directory tree with several directories in flight at once.
+
+    Directories are listed level by level on a thread pool. Every discovered
+    directory and file is put on a queue as soon as it is found, so a consumer can
+    start working before the listing finishes. A directory is always queued before
+    any of its contents. A consumer that stops early calls close() (leaving the
+    iteration does so) so the listing thread does not stay blocked on a full queue.
+    """
+
+    def __init__(self, share_client, root: str = "", workers: int = 8, queue_size: int = 10000):
+        """
+        Initialize the lister.
+
+        Args:
+            share_client: Share client to list
+            root: Directory to list (relative); reported paths are relative to it
+            workers: Number of directories listed concurrently
+            queue_size: Maximum number of discovered items waiting for the consumer
+        """
+        self.share_client = share_client
+        self.root = root
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.errors: List[str] = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _put(self, item) -> bool:
+        """Queue an item, giving up once the consumer has stopped; returns False then."""
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _list_directory(self, path: str) -> Tuple[List[str], List[FileEntry]]:
+        """List one directory, returning its subdirectories and files."""
+        directory_path = "/".join(p for p in (self.root, path) if p)
+        directory_client = self.share_client.get_directory_client(directory_path)
+
+        subdirectories = []
+        files = []
+        for item in directory_client.list_directories_and_files(include=['timestamps']):
+            item_path = f"{path}/{item['name']}" if path else item['name']
+            if item['is_directory']:
+                subdirectories.append(item_path)
+            else:
+                files.append(FileEntry(item_path, item['size'], item.get('last_modified')))
+
+        return subdirectories, files
+
+    def _run(self) -> None:
+        """Coordinate the listing: submit directories as they are discovered."""
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                pending = {executor.submit(self._list_directory, ""): ""}
+
+                while pending and not self._stop.is_set():
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        path = pending.pop(future)
+                        try:
+                            subdirectories, files = future.result()
+                        except ResourceNotFoundError:
+                            if path:
+                                print(f"Error traversing directory {path}: not found")
+                                self.errors.append(path)
+                            continue
+                        except Exception as e:
+                            print(f"Error traversing directory {path}: {str(e)}")
+                            self.errors.append(path)
+                            continue
+
+                        for entry in files:
+                            self._put((False, entry.path, entry))
+                        for subdirectory in subdirectories:
+                            if self._put((True, subdirectory, None)):
+                                pending[executor.submit(self._list_directory, subdirectory)] = subdirectory
+
+                for future in pending:
+                    future.cancel()
+        finally:
+            self._put(_DONE)
+
+    def start(self) -> 'ShareLister':
+        """Start listing in the background."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __iter__(self) -> Iterator[ListedItem]:
+        """Yield (is_directory, path, entry) items as they are discovered."""
+        if self._thread is None:
+            self.start()
+
+        try:
+            while True:
+                item = self.queue.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Stop listing and wait for the listing thread to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def to_plan(self) -> FilePlan:
+        """List everything and collect the result into a FilePlan."""
+        plan = FilePlan()
+        for is_directory, path, entry in self:
+            if is_directory:
+                plan.directories.add(path)
+            else:
+                plan.files[path] = entry
+        plan.errors.extend(self.errors)
+        return plan
@@ -0,0 +1,54 @@
+"""
+Share Sync Module
+Decides which files an incremental (differential) share sync has to copy or delete.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from src.core.file_plan import FileEntry
+
+
+def needs_copy(source: FileEntry, dest: Optional[FileEntry]) -> bool:
+    """
+    Check if a source file has to be copied to the destination.
+
+    A file is copied when it is missing at the destination, the sizes differ, or
+    (when both sides have a stored Content-MD5) the MD5s differ. Without MD5s the
+    file is copied if the source was modified after the destination was written.
+
+    Args:
+        source: Source file entry
+        dest: Destination file entry or None if missing
+
+    Returns:
+        True if the file is new or changed
+    """
+    if dest is None or source.size != dest.size:
+        return True
+
+    if source.content_md5 and dest.content_md5:
+        return bytes(source.content_md5) != bytes(dest.content_md5)
+
+    if source.last_modified is None or dest.last_modified is None:
+        return True
+
+    return source.last_modified > dest.last_modified
+
+
+def diff_file_sets(source_files: Dict[str, FileEntry],
+                   dest_files: Dict[str, FileEntry]) -> Tuple[List[str], List[str]]:
+    """
+    Compare source and destination listings.
+
+    Args:
+        source_files: Source entries keyed by relative path
+        dest_files: Destination entries keyed by relative path
+
+    Returns:
+        Tuple of (paths to copy, destination paths not present in the source)
+    """
+    to_copy = [path for path, entry in source_files.items()
+               if needs_copy(entry, dest_files.get(path))]
+    extraneous = [path for path in dest_files if path not in source_files]
+
+    return sorted(to_copy), sorted(extraneous)
@@ -0,0 +1,177 @@
+"""
+Throttle Module
+Adaptive (AIMD) concurrency limit and jittered backoff shared by all copy workers,
+driven by Azure Files throttling responses (429 / 503 ServerBusy).
+"""
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, Optional, TypeVar
+
+from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+
+from src.core.metrics import RETRYABLE_STATUSES
+
+
+THROTTLE_STATUSES = (429, 503)
+THROTTLE_ERROR_CODES = ('ServerBusy', 'TooManyRequests')
+
+T = TypeVar('T')
+
+
+def is_throttle_error(error: Exception) -> bool:
+    """Check if an exception is a throttling response from the service."""
+    return getattr(error, 'status_code', None) in THROTTLE_STATUSES or \
+        getattr(error, 'error_code', None) in THROTTLE_ERROR_CODES
+
+
+def is_transient_error(error: Optional[Exception]) -> bool:
+    """
+    Check if an exception is worth retrying later: throttling, a retryable HTTP status
+    or a dropped connection. Errors such as 403 or a missing source are not.
+    """
+    return is_throttle_error(error) or getattr(error, 'status_code', None) in RETRYABLE_STATUSES or \
+        isinstance(error, (ConnectionError, TimeoutError, ServiceRequestError, ServiceResponseError))
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit with additive increase / multiplicative decrease.
+
+    Workers take a slot before each file. Every throttled response halves the limit
+    (at most once per cooldown, so one burst of 503s counts once); every
+    increase_every successful operations (reported with on_success) raise it by one,
+    up to max_limit.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: Optional[int] = None,
+                 increase_every: int = 20, decrease_factor: float = 0.5, cooldown: float = 5.0,
+                 backoff_base: float = 1.0, backoff_cap: float = 60.0, max_retries: int = 5):
+        """
+        Initialize the limiter.
+
+        Args:
+            max_limit: Upper bound on concurrent operations (e.g. --workers)
+            min_limit: Lower bound on concurrent operations
+            initial: Starting limit (default: max_limit)
+            increase_every: Successful operations needed to raise the limit by one
+            decrease_factor: Factor applied to the limit on throttling
+            cooldown: Minimum seconds between two decreases
+            backoff_base: Base delay in seconds for jittered exponential backoff
+            backoff_cap: Maximum backoff delay in seconds
+            max_retries: Retries of a throttled operation before giving up
+        """
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = min(self.max_limit, max(self.min_limit, initial or self.max_limit))
+        self.increase_every = increase_every
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_retries = max_retries
+        self.in_use = 0
+        self.throttle_events = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Wait for a free slot under the current limit."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.in_use < self.limit)
+            self.in_use += 1
+
+    def try_acquire(self) -> bool:
+        """Take a free slot if there is one, without waiting (for asyncio callers)."""
+        with self._condition:
+            if self.in_use >= self.limit:
+                return False
+            self.in_use += 1
+            return True
+
+    def release(self) -> None:
+        """Return a slot."""
+        with self._condition:
+            self.in_use -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a slot for the duration of the block."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_success(self) -> None:
+        """Record a successful operation (additive increase)."""
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.increase_every and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    def on_throttle(self) -> None:
+        """Record a throttled response (multiplicative decrease)."""
+        with self._condition:
+            self.throttle_events += 1
+            self._successes = 0
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            new_limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+            if new_limit < self.limit:
+                print(f"Throttled by the service: concurrency {self.limit} -> {new_limit}")
+                self.limit = new_limit
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for the given retry attempt (0-based)."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Run func, retrying it with backoff while the service throttles it.
+        A success is not counted here: the caller reports it once per operation
+        with on_success, however many calls the operation made.
+
+        Raises:
+            The last exception if it is not a throttling error or retries are exhausted
+        """
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not is_throttle_error(e) or attempt >= self.max_retries:
+                    raise
+                self.on_throttle()
+                time.sleep(self.backoff_delay(attempt))
+                attempt += 1
+
+    async def call_async(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """Awaitable variant of call for coroutine functions (asyncio copier)."""
+        attempt = 0
+        while True:
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if not is_throttle_error(e) or attempt >= self.max_retries:
+                    raise
+                self.on_throttle()
+                await asyncio.sleep(self.backoff_delay(attempt))
+                attempt += 1
+
+    def response_hook(self, pipeline_response) -> None:
+        """
+        raw_response_hook for Azure SDK clients: every throttled attempt (including
+        the ones the SDK retries by itself) lowers the limit.
+        """
+        if pipeline_response.http_response.status_code in THROTTLE_STATUSES:
+            self.on_throttle()
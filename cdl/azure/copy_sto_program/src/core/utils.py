@@ -68,13 +68,14 @@ def check_storage_tiers(source_details: Dict[str, str],
         return False
 
 
-def check_quota(total_size: int, quota_bytes: int) -> bool:
+def check_quota(total_size: int, quota_bytes: int, interactive: bool = True) -> bool:
     """
     Check if destination has enough quota.
 
     Args:
         total_size: Total size needed in bytes
         quota_bytes: Available quota in bytes
+        interactive: Ask whether to continue when the quota is too small
 
     Returns:
         True if OK to continue
@@ -82,6 +83,8 @@ def check_quota(total_size: int, quota_bytes: int) -> bool:
     if total_size > quota_bytes:
         print(f"\n⚠ WARNING: Source total size ({format_bytes(total_size)}) "
               f"exceeds destination quota ({format_bytes(quota_bytes)})")
+        if not interactive:
+            return False
         response = input("Continue anyway? (yes/no): ")
         return response.lower() in ['yes', 'y']
     return True
@@ -3,11 +3,16 @@ Unit Tests for Azure File Share Copy Program
 """
 
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
 from pathlib import Path
 import hashlib
+import json
 import sys
 import os
+import tempfile
+import time
+import asyncio
+from datetime import datetime, timezone
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -15,6 +20,150 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Import modules to test
 from src.core.utils import format_bytes, calculate_md5_from_bytes, check_storage_tiers
 from src.config.settings import StorageAccountConfig, CopyConfig, EnvironmentConfig
+from src.core.manifest import CopyManifest
+from src.core.account_index import StorageAccountIndex
+from src.core.metrics import RunMetrics
+from src.core import resource_graph
+from src.core.sync import FileEntry, needs_copy, diff_file_sets
+from src.core.file_plan import FilePlan
+from src.core.throttle import AdaptiveLimiter, is_throttle_error, is_transient_error
+from src.core.client_pool import ClientPool
+from src.core import planner
+from src.core.path_filter import PathFilter, parse_shard
+
+try:
+    from src.core.azure_storage import FileShareCopier
+    from src.core.share_lister import ShareLister
+except ImportError:  # Azure SDK not installed
+    FileShareCopier = ShareLister = None
+
+try:
+    from src.core import batch
+except ImportError:  # Azure SDK not installed
+    batch = None
+
+try:
+    from src.core import azure_discovery
+except ImportError:  # Azure SDK not installed
+    azure_discovery = None
+
+try:
+    from src.core.async_copier import AsyncFileShareCopier, ByteBudget
+except ImportError:  # Azure SDK not installed
+    AsyncFileShareCopier = ByteBudget = None
+
+
+SOURCE_MTIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeShare:
+    """Minimal in-memory stand-in for a ShareClient."""
+
+    shares = {}
+
+    def __init__(self, files=None, name='share'):
+        self.name = name
+        self.files = dict(files or {})
+        self.md5s = {}
+        self.property_requests = 0
+        self.throttled_uploads = 0
+        self.failed_downloads = 0
+        self.directory_requests = []
+        self.unlistable = set()
+        self.modified = {path: SOURCE_MTIME for path in self.files}
+        FakeShare.shares[name] = self
+        self.directories = {""}
+        for path in self.files:
+            parts = path.split('/')[:-1]
+            for i in range(1, len(parts) + 1):
+                self.directories.add('/'.join(parts[:i]))
+
+    def get_directory_client(self, path=""):
+        share = self
+        directory = Mock()
+
+        def list_directories_and_files(**kwargs):
+            if path in share.unlistable:
+                raise IOError("connection reset")
+            prefix = f"{path}/" if path else ""
+            names = {}
+            for candidate in share.directories | set(share.files):
+                if candidate and candidate.startswith(prefix) and '/' not in candidate[len(prefix):]:
+                    names[candidate[len(prefix):]] = candidate in share.directories
+            return [{'name': n, 'is_directory': d,
+                     'size': None if d else len(share.files[prefix + n]),
+                     'last_modified': share.modified.get(prefix + n)}
+                    for n, d in sorted(names.items())]
+
+        directory.list_directories_and_files.side_effect = list_directories_and_files
+        def create_directory():
+            share.directory_requests.append(path)
+            share.directories.add(path)
+
+        directory.create_directory.side_effect = create_directory
+        return directory
+
+    def get_file_client(self, path):
+        share = self
+        file_client = Mock()
+        file_client.url = f"https://fake/{share.name}/{path}"
+        file_client.share_name = share.name
+        def get_file_properties():
+            share.property_requests += 1
+            return Mock(
+                size=len(share.files[path]),
+                last_modified=share.modified.get(path),
+                content_settings=Mock(content_md5=share.md5s.get(path)),
+                copy=Mock(status='success', progress=None)
+            )
+
+        def download_file(offset=None, length=None, **kwargs):
+            if share.failed_downloads:
+                share.failed_downloads -= 1
+                raise ConnectionResetError("connection reset")
+            data = bytes(share.files[path])
+            start = offset or 0
+            data = data[start:start + length] if length is not None else data[start:]
+            stream = Mock()
+            stream.chunks.side_effect = lambda: iter([data[i:i + 64] for i in range(0, len(data), 64)])
+            stream.readall.return_value = data
+            stream.readinto.side_effect = lambda target: target.write(data)
+            return stream
+
+        def create_file(size):
+            share.files[path] = bytearray(size)
+            share.modified[path] = datetime.now(timezone.utc)
+
+        def delete_file():
+            del share.files[path]
+
+        def upload_range(data, offset, length, **kwargs):
+            if share.throttled_uploads:
+                share.throttled_uploads -= 1
+                error = Exception("ServerBusy")
+                error.status_code = 503
+                raise error
+            if hasattr(data, 'read'):
+                data = data.read()
+            share.files[path][offset:offset + length] = data
+
+        def set_http_headers(content_settings, **kwargs):
+            share.md5s[path] = content_settings.content_md5
+
+        file_client.download_file.side_effect = download_file
+        file_client.create_file.side_effect = create_file
+        def start_copy_from_url(source_url):
+            source_name, source_path = source_url.split('?')[0][len("https://fake/"):].split('/', 1)
+            share.files[path] = bytearray(FakeShare.shares[source_name].files[source_path])
+            share.modified[path] = datetime.now(timezone.utc)
+            return {'copy_status': 'success'}
+
+        file_client.get_file_properties.side_effect = get_file_properties
+        file_client.upload_range.side_effect = upload_range
+        file_client.set_http_headers.side_effect = set_http_headers
+        file_client.start_copy_from_url.side_effect = start_copy_from_url
+        file_client.delete_file.side_effect = delete_file
+        return file_client
 
 
 class TestUtils(unittest.TestCase):
@@ -41,6 +190,701 @@ class TestUtils(unittest.TestCase):
         self.assertTrue(check_storage_tiers(source, dest))
 
 
+@unittest.skipIf(FileShareCopier is None, "Azure SDK not installed")
+class TestFileShareCopier(unittest.TestCase):
+    """Test FileShareCopier against an in-memory share."""
+
+    def setUp(self):
+        self.source = FakeShare(name='share', files={
+            'a.txt': b'alpha',
+            'dir/b.txt': b'bravo' * 100,
+            'dir/sub/c.txt': b'',
+        })
+        self.dest = FakeShare(name='dest')
+
+    def test_parallel_copy_matches_sequential_counts(self):
+        """Test that the worker pool copies every file and reports the same counts."""
+        for workers in (1, 4):
+            dest = FakeShare(name='dest')
+            copier = FileShareCopier(Mock(), Mock(), workers=workers)
+            successful, failed = copier.copy_plan(self.source, dest, copier.list_files(self.source),
+                                                  dest_root="root")
+            self.assertEqual((successful, failed), (3, 0))
+            self.assertEqual(bytes(dest.files['root/dir/b.txt']), b'bravo' * 100)
+
+    def test_file_plan_drives_sizing_and_copy(self):
+        """Test one listing pass feeds the size check and the copy without per-file requests."""
+        copier = FileShareCopier(Mock(), Mock(), workers=2)
+        copier.source_service_client.get_share_client.return_value = self.source
+        copier.dest_service_client.get_share_client.return_value = self.dest
+
+        plan = copier.build_file_plan('share')
+        self.assertEqual((plan.total_size, plan.file_count), (505, 3))
+        self.assertEqual(plan.sorted_directories(), ['dir', 'dir/sub'])
+
+        self.assertEqual(copier.copy_share('share', 'dest', 'root', plan=plan), (3, 0))
+        self.assertEqual(self.source.property_requests, 0)
+        self.assertIn('root/dir/sub', self.dest.directories)
+
+    def test_directories_created_by_level_and_skipped_on_rerun(self):
+        """Test directories are created parents first and not requested again on a resumed run."""
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = CopyManifest(Path(tmp) / 'manifest.db')
+            copier = FileShareCopier(Mock(), Mock(), manifest=manifest, list_workers=4)
+            plan = copier.list_files(self.source)
+            self.assertEqual(copier.copy_plan(self.source, self.dest, plan, dest_root='root'), (3, 0))
+            self.assertEqual(self.dest.directory_requests, ['root/dir', 'root/dir/sub'])
+
+            rerun = FileShareCopier(Mock(), Mock(), manifest=manifest)
+            self.assertEqual(rerun.copy_plan(self.source, self.dest, plan, dest_root='root'), (3, 0))
+            self.assertEqual(len(self.dest.directory_requests), 2)
+            manifest.close()
+
+    def test_share_lister_streams_directories_before_contents(self):
+        """Test the concurrent lister queues each directory before its files."""
+        seen = []
+        for is_directory, path, entry in ShareLister(self.source, workers=3):
+            parent = path.rsplit('/', 1)[0] if '/' in path else ""
+            if parent:
+                self.assertIn(parent, seen)
+            seen.append(path)
+        self.assertEqual(sorted(seen), ['a.txt', 'dir', 'dir/b.txt', 'dir/sub', 'dir/sub/c.txt'])
+
+    def test_share_lister_stops_when_consumer_leaves(self):
+        """Test leaving the iteration early releases a listing thread blocked on a full queue."""
+        files = {f'dir{i}/f{j}.txt': b'x' for i in range(5) for j in range(5)}
+        lister = ShareLister(FakeShare(name='many', files=files), workers=2, queue_size=2)
+        for _ in lister:
+            break
+        self.assertFalse(lister._thread.is_alive())
+
+    def test_verification_stores_content_md5_without_read_back(self):
+        """Test default verification sets Content-MD5 and never re-downloads the destination."""
+        copier = FileShareCopier(Mock(), Mock())
+        source_client = self.source.get_file_client('dir/b.txt')
+        dest_client = self.dest.get_file_client('b.txt')
+        self.assertTrue(copier.copy_file_with_verification(source_client, dest_client, 'dir/b.txt'))
+        self.assertEqual(bytes(self.dest.md5s['b.txt']), hashlib.md5(b'bravo' * 100).digest())
+        dest_client.download_file.assert_not_called()
+
+        deep_copier = FileShareCopier(Mock(), Mock(), deep_verify=True)
+        dest_client = self.dest.get_file_client('b.txt')
+        self.assertTrue(deep_copier.copy_file_with_verification(source_client, dest_client, 'dir/b.txt'))
+        dest_client.download_file.assert_called_once()
+
+    def test_parallel_ranges_keep_md5_in_order(self):
+        """Test a file split into concurrently transferred ranges is copied and hashed correctly."""
+        copier = FileShareCopier(Mock(), Mock(), chunk_size=64, range_workers=4)
+        source_client = self.source.get_file_client('dir/b.txt')
+        dest_client = self.dest.get_file_client('b.txt')
+        self.assertTrue(copier.copy_file_with_verification(source_client, dest_client, 'dir/b.txt'))
+        self.assertEqual(bytes(self.dest.files['b.txt']), b'bravo' * 100)
+        self.assertEqual(bytes(self.dest.md5s['b.txt']), hashlib.md5(b'bravo' * 100).digest())
+        self.assertEqual(dest_client.upload_range.call_count, 8)
+
+    def test_buffer_pool_caps_inflight_ranges(self):
+        """Test parallel files and ranges share a small buffer pool without deadlocking."""
+        files = {f'big{i}.bin': bytes(range(256)) * 8 for i in range(6)}
+        source = FakeShare(name='pooled', files=files)
+        copier = FileShareCopier(Mock(), Mock(), workers=4, chunk_size=64, range_workers=4,
+                                 max_inflight_bytes=3 * 64)
+        successful, failed = copier.copy_plan(source, self.dest, copier.list_files(source))
+        self.assertEqual((successful, failed), (6, 0))
+        self.assertLessEqual(copier.buffer_pool.allocated, 3)
+        for path, content in files.items():
+            self.assertEqual(bytes(self.dest.files[path]), content)
+            self.assertEqual(bytes(self.dest.md5s[path]), hashlib.md5(content).digest())
+
+    def test_metrics_report(self):
+        """Test copies feed the run metrics and the JSON report."""
+        metrics = RunMetrics(slowest_count=2)
+        copier = FileShareCopier(Mock(), Mock(), workers=2, metrics=metrics)
+        with metrics.phase('discover'):
+            time.sleep(0.2)
+        with metrics.phase('copy'):
+            copier.copy_plan(self.source, self.dest, copier.list_files(self.source), dest_root="root")
+            # In-progress rates use the time spent copying so far, not the whole run
+            in_progress = metrics.snapshot()
+            self.assertGreater(in_progress['bytes_per_second'], 505 / 0.2)
+        metrics.response_hook(Mock(http_response=Mock(status_code=503)))
+        metrics.response_hook(Mock(http_response=Mock(status_code=200)))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            report_path = Path(tmp) / 'report.json'
+            metrics.write_report(report_path, {'result': 'success'})
+            report = json.loads(report_path.read_text())
+
+        self.assertEqual((report['files_copied'], report['bytes_copied']), (3, 505))
+        self.assertEqual(report['retries'], {'503': 1})
+        self.assertEqual(len(report['slowest_files']), 2)
+        self.assertIn('copy', report['phase_seconds'])
+        self.assertIn('verify', report['cumulative_seconds'])
+        self.assertEqual(report['result'], 'success')
+
+    def test_throttled_ranges_retried_and_failed_files_requeued(self):
+        """Test throttling lowers the concurrency limit and nothing fails permanently."""
+        throttle = AdaptiveLimiter(max_limit=4, backoff_base=0)
+        copier = FileShareCopier(Mock(), Mock(), workers=4, throttle=throttle)
+        self.dest.throttled_uploads = 2
+        self.source.failed_downloads = 1
+
+        self.assertEqual(copier.run_file_jobs(self.source, self.dest, [
+            ('a.txt', 'a.txt', None), ('dir/b.txt', 'b.txt', None)]), (2, 0))
+        self.assertEqual(throttle.throttle_events, 2)
+        self.assertEqual(throttle.limit, 2)
+        self.assertEqual(bytes(self.dest.files['b.txt']), b'bravo' * 100)
+
+    def test_only_transient_failures_requeued_and_successes_counted_per_file(self):
+        """Test a missing source fails once, a dropped connection is re-queued and ranges don't count."""
+        throttle = AdaptiveLimiter(max_limit=8, initial=1, increase_every=1, backoff_base=0)
+        copier = FileShareCopier(Mock(), Mock(), workers=1, throttle=throttle, chunk_size=64)
+        self.source.failed_downloads = 1
+
+        with patch.object(copier, 'copy_file_with_verification',
+                          wraps=copier.copy_file_with_verification) as copy:
+            self.assertEqual(copier.run_file_jobs(self.source, self.dest, [
+                ('missing.txt', 'missing.txt', None), ('dir/b.txt', 'b.txt', None)]), (1, 1))
+
+        self.assertEqual([c.args[2] for c in copy.call_args_list], ['missing.txt', 'dir/b.txt', 'dir/b.txt'])
+        # dir/b.txt is copied in 8 ranges but succeeds once
+        self.assertEqual(throttle.limit, 2)
+
+    def test_manifest_resumes_partial_and_skips_verified(self):
+        """Test a rerun with a manifest resumes from the checkpoint and skips verified files."""
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = CopyManifest(Path(tmp) / 'manifest.sqlite')
+            last_modified = str(SOURCE_MTIME)
+
+            # Simulate an interrupted run: first 128 bytes written, rest still zero
+            self.dest.files['b.txt'] = bytearray((b'bravo' * 100)[:128]) + bytearray(372)
+            manifest.start_file('dir/b.txt', 500, last_modified)
+            manifest.update_progress('dir/b.txt', 128)
+
+            copier = FileShareCopier(Mock(), Mock(), manifest=manifest)
+            source_client = self.source.get_file_client('dir/b.txt')
+            dest_client = self.dest.get_file_client('b.txt')
+            self.assertTrue(copier.copy_file_with_verification(source_client, dest_client, 'dir/b.txt'))
+            dest_client.create_file.assert_not_called()
+            self.assertEqual(dest_client.upload_range.call_args_list[0].kwargs['offset'], 128)
+            self.assertEqual(bytes(self.dest.files['b.txt']), b'bravo' * 100)
+            self.assertTrue(manifest.is_verified('dir/b.txt', 500, last_modified))
+
+            dest_client = self.dest.get_file_client('b.txt')
+            self.assertTrue(copier.copy_file_with_verification(source_client, dest_client, 'dir/b.txt'))
+            dest_client.upload_range.assert_not_called()
+            manifest.close()
+
+    def test_sync_copies_only_delta(self):
+        """Test sync mode copies new/changed files and optionally deletes extraneous ones."""
+        copier = FileShareCopier(Mock(), Mock())
+        copier.source_service_client.get_share_client.return_value = self.source
+        copier.dest_service_client.get_share_client.return_value = self.dest
+
+        self.assertEqual(copier.sync_share('share', 'dest', 'root'), (3, 0))
+        self.assertEqual(copier.sync_share('share', 'dest', 'root'), (0, 0))
+
+        self.source.files['a.txt'] = b'alpha changed'
+        self.dest.files['root/stale.txt'] = b'old'
+        self.dest.modified['root/stale.txt'] = SOURCE_MTIME
+        self.assertEqual(copier.sync_share('share', 'dest', 'root', delete_extraneous=True), (1, 0))
+        self.assertEqual(bytes(self.dest.files['root/a.txt']), b'alpha changed')
+        self.assertNotIn('root/stale.txt', self.dest.files)
+
+    def test_sync_keeps_files_below_unlistable_source_directories(self):
+        """Test a source directory that fails to list does not get its destination files deleted."""
+        copier = FileShareCopier(Mock(), Mock(), list_workers=2)
+        copier.source_service_client.get_share_client.return_value = self.source
+        copier.dest_service_client.get_share_client.return_value = self.dest
+        self.assertEqual(copier.sync_share('share', 'dest', 'root'), (3, 0))
+
+        self.source.unlistable.add('dir')
+        self.dest.files['root/stale.txt'] = b'old'
+        self.dest.modified['root/stale.txt'] = SOURCE_MTIME
+        successful, failed = copier.sync_share('share', 'dest', 'root', delete_extraneous=True)
+
+        self.assertEqual((successful, failed), (0, 1))
+        self.assertIn('root/dir/b.txt', self.dest.files)
+        self.assertIn('root/dir/sub/c.txt', self.dest.files)
+        self.assertNotIn('root/stale.txt', self.dest.files)
+
+    def test_filter_and_shard_select_same_files_for_copy_and_sync(self):
+        """Test copy and sync match the filter on share-root paths and leave other shards alone."""
+        files = {f'dir/{i}.txt': b'x' for i in range(12)}
+        files.update({'dir/skip.tmp': b'x', 'top.txt': b'x'})
+        path_filter = PathFilter(include=['dir/*'], exclude=['*.tmp'], shard=(1, 3))
+        expected = {f'root/{p}' for p in files if path_filter.matches(p)}
+
+        copied = {}
+        for mode in ('copy', 'sync'):
+            source, dest = FakeShare(name='share', files=files), FakeShare(name='dest')
+            dest.files['root/top.txt'] = b'other'
+            dest.modified['root/top.txt'] = SOURCE_MTIME
+            copier = FileShareCopier(Mock(), Mock(), path_filter=path_filter)
+            copier.source_service_client.get_share_client.return_value = source
+            copier.dest_service_client.get_share_client.return_value = dest
+            if mode == 'copy':
+                copier.copy_share('share', 'dest', 'root')
+            else:
+                copier.sync_share('share', 'dest', 'root', delete_extraneous=True)
+            copied[mode] = set(dest.files) - {'root/top.txt'}
+            self.assertIn('root/top.txt', dest.files)
+
+        self.assertTrue(expected)
+        self.assertEqual(copied['copy'], expected)
+        self.assertEqual(copied['sync'], expected)
+
+    def test_server_side_copy(self):
+        """Test server-side mode copies via start_copy_from_url with a source SAS."""
+        source_service = Mock(credential=Mock(account_name='src', account_key='a2V5'))
+        copier = FileShareCopier(source_service, Mock(), server_side=True)
+        successful, failed = copier.copy_plan(self.source, self.dest, copier.list_files(self.source),
+                                              dest_root="root")
+        self.assertEqual((successful, failed), (3, 0))
+        self.assertEqual(bytes(self.dest.files['root/a.txt']), b'alpha')
+        self.assertIn('share', copier._source_sas_tokens)
+
+
+@unittest.skipIf(AsyncFileShareCopier is None, "Azure SDK not installed")
+class TestAsyncCopier(unittest.TestCase):
+    """Test the asyncio copy pipeline."""
+
+    def test_byte_budget_bounds_inflight_bytes(self):
+        """Test acquirers wait until enough bytes are released."""
+        async def scenario():
+            budget = ByteBudget(10)
+            await budget.acquire(8)
+            waiter = asyncio.ensure_future(budget.acquire(5))
+            await asyncio.sleep(0)
+            self.assertFalse(waiter.done())
+            await budget.release(8)
+            await waiter
+            self.assertEqual(budget.in_use, 5)
+
+        asyncio.run(scenario())
+
+    def test_copy_file_pipelines_ranges(self):
+        """Test a file is copied range by range, verified, and the budget is returned."""
+        data = bytes(range(256)) * 10
+        written = bytearray(len(data))
+        stored = {}
+
+        async def download_file(offset=None, length=None, **kwargs):
+            stream = Mock()
+            stream.readall = AsyncMock(return_value=data[offset:offset + length])
+            return stream
+
+        async def upload_range(chunk, offset, length, **kwargs):
+            written[offset:offset + length] = chunk
+
+        async def set_http_headers(content_settings, **kwargs):
+            stored['md5'] = content_settings.content_md5
+
+        async def get_file_properties():
+            return Mock(size=len(written), content_settings=Mock(content_md5=stored['md5']))
+
+        source = Mock(download_file=download_file)
+        dest = Mock(create_file=AsyncMock(), upload_range=upload_range,
+                    set_http_headers=set_http_headers, get_file_properties=get_file_properties)
+
+        async def scenario():
+            copier = AsyncFileShareCopier('src', 'a2V5', 'dst', 'a2V5', chunk_size=1000)
+            budget = ByteBudget(2000)
+            entry = FileEntry('f.bin', len(data), SOURCE_MTIME)
+            self.assertTrue(await copier.copy_file(source, dest, entry, budget))
+            self.assertEqual(budget.in_use, 0)
+
+        asyncio.run(scenario())
+        self.assertEqual(bytes(written), data)
+        self.assertEqual(bytes(stored['md5']), hashlib.md5(data).digest())
+
+    def test_copy_share_skips_files_below_missing_directories(self):
+        """Test files whose destination directory could not be created count as failed."""
+        plan = FilePlan(files={p: FileEntry(p, 1) for p in ('a.txt', 'dir/b.txt', 'ok/c.txt')},
+                        directories={'dir', 'ok'})
+        copier = AsyncFileShareCopier('src', 'a2V5', 'dst', 'a2V5')
+        copier.create_directories = AsyncMock(return_value={'dir'})
+        copier.copy_file = AsyncMock(return_value=True)
+
+        service = MagicMock()
+        service.__aenter__.return_value = Mock()
+        with patch('src.core.async_copier.ShareServiceClient', return_value=service):
+            self.assertEqual(asyncio.run(copier.copy_share('share', 'dest', plan)), (2, 1))
+        self.assertEqual(sorted(c.args[2].path for c in copier.copy_file.call_args_list),
+                         ['a.txt', 'ok/c.txt'])
+
+    def test_copy_share_throttles_and_requeues_transient_failures(self):
+        """Test files take limiter slots and only transiently failed files are copied again."""
+        plan = FilePlan(files={p: FileEntry(p, 1) for p in ('a.txt', 'busy.txt', 'denied.txt')})
+        throttle = AdaptiveLimiter(max_limit=2, backoff_base=0)
+        copier = AsyncFileShareCopier('src', 'a2V5', 'dst', 'a2V5', throttle=throttle)
+        copier.create_directories = AsyncMock(return_value=set())
+        forbidden = Exception("forbidden")
+        forbidden.status_code = 403
+        attempts = []
+
+        async def copy_file(source, dest, entry, budget):
+            self.assertLessEqual(throttle.in_use, throttle.limit)
+            attempts.append(entry.path)
+            if entry.path == 'denied.txt':
+                copier._last_errors[entry.path] = forbidden
+                return False
+            if entry.path == 'busy.txt' and attempts.count(entry.path) == 1:
+                copier._last_errors[entry.path] = ConnectionResetError("connection reset")
+                return False
+            return True
+
+        copier.copy_file = copy_file
+        service = MagicMock()
+        service.__aenter__.return_value = Mock()
+        with patch('src.core.async_copier.ShareServiceClient', return_value=service):
+            self.assertEqual(asyncio.run(copier.copy_share('share', 'dest', plan)), (2, 1))
+        self.assertEqual(sorted(attempts), ['a.txt', 'busy.txt', 'busy.txt', 'denied.txt'])
+        self.assertEqual(throttle.in_use, 0)
+
+
+class TestPlanner(unittest.TestCase):
+    """Test the dry-run histogram, probe sample and duration estimate."""
+
+    def setUp(self):
+        self.plan = FilePlan(files={
+            f'f{size}': FileEntry(f'f{size}', size) for size in (0, 100, 5000, 2 * 1024 * 1024, 10 ** 9)
+        })
+
+    def test_histogram_and_probe_sample(self):
+        """Test files are bucketed by size and the sample spans buckets within the byte budget."""
+        histogram = planner.size_histogram(self.plan)
+        self.assertEqual([b.files for b in histogram], [2, 1, 0, 1, 0, 1, 0])
+        self.assertEqual(sum(b.bytes for b in histogram), self.plan.total_size)
+
+        sample = planner.select_probe_sample(self.plan, max_files=10, max_bytes=4 * 1024 * 1024)
+        self.assertEqual(sorted(e.size for e in sample), [0, 100, 5000, 2 * 1024 * 1024])
+
+    def test_fitted_model_estimate(self):
+        """Test the per-file overhead and per-byte cost are recovered from probe timings."""
+        model = planner.fit_transfer_model([(0, 0.1), (1000, 1.1), (2000, 2.1)], probe_seconds=3.3)
+        self.assertAlmostEqual(model.per_file_seconds, 0.1)
+        self.assertAlmostEqual(model.seconds_per_byte, 0.001)
+        self.assertAlmostEqual(model.estimate(100, 10000, workers=4), (10 + 10) / 4)
+
+    @unittest.skipIf(FileShareCopier is None, "Azure SDK not installed")
+    def test_probe_cleans_up(self):
+        """Test the probe copies into a scratch directory and removes its files."""
+        source = FakeShare(name='probe-src', files={'a/x.bin': b'x' * 300, 'y.bin': b'y' * 10})
+        dest = FakeShare(name='probe-dst')
+        copier = FileShareCopier(Mock(), Mock(), workers=2)
+        copier.source_service_client.get_share_client.return_value = source
+        copier.dest_service_client.get_share_client.return_value = dest
+
+        plan = copier.list_files(source)
+        sample = planner.select_probe_sample(plan, 10, 1024)
+        model = planner.run_probe(copier, 'probe-src', 'probe-dst', sample, '.cts-probe')
+        self.assertEqual(model.probe_files, 2)
+        self.assertEqual(model.probe_bytes, 310)
+        self.assertEqual(dest.files, {})
+
+
+class TestPathFilter(unittest.TestCase):
+    """Test include/exclude patterns and path-hash sharding."""
+
+    def test_patterns_and_shards(self):
+        """Test globs, regexes and that shards partition the files exactly once."""
+        plan = FilePlan(files={p: FileEntry(p, 1) for p in (
+            'a.txt', 'docs/b.txt', 'docs/c.tmp', 'cache/d.txt', 'docs/deep/e.txt')})
+
+        selected = PathFilter(include=['docs/*'], exclude=['*.tmp']).apply(plan)
+        self.assertEqual(sorted(selected.files), ['docs/b.txt', 'docs/deep/e.txt'])
+        self.assertEqual(selected.directories, {'docs', 'docs/deep'})
+        self.assertFalse(PathFilter(exclude=['re:^cache/']).matches('cache/d.txt'))
+
+        shards = [PathFilter(shard=parse_shard(f"{i}/3")).apply(plan) for i in range(3)]
+        self.assertEqual(sorted(p for shard in shards for p in shard.files), sorted(plan.files))
+        with self.assertRaises(ValueError):
+            parse_shard('3/3')
+
+
+@unittest.skipIf(batch is None, "Azure SDK not installed")
+class TestBatch(unittest.TestCase):
+    """Test job files, the account pool and concurrent share pairs."""
+
+    def test_load_jobs_csv_and_yaml(self):
+        """Test both job file formats produce the same jobs."""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_file = Path(tmp) / 'jobs.csv'
+            csv_file.write_text("# migration wave 1\n"
+                                "source_storage_account,source_share,dest_storage_account,dest_share,dest_resource_group\n"
+                                "src1,data,dst1,data,rg-dst\n"
+                                "src1,logs,dst1,logs,\n")
+            yaml_file = Path(tmp) / 'jobs.yaml'
+            yaml_file.write_text("jobs:\n"
+                                 "  - {source_storage_account: src1, source_share: data, dest_storage_account: dst1,"
+                                 " dest_share: data, dest_resource_group: rg-dst}\n"
+                                 "  - {source_storage_account: src1, source_share: logs, dest_storage_account: dst1,"
+                                 " dest_share: logs}\n")
+            jobs = batch.load_jobs(csv_file)
+            self.assertEqual(jobs, batch.load_jobs(yaml_file))
+            self.assertEqual((jobs[0].dest_resource_group, jobs[1].dest_resource_group), ('rg-dst', None))
+
+            bad_file = Path(tmp) / 'bad.csv'
+            bad_file.write_text("source_storage_account,source_share\nsrc1,data\n")
+            with self.assertRaises(ValueError):
+                batch.load_jobs(bad_file)
+
+    def test_accounts_looked_up_once(self):
+        """Test concurrent jobs on the same account share one lookup, key and client."""
+        discovery = Mock()
+        discovery.locate_storage_account.return_value = ('sub', 'rg')
+        with patch.object(batch, 'AzureStorageManager') as manager_class:
+            pool = batch.AccountPool(Mock(), 'global', discovery)
+            pool.prefetch([('src1', None), ('SRC1', None), ('dst1', 'rg')])
+            self.assertIs(pool.get('src1'), pool.get('Src1'))
+        self.assertEqual(discovery.locate_storage_account.call_count, 2)
+        self.assertEqual(manager_class.call_count, 1)
+
+    def test_runner_copies_pairs(self):
+        """Test every pair is copied through pooled clients and reported."""
+        source = FakeShare(name='batch-src', files={'a.txt': b'alpha', 'd/b.txt': b'bravo'})
+        dests = {'one': FakeShare(name='one'), 'two': FakeShare(name='two')}
+        for share in dests.values():
+            share.get_share_properties = lambda: Mock(quota=1)
+
+        source_client, dest_client = Mock(), Mock()
+        source_client.get_share_client.return_value = source
+        dest_client.get_share_client.side_effect = lambda name: dests[name]
+        handles = {
+            'src': batch.AccountHandle('src', 'sub', 'rg', {'name': 'src', 'sku_name': 'Premium_LRS',
+                                                            'sku_tier': 'Premium'}, source_client),
+            'dst': batch.AccountHandle('dst', 'sub', 'rg', {'name': 'dst', 'sku_name': 'Standard_LRS',
+                                                            'sku_tier': 'Standard'}, dest_client),
+        }
+        accounts = Mock()
+        accounts.get.side_effect = lambda name, rg=None: handles[name]
+
+        throttle = AdaptiveLimiter(max_limit=2)
+        runner = batch.BatchRunner(accounts, {'workers': 2, 'throttle': throttle}, job_workers=2)
+        jobs = [batch.BatchJob('src', 'batch-src', 'dst', name) for name in dests]
+        copiers = []
+        copier_class = batch.FileShareCopier
+
+        def make_copier(*args, **kwargs):
+            copiers.append(copier_class(*args, **kwargs))
+            return copiers[-1]
+
+        with patch.object(batch, 'FileShareCopier', side_effect=make_copier):
+            results = runner.run(jobs)
+
+        # All jobs draw range buffers from one pool, so --max-inflight-mb caps the whole batch
+        self.assertEqual(len(copiers), 2)
+        self.assertIs(copiers[0].buffer_pool, copiers[1].buffer_pool)
+
+        self.assertEqual([r.status for r in results], ['success', 'success'])
+        self.assertEqual([r.successful for r in results], [2, 2])
+        for share in dests.values():
+            self.assertEqual(bytes(share.files['batch-src/d/b.txt']), b'bravo')
+
+
+class TestSync(unittest.TestCase):
+    """Test incremental sync change detection."""
+
+    def test_needs_copy(self):
+        """Test size, timestamp and MD5 rules."""
+        old = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        new = datetime(2026, 2, 1, tzinfo=timezone.utc)
+        self.assertTrue(needs_copy(FileEntry('a', 1, old), None))
+        self.assertTrue(needs_copy(FileEntry('a', 1, old), FileEntry('a', 2, new)))
+        self.assertTrue(needs_copy(FileEntry('a', 1, new), FileEntry('a', 1, old)))
+        self.assertFalse(needs_copy(FileEntry('a', 1, old), FileEntry('a', 1, new)))
+        self.assertFalse(needs_copy(FileEntry('a', 1, new, b'x'), FileEntry('a', 1, old, b'x')))
+        self.assertTrue(needs_copy(FileEntry('a', 1, old, b'x'), FileEntry('a', 1, new, b'y')))
+
+    def test_diff_file_sets(self):
+        """Test new, unchanged and extraneous files are classified."""
+        source = {'a': FileEntry('a', 1, SOURCE_MTIME), 'b': FileEntry('b', 1, SOURCE_MTIME)}
+        dest = {'b': FileEntry('b', 1, SOURCE_MTIME), 'c': FileEntry('c', 1, SOURCE_MTIME)}
+        self.assertEqual(diff_file_sets(source, dest), (['a'], ['c']))
+
+
+class TestCopyManifest(unittest.TestCase):
+    """Test the resumable copy manifest."""
+
+    def test_manifest_round_trip(self):
+        """Test progress, verification and invalidation of manifest entries."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'manifest.sqlite'
+            manifest = CopyManifest(path)
+            manifest.start_file('a/b.bin', 10, 't1')
+            manifest.update_progress('a/b.bin', 4)
+            manifest.close()
+
+            manifest = CopyManifest(path)
+            entry = manifest.get('a/b.bin')
+            self.assertEqual(entry.bytes_copied, 4)
+            self.assertFalse(manifest.is_verified('a/b.bin', 10, 't1'))
+
+            manifest.mark_verified('a/b.bin', 10, 't1', 'abc')
+            self.assertTrue(manifest.is_verified('a/b.bin', 10, 't1'))
+            self.assertFalse(manifest.is_verified('a/b.bin', 10, 't2'))
+
+            manifest.remove('a/b.bin')
+            self.assertIsNone(manifest.get('a/b.bin'))
+            manifest.close()
+
+
+class TestStorageAccountIndex(unittest.TestCase):
+    """Test the storage account location index."""
+
+    def test_index_round_trip_and_ttl(self):
+        """Test entries persist, expire with the TTL and are pruned by a full refresh."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'index.json'
+            index = StorageAccountIndex(path)
+            self.assertTrue(index.is_stale())
+            index.record('acct', 'sub-1', 'rg-1', 'Sub One')
+            index.save()
+
+            index = StorageAccountIndex(path)
+            self.assertEqual(index.lookup('acct').resource_group, 'rg-1')
+            self.assertIsNone(index.lookup('other'))
+            self.assertIsNone(StorageAccountIndex(path, ttl_hours=0).lookup('acct'))
+
+            scan_started_at = index.lookup('acct').indexed_at + 1
+            index.mark_refreshed(scan_started_at)
+            self.assertFalse(index.is_stale())
+            self.assertIsNone(index.lookup('acct'))
+
+
+@unittest.skipIf(azure_discovery is None, "Azure SDK not installed")
+class TestAzureDiscovery(unittest.TestCase):
+    """Test storage account discovery with the location index."""
+
+    def test_wrong_index_entry_is_forgotten_and_rediscovered(self):
+        """Test an account no longer at its indexed location is discovered again."""
+        from azure.core.exceptions import ResourceNotFoundError
+        with tempfile.TemporaryDirectory() as tmp:
+            index = StorageAccountIndex(Path(tmp) / 'index.json')
+            index.record('acct', 'old-sub', 'old-rg', 'Old Sub')
+            index.mark_refreshed(0)
+            discovery = azure_discovery.AzureDiscovery(Mock(), index=index)
+            clients = {'old-sub': Mock(), 'new-sub': Mock()}
+            clients['old-sub'].storage_accounts.get_properties.side_effect = ResourceNotFoundError('gone')
+            discovery._storage_client = lambda sub: clients[sub]
+            discovery._query_storage_accounts = lambda names=None: [
+                {'name': 'acct', 'subscriptionId': 'new-sub', 'resourceGroup': 'new-rg'}]
+
+            self.assertEqual(discovery.locate_storage_account('acct'), ('new-sub', 'new-rg'))
+            self.assertEqual(StorageAccountIndex(Path(tmp) / 'index.json').lookup('acct').subscription_id,
+                             'new-sub')
+            # A correct entry is used without another discovery
+            discovery._query_storage_accounts = Mock()
+            self.assertEqual(discovery.locate_storage_account('acct', 'new-rg'), ('new-sub', 'new-rg'))
+            discovery._query_storage_accounts.assert_not_called()
+
+
+@unittest.skipIf(resource_graph.ResourceGraphClient is None, "azure-mgmt-resourcegraph not installed")
+class TestResourceGraph(unittest.TestCase):
+    """Test Resource Graph storage account lookups."""
+
+    @patch('src.core.resource_graph.ResourceGraphClient')
+    def test_find_storage_accounts_follows_skip_token(self, mock_client):
+        """Test paged results are concatenated and names are filtered and quoted."""
+        mock_client.return_value.resources.side_effect = [
+            Mock(data=[{'name': 'a'}], skip_token='next'),
+            Mock(data=[{'name': 'b'}], skip_token=None),
+        ]
+        rows = resource_graph.ResourceGraphQuery(Mock()).find_storage_accounts(["a", "o'b"])
+
+        self.assertEqual(rows, [{'name': 'a'}, {'name': 'b'}])
+        requests = [c.args[0] for c in mock_client.return_value.resources.call_args_list]
+        self.assertIn("name in~ ('a', 'o\\'b')", requests[0].query)
+        self.assertEqual(requests[1].options.skip_token, 'next')
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    """Test the AIMD concurrency limiter."""
+
+    def test_additive_increase_multiplicative_decrease(self):
+        """Test the limit halves once per cooldown and recovers one step per successes."""
+        limiter = AdaptiveLimiter(max_limit=8, increase_every=2, backoff_base=0)
+        limiter.on_throttle()
+        limiter.on_throttle()
+        self.assertEqual(limiter.limit, 4)
+        for _ in range(4):
+            limiter.on_success()
+        self.assertEqual(limiter.limit, 6)
+
+        busy = Exception("busy")
+        busy.status_code = 429
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise busy
+            return 'ok'
+
+        self.assertTrue(is_throttle_error(busy))
+        self.assertEqual(limiter.call(flaky), 'ok')
+        self.assertEqual(len(attempts), 3)
+
+        async def flaky_async():
+            return flaky()
+
+        attempts.clear()
+        self.assertEqual(asyncio.run(limiter.call_async(flaky_async)), 'ok')
+        self.assertEqual(len(attempts), 3)
+
+        self.assertTrue(is_transient_error(ConnectionResetError("reset")))
+        forbidden = Exception("forbidden")
+        forbidden.status_code = 403
+        self.assertFalse(is_transient_error(forbidden))
+        self.assertFalse(is_transient_error(None))
+
+
+class TestClientPool(unittest.TestCase):
+    """Test the shared management client pool."""
+
+    def test_clients_shared_per_subscription_and_cloud(self):
+        """Test a client is created once per (cloud, subscription, type, credential)."""
+        pool = ClientPool()
+        credential = object()
+        client_class = Mock(side_effect=lambda *args, **kwargs: Mock())
+
+        first = pool.get(client_class, credential, 'sub-1')
+        self.assertIs(pool.get(client_class, credential, 'sub-1'), first)
+        pool.get(client_class, credential, 'sub-2')
+        china = pool.get(client_class, credential, 'sub-1', 'china')
+        self.assertIsNot(china, first)
+        pool.get(client_class, credential)
+
+        self.assertEqual(client_class.call_count, 4)
+        self.assertEqual(client_class.call_args_list[2].kwargs,
+                         {'base_url': 'https://management.chinacloudapi.cn',
+                          'credential_scopes': ['https://management.chinacloudapi.cn/.default']})
+        self.assertEqual(client_class.call_args_list[3].args, (credential,))
+
+        pool.clear()
+        first.close.assert_called_once()
+        self.assertEqual(len(pool), 0)
+
+
+@unittest.skipIf(FileShareCopier is None, "Azure SDK not installed")
+class TestBenchmark(unittest.TestCase):
+    """Test the benchmark harness on the simulated backend."""
+
+    def test_memory_backend_copies_dataset(self):
+        """Test a small generated tree is copied and verified through the simulated share."""
+        import benchmark
+        args = Mock(scale=0.01, latency_ms=0, bandwidth_mbps=0, throttle_above=0,
+                    adaptive=False, list_workers=4, verbose=False, backend='memory')
+        source, dest = benchmark.prepare_memory(args, 'deep')
+        report = benchmark.run_configuration(args, source, dest, workers=4, range_workers=2, chunk_size_mb=1)
+
+        self.assertEqual(report['failed'], 0)
+        self.assertEqual(report['files_copied'], 5)
+        copied = dest.get_share_client('bench-dst').files
+        for path, content in source.get_share_client('bench-src').files.items():
+            self.assertEqual(copied[f"bench-src/{path}"], content)
+
+
 class TestConfig(unittest.TestCase):
     """Test configuration classes."""
 
@@ -3,6 +3,18 @@
 Saves a modified file to \\csm1gadmsto001.file.core.windows.net\global-adm-shared\indus\Dyn_IP_validation
 with info of IPs if they are dynamic or not. Filename: vm_list_dyn_ip.csv
 
+VMs are checked concurrently (-workers at a time) with one set of clients per
+subscription, and every result is appended to the output CSV as soon as it is
+known. With -resume, VMs already checked in an existing output file are kept
+and only the rest (and earlier errors) are checked again; their results are
+appended to that file. When the run completes, the output is rewritten in
+masterfile order.
+
+The audit can also be used from other scripts:
+    from dyn_ip import DynIPAudit
+    audit = DynIPAudit(open_inventory(inventory_path), credentials, workers=32)
+    audit.run(masterfile_rows, output_path, resume=True)
+
 tsvetelin.maslarski-ext@ldc.com
 """
 
@@ -11,204 +23,283 @@ import csv
 import json
 import argparse
 import tempfile
-from azure.identity import DefaultAzureCredential, ClientSecretCredential, AzureAuthorityHosts
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from azure.mgmt.network import NetworkManagementClient
 from azure.mgmt.compute import ComputeManagementClient
 from azure.core.exceptions import HttpResponseError
 
-# ======================= SETUP ======================= #
+from azure_clients import get_credential, get_client
+from vm_inventory import open_inventory, resource_id_of
 
-parser = argparse.ArgumentParser(description="Check dynamic IP assignments of Azure VMs.")
-parser.add_argument("-input", help="Path to the input CSV file", required=False)
-parser.add_argument("-output", help="Path to the output CSV file", required=False)
-parser.add_argument("-inventory", help="Path to the Azure inventory file", required=False)
-args = parser.parse_args()
+# ======================= AUTHORITY SWITCHER ======================= #
 
-csv_path = args.input or os.environ.get("INDUS_MASTERFILE_PATH")
-output_path = args.output or os.environ.get("INDUS_DYNIP_OUTPUT_PATH")
-inventory_path = args.inventory or os.environ.get("INDUS_INVENTORY_PATH")
+china_prefixes = ["CSM4", "LAB4"]
+CHINA_CA_BUNDLE = "/home/GDC1-G-A-UNIX-001/tests/china_root_ca.pem"
 
-# parse args and get paths from env if not provided
-if not csv_path or not output_path or not inventory_path:
-    print(json.dumps({"error": "Missing INDUS_MASTERFILE_PATH, INDUS_DYNIP_OUTPUT_PATH, or INDUS_INVENTORY_PATH"}))
-    exit(1)
+# results that are final; anything else (ERROR, interrupted rows) is checked again on resume
+DONE_STATES = ("YES", "NO", "NO INV DATA")
 
-# ======================= AUTHORITY SWITCHER ======================= #
 
-CHINA_TENANT_ID = os.environ.get("CHINA_TENANT_ID")
-CHINA_CLIENT_ID = os.environ.get("CHINA_CLIENT_ID")
-CHINA_CLIENT_SECRET = os.environ.get("CHINA_CLIENT_SECRET")
-TENANT_ID = os.environ.get("TENANT_ID")
-CLIENT_ID = os.environ.get("CLIENT_ID")
-CLIENT_SECRET = os.environ.get("CLIENT_SECRET")
-china_prefixes = ["CSM4", "LAB4"]
+def get_authority(vm_name):
+    """
+    Returns 'china' or 'global' for a VM name.
+    """
+    return 'china' if any(vm_name.startswith(p) for p in china_prefixes) else 'global'
+
+
+def env_credentials():
+    """
+    Reads the SPN of each authority from the environment.
+    """
+    return {
+        'china': (os.environ.get("CHINA_TENANT_ID"), os.environ.get("CHINA_CLIENT_ID"),
+                  os.environ.get("CHINA_CLIENT_SECRET")),
+        'global': (os.environ.get("TENANT_ID"), os.environ.get("CLIENT_ID"),
+                   os.environ.get("CLIENT_SECRET")),
+    }
+
+
+def vm_key(row):
+    """
+    Name a masterfile or output row is matched on.
+    """
+    return (row.get("computerName") or row.get("name") or "").strip().upper()
+
+
+# ======================= AUDIT ENGINE ======================= #
+
+class DynIPAudit:
+    """
+    Checks whether the primary private IP of each VM is dynamic.
+
+    The China cloud's CA bundle is passed to its clients instead of being switched
+    in the environment, so China and Global VMs can be checked side by side.
+    """
 
-def authority_switcher(authority):
+    def __init__(self, inventory, credentials, workers=16, china_ca_bundle=CHINA_CA_BUNDLE):
+        """
+        Args:
+            inventory (VMInventory): Azure inventory (see vm_inventory)
+            credentials (dict): authority -> (tenant_id, client_id, client_secret)
+            workers (int): VMs checked at once
+            china_ca_bundle (str): CA bundle used for Azure China connections
+        """
+        self.inventory = inventory
+        self.credentials = credentials
+        self.workers = max(1, workers)
+        self.china_ca_bundle = china_ca_bundle
+
+    def clients(self, authority, sub_id):
+        """
+        Returns the shared (compute, network) clients of a subscription.
+        """
+        options = {}
+        if authority == 'china' and self.china_ca_bundle and os.path.exists(self.china_ca_bundle):
+            options["connection_verify"] = self.china_ca_bundle
+        cred = get_credential(authority, *self.credentials[authority], **options)
+        return (get_client(ComputeManagementClient, authority, sub_id, cred, **options),
+                get_client(NetworkManagementClient, authority, sub_id, cred, **options))
+
+    def locate(self, vm_name):
+        """
+        Returns (subscription_id, resource_group, azure_vm_name) of a VM, or None.
+        """
+        inv = self.inventory.by_computer_name(vm_name) or self.inventory.by_name(vm_name)
+        if not inv:
+            return None
+        parts = resource_id_of(inv).split("/")
+        if len(parts) < 9 or not parts[2] or not parts[4]:
+            return None
+        return parts[2], parts[4], (inv.get("name") or vm_name).strip()
+
+    def check(self, row):
+        """
+        Checks one masterfile row; returns a copy of it with the dynIP column set.
+        """
+        vm_name = vm_key(row)
+        row_result = row.copy()
+        row_result["dynIP"] = "NO INV DATA"
+
+        location = self.locate(vm_name)
+        if not location:
+            return row_result
+        sub_id, rg, azure_name = location
+
+        try:
+            compute_client, network_client = self.clients(get_authority(vm_name), sub_id)
+
+            # get vm object and its nics
+            vm = compute_client.virtual_machines.get(rg, azure_name)
+            nic_refs = vm.network_profile.network_interfaces
+
+            # check first ip config of first nic only
+            for nic_ref in nic_refs[:1]:
+                nic_name = nic_ref.id.split("/")[-1]
+                nic_rg = nic_ref.id.split("/")[4]
+                nic = network_client.network_interfaces.get(nic_rg, nic_name)
+                for ip_config in nic.ip_configurations[:1]:
+                    allocation = ip_config.private_ip_allocation_method
+                    row_result["dynIP"] = "YES" if allocation.lower() == "dynamic" else "NO"
+
+        # handle errors from azure sdk
+        except HttpResponseError as hte:
+            row_result["dynIP"] = "ERROR"
+            print(f"{vm_name}: {hte}")
+        except Exception as e:
+            row_result["dynIP"] = "ERROR"
+            print(f"{vm_name}: {e}")
+
+        return row_result
+
+    def run(self, vm_data, output_path, resume=False):
+        """
+        Checks all rows and streams the results to output_path as they complete.
+
+        With resume, new results are appended to the existing output, so an interrupted
+        resume still keeps every row found so far; until the run completes the file is not
+        in masterfile order. At the end the output is rewritten (via a temporary file) with
+        one row per VM in masterfile order.
+
+        Args:
+            vm_data (list): Masterfile rows
+            output_path (str): Output CSV
+            resume (bool): Keep finished rows of an existing output_path and only check the rest
+
+        Returns:
+            dict: Count of rows per dynIP value
+        """
+        fieldnames = list(vm_data[0].keys()) if vm_data else ["name"]
+        if "dynIP" not in fieldnames:
+            fieldnames.append("dynIP")
+
+        done = {}
+        output_fields = None
+        resuming = resume and os.path.exists(output_path)
+        if resuming:
+            with open(output_path, newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    if row.get("dynIP") in DONE_STATES:
+                        done[vm_key(row)] = row
+                output_fields = reader.fieldnames
+            print(f"Resuming: {len(done)} VM(s) already checked")
+
+        lock = threading.Lock()
+        pending = [row for row in vm_data if vm_key(row) not in done]
+
+        with open(output_path, "a" if resuming else "w", newline='', encoding='utf-8') as f:
+            # appended rows follow the header already in the file
+            writer = csv.DictWriter(f, fieldnames=output_fields or fieldnames, extrasaction='ignore')
+            if not output_fields:
+                writer.writeheader()
+            elif not ends_with_newline(output_path):
+                # the last row was cut off by an interruption; it is checked again
+                f.write("\r\n")
+
+            def write(row_result):
+                with lock:
+                    writer.writerow(row_result)
+                    f.flush()
+
+            # rows are written as they finish; finish() restores masterfile order
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(self.check, row) for row in pending]
+                for count, future in enumerate(as_completed(futures), 1):
+                    row_result = future.result()
+                    write(row_result)
+                    print(f"[{count}/{len(pending)}] {vm_key(row_result)}: {row_result['dynIP']}")
+
+        return self.finish(vm_data, output_path, fieldnames)
+
+    def finish(self, vm_data, output_path, fieldnames):
+        """
+        Rewrites output_path with the latest result of each masterfile VM, in masterfile order.
+
+        Returns:
+            dict: Count of rows per dynIP value
+        """
+        latest = {}
+        with open(output_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                latest[vm_key(row)] = row
+
+        summary = {}
+        temp_path = f"{output_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+            writer.writeheader()
+            for row in vm_data:
+                row_result = latest.get(vm_key(row))
+                if row_result is None:
+                    continue
+                writer.writerow(row_result)
+                summary[row_result["dynIP"]] = summary.get(row_result["dynIP"], 0) + 1
+        os.replace(temp_path, output_path)
+        return summary
+
+
+def ends_with_newline(path):
     """
-    Returns a credential object for the specified Azure authority.
+    Checks whether a file is empty or ends with a line break.
     """
-    if authority == 'china':
-        return ClientSecretCredential(
-            tenant_id=CHINA_TENANT_ID,
-            client_id=CHINA_CLIENT_ID,
-            client_secret=CHINA_CLIENT_SECRET,
-            authority=AzureAuthorityHosts.AZURE_CHINA
-        )
-    else:
-        return ClientSecretCredential(
-            tenant_id=TENANT_ID,
-            client_id=CLIENT_ID,
-            client_secret=CLIENT_SECRET
-            # authority=AzureAuthorityHosts.AZURE_PUBLIC_CLOUD
-        )
-
-def set_ca_bundle(authority):
-    if authority == 'china':
-        os.environ['REQUESTS_CA_BUNDLE'] = "/home/GDC1-G-A-UNIX-001/tests/china_root_ca.pem"
-        os.environ['SSL_CERT_FILE'] = "/home/GDC1-G-A-UNIX-001/tests/china_root_ca.pem"
-    else:
-        os.environ.pop('REQUESTS_CA_BUNDLE', None)
-        os.environ.pop('SSL_CERT_FILE', None)
-
-# ======================= CLEAN INVENTORY FILE ======================= #
-
-clean_inventory_path = inventory_path + ".clean.csv"
-
-# build a clean inventory file without the #type header
-with open(inventory_path, 'r', encoding='utf-8-sig') as original, open(clean_inventory_path, 'w', encoding='utf-8') as cleaned:
-    lines = original.readlines()
-    if lines and lines[0].startswith("#TYPE"):
-        cleaned.writelines(lines[1:])
-    else:
-        cleaned.writelines(lines)
-
-# ======================= INVENTORY COLLECTION ======================= #
-
-azure_inv_dict = {}
-# build a dict of vm_name -> subscription/resource group from inventory
-with open(clean_inventory_path, newline='', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        inv_key = row.get("computerName") or row.get("name")
-        if not inv_key:
-            continue
-        vm_name = inv_key.strip().upper()
-        resource_id = row.get("ResourceId", "")
-        if vm_name and resource_id:
-            try:
-                parts = resource_id.split("/")
-                sub_id = parts[2]
-                rg_name = parts[4]
-                azure_inv_dict[vm_name] = {
-                    "subscription_id": sub_id,
-                    "resource_group": rg_name,
-                }
-            except IndexError:
-                continue
-
-# ======================= MASTERFILE ======================= #
-
-# read all vms from the masterfile
-with open(csv_path, newline='', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    vm_data = list(reader)
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
 
 # ======================= DEBUG LOGGING ======================= #
 
-logfile = os.path.join(tempfile.gettempdir(), "debug_dynip.log")
-try:
-    with open(logfile, "w", encoding="utf-8") as log:
-        log.write("==== Inventory Keys Sample ====\n")
-        for i, k in enumerate(azure_inv_dict.keys()):
-            if i >= 10:
-                break
-            log.write(f"{k}\n")
-
-        log.write("\n==== Masterfile Names Sample ====\n")
-        for row in vm_data[:10]:
-            log.write(f"{row.get('computerName', row.get('name', '')).strip().upper()}\n")
-except Exception as e:
-    print(f"[WARN] Could not write to debug log: {e}")
-
-print("---- Inventory Sample Keys ----")
-print(list(azure_inv_dict.keys())[:10])
-print("---- Masterfile Sample Names ----")
-print([row.get("computerName", row.get("name", "")).strip().upper() for row in vm_data[:10]])
-
-# ======================= CHECK IP TYPE ======================= #
-
-# main loop: check each vm for dynamic ip
-results = []
-for row in vm_data:
-    vm_name = row.get("computerName", row.get("name", "")).strip().upper()
-    row_result = row.copy()
-    row_result["dynIP"] = "NO INV DATA"
-
-    inv = azure_inv_dict.get(vm_name)
-    if not inv:
-        results.append(row_result)
-        continue
-
-    sub_id = inv["subscription_id"]
-    rg = inv["resource_group"]
-
-    # get sub id and resource group for this vm
-    authority = 'china' if any(vm_name.startswith(p) for p in china_prefixes) else 'global'
-    set_ca_bundle(authority)
-    cred = authority_switcher(authority)
-
-    print(f"Checking {vm_name}")
-    print(f"Authority is: {authority}")
-
-    # build correct credential for this vm (china/global)
+def write_debug_log(inventory, vm_data):
+    logfile = os.path.join(tempfile.gettempdir(), "debug_dynip.log")
     try:
-        if authority == 'china':
-            compute_client = ComputeManagementClient(
-                cred, sub_id,
-                base_url="https://management.chinacloudapi.cn",
-                credential_scopes=["https://management.chinacloudapi.cn/.default"]
-            )
-            network_client = NetworkManagementClient(
-                cred, sub_id,
-                base_url="https://management.chinacloudapi.cn",
-                credential_scopes=["https://management.chinacloudapi.cn/.default"]
-            )
-        else:
-            compute_client = ComputeManagementClient(cred, sub_id)
-            network_client = NetworkManagementClient(cred, sub_id)
-
-        # create azure clients for the right cloud
-        vm = compute_client.virtual_machines.get(rg, vm_name)
-        nic_refs = vm.network_profile.network_interfaces
-
-        # get vm object and its nics
-        for nic_ref in nic_refs:
-            nic_name = nic_ref.id.split("/")[-1]
-            nic = network_client.network_interfaces.get(rg, nic_name)
-            for ip_config in nic.ip_configurations:
-                # check first ip config of first nic only
-                allocation = ip_config.private_ip_allocation_method
-                row_result["dynIP"] = "YES" if allocation.lower() == "dynamic" else "NO"
-                print(row_result)
-                break
-            break
-
-    # handle errors from azure sdk
-    except HttpResponseError as hte:
-        row_result["dynIP"] = "ERROR"
-        print(hte)
+        with open(logfile, "w", encoding="utf-8") as log:
+            log.write("==== Inventory Keys Sample ====\n")
+            for row in inventory.rows[:10]:
+                log.write(f"{vm_key(row)}\n")
+
+            log.write("\n==== Masterfile Names Sample ====\n")
+            for row in vm_data[:10]:
+                log.write(f"{vm_key(row)}\n")
     except Exception as e:
-        row_result["dynIP"] = "ERROR"
-        print(e)
+        print(f"[WARN] Could not write to debug log: {e}")
+
+
+# ======================= MAIN ======================= #
+
+def main():
+    parser = argparse.ArgumentParser(description="Check dynamic IP assignments of Azure VMs.")
+    parser.add_argument("-input", help="Path to the input CSV file", required=False)
+    parser.add_argument("-output", help="Path to the output CSV file", required=False)
+    parser.add_argument("-inventory", help="Path to the Azure inventory file", required=False)
+    parser.add_argument("-workers", type=int, default=16, help="VMs checked at once (default: 16)")
+    parser.add_argument("-resume", action="store_true",
+                        help="Keep VMs already checked in an existing output file and check only the rest")
+    args = parser.parse_args()
+
+    # parse args and get paths from env if not provided
+    csv_path = args.input or os.environ.get("INDUS_MASTERFILE_PATH")
+    output_path = args.output or os.environ.get("INDUS_DYNIP_OUTPUT_PATH")
+    inventory_path = args.inventory or os.environ.get("INDUS_INVENTORY_PATH")
+
+    if not csv_path or not output_path or not inventory_path:
+        print(json.dumps({"error": "Missing INDUS_MASTERFILE_PATH, INDUS_DYNIP_OUTPUT_PATH, or INDUS_INVENTORY_PATH"}))
+        exit(1)
+
+    # read the inventory (indexed, see vm_inventory) and all vms from the masterfile
+    inventory = open_inventory(inventory_path)
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        vm_data = list(csv.DictReader(f))
 
+    write_debug_log(inventory, vm_data)
 
-    results.append(row_result)
+    audit = DynIPAudit(inventory, env_credentials(), workers=args.workers)
+    summary = audit.run(vm_data, output_path, resume=args.resume)
+    print(json.dumps({"output": output_path, "results": summary}))
 
-# ======================= OUTPUT CSV ======================= #
 
-# write results to output csv
-fieldnames = list(results[0].keys()) if results else ["name", "dynIP"]
-with open(output_path, "w", newline='', encoding='utf-8') as f:
-    writer = csv.DictWriter(f, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(results)
+if __name__ == "__main__":
+    main()
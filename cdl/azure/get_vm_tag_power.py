@@ -7,17 +7,16 @@ SPN authentication is used for both Azure Global and Azure China.
 Author: tsvetelin.maslarski-ext@ldc.com
 """
 
-import os
 import sys
-import csv
-import io
 import json
 from datetime import datetime
-from azure.identity import ClientSecretCredential, AzureAuthorityHosts
 from azure.mgmt.compute import ComputeManagementClient
 from azure.core.exceptions import HttpResponseError
 from decouple import config
 
+import azure_clients
+import vm_inventory
+
 
 class AzureVMTagReader:
     """
@@ -30,13 +29,6 @@ class AzureVMTagReader:
     INVENTORY_PREFIX = "azure_VMs_inventory-global-china-"
     CSV_EXT = ".csv"
 
-    # China specific settings
-    CHINA_ARM_ENDPOINT = "https://management.chinacloudapi.cn"
-    MGMT_CLIENT_KWARGS = {
-        'base_url': CHINA_ARM_ENDPOINT,
-        'credential_scopes': [f"{CHINA_ARM_ENDPOINT}/.default"]
-    }
-
     def __init__(self):
         """
         Initialize the AzureVMTagReader.
@@ -76,32 +68,8 @@ class AzureVMTagReader:
         if not vm_name:
             raise ValueError("VM name must be provided")
 
-        today_file = f"{self.INVENTORY_PREFIX}{self.get_today()}{self.CSV_EXT}"
-        full_path = os.path.join(self.INVENTORY_DIR, today_file)
-
-        if not os.path.exists(full_path):
-            raise FileNotFoundError(f"Inventory not found at: {full_path}")
-
-        with open(full_path, encoding="utf-8-sig") as f:
-            lines = f.readlines()
-
-        # Skip metadata line if present
-        if lines and lines[0].startswith("#TYPE"):
-            lines = lines[1:]
-
-        # Rebuild a file-like object with cleaned content
-        clean_file = io.StringIO("".join(lines))
-        reader = csv.DictReader(clean_file)
-
-        for row in reader:
-            if row.get("name", "").strip().upper() == vm_name.upper():
-                return {
-                    "subscription_id": row.get("subscriptionId"),
-                    "resource_group": row.get("resourceGroup"),
-                    "vm_name": row.get("name"),
-                }
-
-        return None
+        full_path = vm_inventory.inventory_path(self.get_today(), self.INVENTORY_DIR)
+        return vm_inventory.load_inventory(vm_name, full_path)
 
     @staticmethod
     def determine_azure_space(vm_name):
@@ -112,21 +80,12 @@ class AzureVMTagReader:
 
     def get_compute_client(self, azure_space, subscription_id):
         if azure_space == 'global':
-            credential = ClientSecretCredential(
-                tenant_id=self.azure_tenant_id,
-                client_id=self.azure_client_id,
-                client_secret=self.azure_client_secret,
-            )
-            return ComputeManagementClient(credential, subscription_id)
+            credential = azure_clients.get_credential('global', self.azure_tenant_id, self.azure_client_id, self.azure_client_secret)
+            return azure_clients.get_client(ComputeManagementClient, 'global', subscription_id, credential)
 
         elif azure_space == 'china':
-            credential = ClientSecretCredential(
-                tenant_id=self.azure_china_tenant_id,
-                client_id=self.azure_china_client_id,
-                client_secret=self.azure_china_client_secret,
-                authority=AzureAuthorityHosts.AZURE_CHINA
-            )
-            return ComputeManagementClient(credential, subscription_id, **self.MGMT_CLIENT_KWARGS)
+            credential = azure_clients.get_credential('china', self.azure_china_tenant_id, self.azure_china_client_id, self.azure_china_client_secret)
+            return azure_clients.get_client(ComputeManagementClient, 'china', subscription_id, credential)
 
         else:
             raise ValueError(f"Unknown Azure space: {azure_space}")
@@ -13,17 +13,16 @@ Example:
 Author: tsvetelin.maslarski-ext@ldc.com
 """
 
-import os
 import sys
-import csv
-import io
 import json
 from datetime import datetime
-from azure.identity import ClientSecretCredential, AzureAuthorityHosts
 from azure.mgmt.compute import ComputeManagementClient
 from azure.core.exceptions import HttpResponseError
 from decouple import config
 
+import azure_clients
+import vm_inventory
+
 # Inventory setup - matches azure_power_manager.py pattern
 INVENTORY_DIR = "/mnt/opcon-archive/Archive/7D/UPD"
 INVENTORY_PREFIX = "azure_VMs_inventory-global-china-"
@@ -39,13 +38,6 @@ AZURE_CHINA_TENANT_ID = config('tenant_id_china')
 AZURE_CHINA_CLIENT_ID = config('client_id_china')
 AZURE_CHINA_CLIENT_SECRET = config('client_secret_china')
 
-# China specific settings
-CHINA_ARM_ENDPOINT = "https://management.chinacloudapi.cn"
-MGMT_CLIENT_KWARGS = {
-    'base_url': CHINA_ARM_ENDPOINT,
-    'credential_scopes': [f"{CHINA_ARM_ENDPOINT}/.default"]
-}
-
 
 def get_today():
     """Generate a string with the format of the date (today) to match the inventory naming convention."""
@@ -54,35 +46,10 @@ def get_today():
 
 def load_inventory(vm_name):
     """
-    Load VM information from the CSV inventory file.
+    Load VM information from the CSV inventory file (through its shared index, see vm_inventory).
     Returns a dictionary with subscription_id, resource_group, and vm_name.
     """
-    today_file = f"{INVENTORY_PREFIX}{get_today()}{CSV_EXT}"
-    full_path = os.path.join(INVENTORY_DIR, today_file)
-
-    if not os.path.exists(full_path):
-        raise FileNotFoundError(f"Inventory not found at: {full_path}")
-
-    with open(full_path, encoding="utf-8-sig") as f:
-        lines = f.readlines()
-
-    # Skip metadata line if present (e.g., "#TYPE Selected.Microsoft.Azure.Commands.Compute.Models.PSVirtualMachine")
-    if lines and lines[0].startswith("#TYPE"):
-        lines = lines[1:]
-
-    # Rebuild a file-like object with cleaned content
-    clean_file = io.StringIO("".join(lines))
-    reader = csv.DictReader(clean_file)
-
-    for row in reader:
-        if row.get("name", "").strip().upper() == vm_name.upper():
-            return {
-                "subscription_id": row.get("subscriptionId"),
-                "resource_group": row.get("resourceGroup"),
-                "vm_name": row.get("name"),
-            }
-
-    return None
+    return vm_inventory.load_inventory(vm_name, vm_inventory.inventory_path(get_today(), INVENTORY_DIR))
 
 
 def determine_azure_space(vm_name):
@@ -98,24 +65,15 @@ def determine_azure_space(vm_name):
 
 def get_compute_client(azure_space, subscription_id):
     """
-    Create and return a ComputeManagementClient based on the Azure space (global or china).
+    Return the shared ComputeManagementClient of a subscription in the Azure space (global or china).
     """
     if azure_space == 'global':
-        credential = ClientSecretCredential(
-            tenant_id=AZURE_TENANT_ID,
-            client_id=AZURE_CLIENT_ID,
-            client_secret=AZURE_CLIENT_SECRET,
-        )
-        return ComputeManagementClient(credential, subscription_id)
+        credential = azure_clients.get_credential('global', AZURE_TENANT_ID, AZURE_CLIENT_ID, AZURE_CLIENT_SECRET)
+        return azure_clients.get_client(ComputeManagementClient, 'global', subscription_id, credential)
 
     elif azure_space == 'china':
-        credential = ClientSecretCredential(
-            tenant_id=AZURE_CHINA_TENANT_ID,
-            client_id=AZURE_CHINA_CLIENT_ID,
-            client_secret=AZURE_CHINA_CLIENT_SECRET,
-            authority=AzureAuthorityHosts.AZURE_CHINA
-        )
-        return ComputeManagementClient(credential, subscription_id, **MGMT_CLIENT_KWARGS)
+        credential = azure_clients.get_credential('china', AZURE_CHINA_TENANT_ID, AZURE_CHINA_CLIENT_ID, AZURE_CHINA_CLIENT_SECRET)
+        return azure_clients.get_client(ComputeManagementClient, 'china', subscription_id, credential)
 
     else:
         raise ValueError(f"Unknown Azure space: {azure_space}")
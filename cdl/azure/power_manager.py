@@ -11,9 +11,12 @@ from pathlib import Path
 from azure.identity import DefaultAzureCredential, ClientSecretCredential
 from azure.mgmt.resource import SubscriptionClient, ResourceManagementClient
 from azure.mgmt.compute import ComputeManagementClient
+from azure.core.exceptions import HttpResponseError
 from typing import TextIO, Optional
 from decouple import config
 
+from vm_graph import find_vm, get_power_state
+
 class AzureVMManager:
     
     def __init__(self):
@@ -81,6 +84,28 @@ class AzureVMManager:
             return False
 
     def search_for_vm(self):
+        # one Resource Graph query first, the subscription/RG crawl only as fallback
+        try:
+            vm_info = self.search_for_vm_graph()
+        except HttpResponseError as e:
+            print(f"Resource Graph query failed, falling back to subscription scan: {e.message}")
+            vm_info = None
+        if vm_info:
+            return vm_info
+        return self.search_for_vm_scan()
+
+    def search_for_vm_graph(self):
+        # find the VM by computer name across all subscriptions with a single Resource Graph query
+        vm_info = find_vm(self.credential, self._vm_name)
+        if not vm_info:
+            return None
+        return {
+            "subscription_id": vm_info["subscription_id"],
+            "resource_group": vm_info["resource_group"],
+            "vm_resource_name": vm_info["vm_name"]
+        }
+
+    def search_for_vm_scan(self):
         # brute-force search for VM by computer name across all subscriptions/RGs
         sub_client = SubscriptionClient(self.credential)
         for sub in sub_client.subscriptions.list():
@@ -125,7 +150,7 @@ class AzureVMManager:
                 pass  # the instance view will pull the info anyway, so we don't need extra actions here
 
             instance_view = compute_client.virtual_machines.instance_view(rg, vm_name)
-            power_state = next((s.display_status for s in instance_view.statuses if "PowerState" in s.code), "Unknown")
+            power_state = get_power_state(instance_view) or "Unknown"
 
             return {
                 "vm": self._vm_name,
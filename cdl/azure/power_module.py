@@ -43,9 +43,37 @@ options:
       - stop
       - deallocate
 
+  wait:
+    description:
+      - Wait for the power operation to finish.
+      - With C(false) the module returns as soon as the request is accepted, with an
+        operation_token that a later call (same vm_name and action) uses to check on it.
+    type: bool
+    default: true
+
+  timeout:
+    description:
+      - Seconds to wait for the operation. Defaults to 90 for start and no limit for stop/deallocate.
+      - On timeout the module fails and returns the operation_token.
+    type: int
+
+  polling_interval:
+    description:
+      - Seconds between status polls when Azure does not send a Retry-After header.
+    type: int
+    default: 5
+
+  operation_token:
+    description:
+      - Token returned by an earlier call; reports (and with wait, awaits) that operation
+        instead of sending a new request.
+      - Such a status check never reports changed; the call that sent the request did.
+    type: str
+
 notes:
   - This module must be executed on EE node.
   - Inventory file path is hardcoded inside the module (/mnt/opcon-archive/Archive/7D/UPD/).
+  - Lookups use the vm_inventory module_utils, which keeps an indexed SQLite copy of the inventory next to the CSV (<csv>.idx.sqlite).
   - The inventory file is automatically resolved as "/mnt/opcon-archive/Archive/7D/UPD/azure_VMs_inventory-global-china-<today>.csv".
   - The bellow environment variables must be provided (injected via AAP credentials or vault).
   - AZURE_CLIENT_ID
@@ -63,6 +91,19 @@ EXAMPLES = r'''
   azure_power_manager:
     vm_name: "CSM1KPOCVMW916"
     action: "deallocate"
+
+- name: Send a deallocate without waiting
+  azure_power_manager:
+    vm_name: "CSM1KPOCVMW916"
+    action: "deallocate"
+    wait: false
+  register: dealloc
+
+- name: Wait for it later
+  azure_power_manager:
+    vm_name: "CSM1KPOCVMW916"
+    action: "deallocate"
+    operation_token: "{{ dealloc.operation_token }}"
 '''
 
 RETURN = r'''
@@ -92,6 +133,16 @@ status:
   returned: always
   sample: "success"
 
+operation_status:
+  description: Status of the Azure operation (e.g. InProgress, Succeeded).
+  type: str
+  returned: when a request was sent
+
+operation_token:
+  description: Continuation token of an unfinished operation, to pass back as operation_token.
+  type: str
+  returned: when the operation has not finished
+
 error:
   description: Error message if operation failed.
   type: str
@@ -107,11 +158,13 @@ os.environ['SSL_CERT_FILE'] = '/etc/pki/ca-trust/source/anchors/ChinaChain.pem'
 # Export the NetSkope bundle to be able to connect to Azure China
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-import csv
 import re
-import io
-import time
-from azure.identity import ClientSecretCredential, AzureAuthorityHosts
+try:
+    from ansible.module_utils.vm_inventory import load_inventory as find_vm
+    from ansible.module_utils.azure_clients import get_credential, get_client
+except ImportError:
+    from vm_inventory import load_inventory as find_vm
+    from azure_clients import get_credential, get_client
 from azure.mgmt.compute import ComputeManagementClient
 from azure.core.exceptions import HttpResponseError
 from decouple import config
@@ -121,83 +174,39 @@ from decouple import config
 # AZURE_TENANT_ID = os.environ.get("AZURE_TENANT_ID")
 # AZURE_SECRET = os.environ.get("AZURE_CLIENT_SECRET")
 
-# inventory setup
-INVENTORY_DIR = "/mnt/opcon-archive/Archive/7D/UPD"
-INVENTORY_PREFIX = "azure_VMs_inventory-global-china-"
-CSV_EXT = ".csv"
 
 def connector(authority):
     """
-    Returns a credential object for the specified Azure authority.
+    Returns the shared credential object for the specified Azure authority.
     """
     if authority == 'china':
-
-        return ClientSecretCredential(
-            tenant_id=os.environ.get("CHINA_TENANT_ID") or config('TENANT_ID_CHINA'),
-            client_id=os.environ.get("CHINA_CLIENT_ID") or config('CLIENT_ID_CHINA'),
-            client_secret=os.environ.get("CHINA_CLIENT_SECRET") or config('CLIENT_SECRET_CHINA'),
-            authority=AzureAuthorityHosts.AZURE_CHINA
-            # authority="https://login.chinacloudapi.cn/"
+        return get_credential(
+            'china',
+            os.environ.get("CHINA_TENANT_ID") or config('TENANT_ID_CHINA'),
+            os.environ.get("CHINA_CLIENT_ID") or config('CLIENT_ID_CHINA'),
+            os.environ.get("CHINA_CLIENT_SECRET") or config('CLIENT_SECRET_CHINA')
         )
     else:
-        del os.environ['REQUESTS_CA_BUNDLE']
-        del os.environ['SSL_CERT_FILE']
-        return ClientSecretCredential(
-            tenant_id=os.environ.get("AZURE_TENANT_ID") or config('AZURE_TENANT_ID'),
-            client_id=os.environ.get("AZURE_CLIENT_ID") or config('AZURE_CLIENT_ID'),
-            client_secret=os.environ.get("AZURE_CLIENT_SECRET") or config('AZURE_CLIENT_SECRET')
+        os.environ.pop('REQUESTS_CA_BUNDLE', None)
+        os.environ.pop('SSL_CERT_FILE', None)
+        return get_credential(
+            'global',
+            os.environ.get("AZURE_TENANT_ID") or config('AZURE_TENANT_ID'),
+            os.environ.get("AZURE_CLIENT_ID") or config('AZURE_CLIENT_ID'),
+            os.environ.get("AZURE_CLIENT_SECRET") or config('AZURE_CLIENT_SECRET')
         )
 
 
 def get_compute_client(authority, sub_id, creds):
-    # Gets the ComputeManagementClient based on the authority
+    # Gets the shared ComputeManagementClient of the subscription for the authority
     if authority == 'china':
-        compute_client = ComputeManagementClient(
-            creds,
-            sub_id,
-            base_url="https://management.chinacloudapi.cn",
-            credential_scopes=["https://management.chinacloudapi.cn/.default"],
-            connection_verify=False
-        )
-    else:
-        compute_client = ComputeManagementClient(creds, sub_id)
+        return get_client(ComputeManagementClient, authority, sub_id, creds, connection_verify=False)
+    return get_client(ComputeManagementClient, authority, sub_id, creds)
 
-    return compute_client
 
-# generates a string for today's tag and loads the file to grep required info
+# looks the VM up in the indexed copy of today's inventory (vm_inventory knows its location)
 def load_inventory(vm_name):
-    today_file = f"{INVENTORY_PREFIX}{get_today()}{CSV_EXT}"
-    full_path = os.path.join(INVENTORY_DIR, today_file)
-
-    if not os.path.exists(full_path):
-        raise FileNotFoundError(f"Inventory not found at: {full_path}")
-
-    with open(full_path, encoding="utf-8-sig") as f:
-        lines = f.readlines()
-
-    # Skip metadata line if present
-    if lines and lines[0].startswith("#TYPE"):
-        lines = lines[1:]
-
-    # Rebuild a file-like object with cleaned content
-    clean_file = io.StringIO("".join(lines))
-    reader = csv.DictReader(clean_file)
-
-    for row in reader:
-        if row.get("name", "").strip().upper() == vm_name.upper():
-            return {
-                "subscription_id": row.get("subscriptionId"),
-                "resource_group": row.get("resourceGroup"),
-                "vm_name": row.get("name"),
-            }
-
-    return None
-
-
-# generate a string with the format of the date(today) to match the inventory naming convention
-def get_today():
-    from datetime import datetime
-    return datetime.today().strftime("%Y%m%d")
+    return find_vm(vm_name)
 
 
 # gets the current power state (running, stopped etc.)
@@ -209,8 +218,29 @@ def get_power_state(instance_view):
     return "Unknown"
 
 
+# seconds to wait for each action unless the timeout option is set (None waits until done)
+DEFAULT_TIMEOUTS = {"start": 90, "stop": None, "deallocate": None}
+
+
+# sends the power request, or resumes one from its operation token, and returns the LRO poller
+def begin_action(compute_client, rg, vm_resource, action, polling_interval, operation_token=None):
+    kwargs = {"polling_interval": polling_interval}
+    if operation_token:
+        kwargs["continuation_token"] = operation_token
+
+    if action == "start":
+        return compute_client.virtual_machines.begin_start(rg, vm_resource, **kwargs)
+    elif action == "stop":
+        return compute_client.virtual_machines.begin_power_off(rg, vm_resource, **kwargs)
+    elif action == "deallocate":
+        return compute_client.virtual_machines.begin_deallocate(rg, vm_resource, **kwargs)
+    return None
+
+
 # execute the called action
-def manage_vm(vm_name, action):
+# wait=False sends the request and returns its operation_token; calling again with the
+# token reports the status of that operation (and waits for it when wait=True)
+def manage_vm(vm_name, action, wait=True, timeout=None, polling_interval=5, operation_token=None):
     vm_info = load_inventory(vm_name)
     if not vm_info:
         return {
@@ -219,77 +249,58 @@ def manage_vm(vm_name, action):
           "msg": f"VM '{vm_name}' not found in inventory."
         }
 
-    # credentials = ClientSecretCredential(
-    #     tenant_id=AZURE_TENANT_ID,
-    #     client_id=AZURE_CLIENT_ID,
-    #     client_secret=AZURE_SECRET
-    # )
-
     authority = 'china' if any(p in vm_name for p in china_prefixes) else 'global'
     credentials = connector(authority)
 
-    # compute_client = ComputeManagementClient(credentials, vm_info["subscription_id"])
     compute_client = get_compute_client(authority, vm_info["subscription_id"], credentials)
     rg = vm_info["resource_group"]
     vm_resource = vm_info["vm_name"]
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUTS.get(action)
 
     try:
-        instance_view = compute_client.virtual_machines.instance_view(rg, vm_resource)
-        current_state = get_power_state(instance_view)
-
-        if action == "start" and current_state == "VM running":
-            return {"changed": False, "msg": "VM is already running."}
-        if action in ["stop", "deallocate"] and current_state == "VM deallocated":
-            return {"changed": False, "msg": "VM is already deallocated."}
-
-        if action == "start":
-            # push the request, don't wait
-            compute_client.virtual_machines.begin_start(rg, vm_resource)
-            # poll state until running
-            max_wait = 90
-            interval = 5
-            waited = 0
-
-            while waited < max_wait:
-                time.sleep(interval)
-                waited += interval
-                instance_view = compute_client.virtual_machines.instance_view(rg, vm_resource)
-                power_state = get_power_state(instance_view)
-
-                if power_state == "VM running":
-                    return {
-                        "changed": True,
-                        "msg": "VM started successfully.",
-                        "vm": vm_resource,
-                        "power_state": power_state
-                    }
-
-            return {
-                "failed": True,
-                "changed": True,
-                "msg": f"VM start operation timed out after {max_wait}s.",
-                "vm": vm_resource,
-                "power_state": power_state
-            }
-
-        elif action == "stop":
-            compute_client.virtual_machines.begin_power_off(rg, vm_resource).wait()
-        elif action == "deallocate":
-            compute_client.virtual_machines.begin_deallocate(rg, vm_resource).wait()
-        else:
+        if not operation_token:
+            instance_view = compute_client.virtual_machines.instance_view(rg, vm_resource)
+            current_state = get_power_state(instance_view)
+
+            if action == "start" and current_state == "VM running":
+                return {"changed": False, "msg": "VM is already running."}
+            if action in ["stop", "deallocate"] and current_state == "VM deallocated":
+                return {"changed": False, "msg": "VM is already deallocated."}
+
+        poller = begin_action(compute_client, rg, vm_resource, action, polling_interval, operation_token)
+        if poller is None:
             return {"failed": True, "msg": f"Unsupported action '{action}'"}
 
-        # get status after stop/deallocate
-        instance_view = compute_client.virtual_machines.instance_view(rg, vm_resource)
-        power_state = get_power_state(instance_view)
+        if wait:
+            # the poller follows the operation's Azure-AsyncOperation/Retry-After headers
+            poller.wait(timeout)
 
-        return {
-            "changed": True,
-            "msg": f"{action.title()} request completed.",
+        # with a token the request was already sent (and reported as changed) by an earlier call
+        result = {
+            "changed": not operation_token,
             "vm": vm_resource,
-            "power_state": power_state
+            "resource_group": rg,
+            "subscription_id": vm_info["subscription_id"],
+            "operation_status": poller.status(),
         }
 
+        if not poller.done():
+            result["operation_token"] = poller.continuation_token()
+            if wait:
+                result.update(failed=True, msg=f"VM {action} operation timed out after {timeout}s.")
+            else:
+                result["msg"] = f"{action.title()} request sent."
+            return result
+
+        # raises if the operation failed
+        poller.result()
+
+        # get status after the operation
+        instance_view = compute_client.virtual_machines.instance_view(rg, vm_resource)
+        result.update(msg=f"{action.title()} request completed.", power_state=get_power_state(instance_view))
+        return result
+
     except HttpResponseError as e:
         return {"failed": True, "msg": f"Azure API error: {str(e)}"}
 
@@ -302,17 +313,25 @@ def main():
         argument_spec=dict(
             vm_name=dict(type="str", required=True),
             action=dict(type="str", required=True, choices=["start", "stop", "deallocate"]),
+            wait=dict(type="bool", default=True),
+            timeout=dict(type="int"),
+            polling_interval=dict(type="int", default=5),
+            operation_token=dict(type="str", no_log=False),
         ),
         supports_check_mode=False
     )
 
-    vm_name = module.params["vm_name"]
-    action = module.params["action"]
-
-    result = manage_vm(vm_name, action)
+    result = manage_vm(
+        module.params["vm_name"],
+        module.params["action"],
+        wait=module.params["wait"],
+        timeout=module.params["timeout"],
+        polling_interval=module.params["polling_interval"],
+        operation_token=module.params["operation_token"],
+    )
 
     if result.get("failed"):
-        module.fail_json(msg=result["msg"])
+        module.fail_json(**result)
     else:
         module.exit_json(**result)
 
@@ -0,0 +1,79 @@
+"""
+Unit tests for the dynamic IP audit (dyn_ip.py)
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the scripts directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import dyn_ip
+except ImportError:  # Azure SDK not installed
+    dyn_ip = None
+
+
+class FakeAudit(dyn_ip.DynIPAudit if dyn_ip else object):
+    """Audit whose check answers from a dict instead of Azure."""
+
+    def __init__(self, answers):
+        super().__init__(inventory=None, credentials={}, workers=4)
+        self.answers = answers
+        self.checked = []
+
+    def check(self, row):
+        self.checked.append(dyn_ip.vm_key(row))
+        return dict(row, dynIP=self.answers[dyn_ip.vm_key(row)])
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+@unittest.skipIf(dyn_ip is None, "Azure SDK not installed")
+class TestDynIPAudit(unittest.TestCase):
+    """Test the streaming writer and resume of DynIPAudit.run."""
+
+    def setUp(self):
+        self.vm_data = [{"name": name, "owner": "ops"} for name in ("VM1", "VM2", "VM3", "VM4")]
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, "vm_list_dyn_ip.csv")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_run_writes_rows_in_masterfile_order(self):
+        """Test every row is written once, in masterfile order, with its dynIP result."""
+        audit = FakeAudit({"VM1": "YES", "VM2": "NO", "VM3": "ERROR", "VM4": "NO INV DATA"})
+        summary = audit.run(self.vm_data, self.output)
+
+        rows = read_rows(self.output)
+        self.assertEqual([r["name"] for r in rows], ["VM1", "VM2", "VM3", "VM4"])
+        self.assertEqual([r["dynIP"] for r in rows], ["YES", "NO", "ERROR", "NO INV DATA"])
+        self.assertEqual(rows[0]["owner"], "ops")
+        self.assertEqual(summary, {"YES": 1, "NO": 1, "ERROR": 1, "NO INV DATA": 1})
+
+    def test_resume_keeps_finished_rows_and_rechecks_the_rest(self):
+        """Test a resume after an interrupted run keeps earlier results and checks only the rest."""
+        # an interrupted run: VM2 done, VM3 failed, VM1 cut off half-way through its row
+        with open(self.output, "w", newline='', encoding='utf-8') as f:
+            f.write("name,owner,dynIP\r\nVM2,ops,NO\r\nVM3,ops,ERROR\r\nVM1,o")
+
+        audit = FakeAudit({"VM1": "YES", "VM3": "YES", "VM4": "NO"})
+        summary = audit.run(self.vm_data, self.output, resume=True)
+
+        self.assertEqual(sorted(audit.checked), ["VM1", "VM3", "VM4"])
+        rows = read_rows(self.output)
+        self.assertEqual([(r["name"], r["dynIP"]) for r in rows],
+                         [("VM1", "YES"), ("VM2", "NO"), ("VM3", "YES"), ("VM4", "NO")])
+        self.assertEqual(summary, {"YES": 2, "NO": 2})
+        self.assertEqual(os.listdir(self.tmp.name), ["vm_list_dyn_ip.csv"])
+
+
+if __name__ == '__main__':
+    unittest.main()
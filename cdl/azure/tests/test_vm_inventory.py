@@ -0,0 +1,75 @@
+"""
+Unit tests for the shared VM inventory (vm_inventory.py)
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the scripts directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vm_inventory
+
+
+INVENTORY_CSV = (
+    '#TYPE Selected.Microsoft.Azure.Commands.Compute.Models.PSVirtualMachine\n'
+    'name,computerName,subscriptionId,resourceGroup\n'
+    'vm-a,CSM1AAA001,sub-1,rg-1\n'
+    'vm-b,CSM4BBB002,sub-2,rg-2\n'
+    'vm-a,CSM1AAA009,sub-3,rg-3\n'
+)
+
+
+class TestVMInventory(unittest.TestCase):
+    """Test inventory lookups from the CSV and from the compiled cache."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "inventory.csv")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(INVENTORY_CSV)
+        vm_inventory._loaded.clear()
+
+    def tearDown(self):
+        vm_inventory._loaded.clear()
+        self.tmp.cleanup()
+
+    def check_lookups(self, inventory):
+        self.assertEqual(len(inventory), 3)
+        self.assertEqual(inventory.by_name("VM-A")["subscriptionId"], "sub-1")
+        self.assertEqual(inventory.by_computer_name("csm4bbb002")["name"], "vm-b")
+        self.assertEqual(inventory.find("/subscriptions/SUB-3/resourceGroups/rg-3/providers/"
+                                        "Microsoft.Compute/virtualMachines/vm-a")["computerName"], "CSM1AAA009")
+        self.assertIsNone(inventory.by_name("missing"))
+
+    def test_cache_answers_keyed_lookups(self):
+        """Test a later process answers lookups from the cache with the same results as the CSV."""
+        parsed = vm_inventory.open_inventory(self.path)
+        self.assertIsInstance(parsed, vm_inventory.VMInventory)
+        self.check_lookups(parsed)
+        self.assertTrue(os.path.exists(vm_inventory.cache_path(self.path)))
+
+        vm_inventory._loaded.clear()
+        cached = vm_inventory.open_inventory(self.path)
+        self.assertIsInstance(cached, vm_inventory.CachedInventory)
+        self.check_lookups(cached)
+        self.assertEqual(cached.rows, parsed.rows)
+        self.assertEqual(vm_inventory.load_inventory("vm-b", self.path),
+                         {"subscription_id": "sub-2", "resource_group": "rg-2", "vm_name": "vm-b"})
+
+    def test_changed_csv_rebuilds_cache(self):
+        """Test the cache is ignored and rebuilt once the CSV changes."""
+        vm_inventory.open_inventory(self.path)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("vm-c,CSM1CCC003,sub-4,rg-4\n")
+
+        vm_inventory._loaded.clear()
+        inventory = vm_inventory.open_inventory(self.path)
+        self.assertIsInstance(inventory, vm_inventory.VMInventory)
+        self.assertEqual(inventory.by_name("vm-c")["subscriptionId"], "sub-4")
+
+
+if __name__ == '__main__':
+    unittest.main()
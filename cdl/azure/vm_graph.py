@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Locate VMs by guest computer name with one Azure Resource Graph query.
+
+Resource Graph searches every subscription the credential can read at once, so
+a VM is found without crawling each subscription and resource group. Azure China
+VMs are found by passing authority='china', which queries the China Resource
+Manager endpoint.
+
+Usage:
+    from vm_graph import find_vm, get_power_state
+
+    vm_info = find_vm(credential, "CSM1KPOCVMW934")
+    if vm_info:
+        instance_view = compute_client.virtual_machines.instance_view(
+            vm_info["resource_group"], vm_info["vm_name"])
+        power_state = get_power_state(instance_view)
+
+Author: tsvetelin.maslarski-ext@ldc.com
+"""
+
+# one KQL quoting rule and query runner for all Resource Graph lookups (see copy_sto_program)
+try:
+    from ansible.module_utils.resource_graph import ResourceGraphQuery, kql_string
+    from ansible.module_utils.azure_clients import CHINA_ARM_ENDPOINT
+except ImportError:
+    from copy_sto_program.src.core.resource_graph import ResourceGraphQuery, kql_string
+    from azure_clients import CHINA_ARM_ENDPOINT
+
+VM_BY_COMPUTER_NAME_QUERY = (
+    "resources"
+    " | where type =~ 'microsoft.compute/virtualmachines'"
+    " | extend computerName = tolower(tostring(coalesce("
+    "properties.osProfile.computerName, properties.extended.instanceView.computerName)))"
+    " | where computerName == {computer_name}"
+    " | project subscriptionId, resourceGroup, name"
+)
+
+
+def find_vm(credential, computer_name, authority='global'):
+    """
+    Find a VM by its guest computer name.
+
+    Args:
+        credential: Azure credential of the authority
+        computer_name (str): Guest computer name (case-insensitive)
+        authority (str): 'global' or 'china'
+
+    Returns:
+        dict: subscription_id, resource_group and vm_name of the VM, or None if it is
+              not found or azure-mgmt-resourcegraph is not installed
+
+    Raises:
+        HttpResponseError: If the query fails
+    """
+    try:
+        graph = ResourceGraphQuery(credential, CHINA_ARM_ENDPOINT if authority == 'china' else None)
+    except ImportError:
+        return None
+
+    query = VM_BY_COMPUTER_NAME_QUERY.format(computer_name=kql_string(computer_name.lower()))
+    for row in graph.query(query):
+        return {
+            "subscription_id": row["subscriptionId"],
+            "resource_group": row["resourceGroup"],
+            "vm_name": row["name"],
+        }
+    return None
+
+
+def get_power_state(instance_view):
+    """
+    Power state of a VM instance view (e.g. 'VM running').
+
+    The statuses are matched on their 'PowerState/' code, as their order is not fixed
+    (a VM that is being provisioned has no ProvisioningState/succeeded status first).
+
+    Returns:
+        str: Display status of the power state, or None if the instance view has none
+    """
+    for status in instance_view.statuses or []:
+        if (status.code or "").startswith("PowerState/"):
+            return status.display_status
+    return None
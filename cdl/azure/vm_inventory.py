@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Shared lookup of the daily Azure VM inventory.
+
+The inventory (azure_VMs_inventory-global-china-<date>.csv on the archive share)
+is parsed once into name, computerName and resource ID indexes. A compiled SQLite
+copy is kept next to the CSV (<csv>.idx.sqlite) with indexed key columns, so later
+runs answer each lookup with one keyed query instead of re-parsing the CSV or
+loading every row; it is rebuilt whenever the CSV's mtime or size changes.
+Within one process the opened inventory is kept in memory.
+
+Usage:
+    from vm_inventory import load_inventory, open_inventory
+
+    vm_info = load_inventory("CSM1KPOCVMW934")
+    inventory = open_inventory()
+    row = inventory.by_computer_name("csm1kpocvmw934")
+
+Author: tsvetelin.maslarski-ext@ldc.com
+"""
+
+import csv
+import io
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# Inventory setup
+INVENTORY_DIR = "/mnt/opcon-archive/Archive/7D/UPD"
+INVENTORY_PREFIX = "azure_VMs_inventory-global-china-"
+CSV_EXT = ".csv"
+CACHE_EXT = ".idx.sqlite"
+# Bump when the layout of the cache changes so old caches are rebuilt
+CACHE_VERSION = "2"
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def get_today():
+    """Generate a string with the format of the date (today) to match the inventory naming convention."""
+    return datetime.today().strftime("%Y%m%d")
+
+
+def inventory_path(day=None, directory=INVENTORY_DIR):
+    """
+    Path of the inventory CSV of a day.
+
+    Args:
+        day (str): Date as YYYYMMDD, today if not provided
+        directory (str): Directory holding the inventory files
+
+    Returns:
+        str: Full path of the CSV
+    """
+    return os.path.join(directory, f"{INVENTORY_PREFIX}{day or get_today()}{CSV_EXT}")
+
+
+def _key(value):
+    return (value or "").strip().upper()
+
+
+def resource_id_of(row):
+    """
+    ARM resource ID of an inventory row, lower-cased.
+
+    Uses the 'id' or 'ResourceId' column when the export has one, otherwise builds
+    the ID from subscriptionId, resourceGroup and name.
+    """
+    resource_id = (row.get("id") or row.get("ResourceId") or "").strip()
+    if not resource_id.lower().startswith("/subscriptions/"):
+        resource_id = (f"/subscriptions/{(row.get('subscriptionId') or '').strip()}"
+                       f"/resourceGroups/{(row.get('resourceGroup') or '').strip()}"
+                       f"/providers/Microsoft.Compute/virtualMachines/{(row.get('name') or '').strip()}")
+    return resource_id.lower()
+
+
+def vm_info(row):
+    """Reduce an inventory row to the subscription_id/resource_group/vm_name dict used by the scripts."""
+    if row is None:
+        return None
+    return {
+        "subscription_id": row.get("subscriptionId"),
+        "resource_group": row.get("resourceGroup"),
+        "vm_name": row.get("name"),
+    }
+
+
+def parse_csv(path):
+    """
+    Read all rows of an inventory CSV.
+
+    Skips the '#TYPE' line PowerShell's Export-Csv writes, and accepts both comma
+    and tab separated exports.
+
+    Args:
+        path (str): Inventory CSV
+
+    Returns:
+        list: One dict per VM, in file order
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        content = f.read()
+
+    if content.startswith("#TYPE"):
+        content = content.split("\n", 1)[1] if "\n" in content else ""
+
+    header = content.split("\n", 1)[0]
+    delimiter = "\t" if header.count("\t") > header.count(",") else ","
+    return [dict(row) for row in csv.DictReader(io.StringIO(content), delimiter=delimiter)]
+
+
+class VMInventory:
+    """
+    In-memory inventory with O(1) lookups by name, computerName and resource ID.
+
+    Keys are case-insensitive. When several rows share a key, the first one in the
+    file wins, like the linear scans this replaces.
+    """
+
+    def __init__(self, rows, source=None):
+        """
+        Build the indexes.
+
+        Args:
+            rows (list): Inventory rows (dicts keyed by CSV column)
+            source (str): Path the rows were read from, for messages
+        """
+        self.rows = rows
+        self.source = source
+        self._by_name = {}
+        self._by_computer_name = {}
+        self._by_resource_id = {}
+
+        for row in rows:
+            name = _key(row.get("name"))
+            if name:
+                self._by_name.setdefault(name, row)
+            computer_name = _key(row.get("computerName"))
+            if computer_name:
+                self._by_computer_name.setdefault(computer_name, row)
+            self._by_resource_id.setdefault(resource_id_of(row), row)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Parse an inventory CSV."""
+        return cls(parse_csv(path), source=path)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def by_name(self, vm_name):
+        """Row of the VM with this Azure resource name, or None."""
+        return self._by_name.get(_key(vm_name))
+
+    def by_computer_name(self, computer_name):
+        """Row of the VM with this guest computer name, or None."""
+        return self._by_computer_name.get(_key(computer_name))
+
+    def by_resource_id(self, resource_id):
+        """Row of the VM with this ARM resource ID, or None."""
+        return self._by_resource_id.get((resource_id or "").strip().lower())
+
+    def find(self, value):
+        """
+        Look a VM up by resource ID, name or computer name.
+
+        Args:
+            value (str): '/subscriptions/...' resource ID, VM name or computer name
+
+        Returns:
+            dict: Inventory row, or None
+        """
+        if (value or "").strip().lower().startswith("/subscriptions/"):
+            return self.by_resource_id(value)
+        return self.by_name(value) or self.by_computer_name(value)
+
+
+def cache_path(path):
+    """Path of the compiled cache kept next to an inventory CSV."""
+    return f"{path}{CACHE_EXT}"
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return str(stat.st_mtime_ns), str(stat.st_size)
+
+
+class CachedInventory:
+    """
+    Inventory answered from the compiled cache with keyed SQLite queries.
+
+    Offers the lookups of VMInventory without loading the rows: each lookup reads
+    one row through the index of its key column. Keys and first-row-wins semantics
+    are the same as VMInventory's.
+    """
+
+    def __init__(self, conn, source=None):
+        """
+        Args:
+            conn (sqlite3.Connection): Open connection to a current cache
+            source (str): Path of the inventory CSV, for messages
+        """
+        self.source = source
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    def _fetch_one(self, column, value):
+        with self._lock:
+            found = self._conn.execute(
+                f"SELECT data FROM rows WHERE {column} = ? ORDER BY position LIMIT 1", (value,)
+            ).fetchone()
+        return json.loads(found[0]) if found else None
+
+    @property
+    def rows(self):
+        """All rows in file order (loads the whole inventory)."""
+        with self._lock:
+            return [json.loads(data) for (data,) in self._conn.execute("SELECT data FROM rows ORDER BY position")]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def by_name(self, vm_name):
+        """Row of the VM with this Azure resource name, or None."""
+        return self._fetch_one("name_key", _key(vm_name))
+
+    def by_computer_name(self, computer_name):
+        """Row of the VM with this guest computer name, or None."""
+        return self._fetch_one("computer_name_key", _key(computer_name))
+
+    def by_resource_id(self, resource_id):
+        """Row of the VM with this ARM resource ID, or None."""
+        return self._fetch_one("resource_id", (resource_id or "").strip().lower())
+
+    find = VMInventory.find
+
+
+def _read_cache(path, stamp):
+    cache = cache_path(path)
+    if not os.path.exists(cache):
+        return None
+    try:
+        # The cache is only ever replaced as a whole, so it can be read without locking
+        # (SQLite locking is unreliable on the CIFS share)
+        conn = sqlite3.connect(f"file:{cache}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+        except sqlite3.Error:
+            conn.close()
+            raise
+        if (meta.get("version"), meta.get("mtime_ns"), meta.get("size")) != (CACHE_VERSION,) + stamp:
+            conn.close()
+            return None
+    except sqlite3.Error:
+        return None
+    return CachedInventory(conn, source=path)
+
+
+def _write_cache(path, inventory, stamp):
+    cache = cache_path(path)
+    temp = f"{cache}.{os.getpid()}.tmp"
+    try:
+        conn = sqlite3.connect(temp)
+        try:
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE rows (position INTEGER PRIMARY KEY, name_key TEXT, "
+                         "computer_name_key TEXT, resource_id TEXT, data TEXT)")
+            conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                             [("version", CACHE_VERSION), ("mtime_ns", stamp[0]), ("size", stamp[1])])
+            conn.executemany("INSERT INTO rows VALUES (?, ?, ?, ?, ?)",
+                             [(i, _key(row.get("name")), _key(row.get("computerName")),
+                               resource_id_of(row), json.dumps(row))
+                              for i, row in enumerate(inventory.rows)])
+            for column in ("name_key", "computer_name_key", "resource_id"):
+                conn.execute(f"CREATE INDEX rows_{column} ON rows ({column}, position)")
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(temp, cache)
+    except (OSError, sqlite3.Error):
+        # Read-only share or concurrent writer: the next run parses the CSV again
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+
+
+def open_inventory(path=None, use_cache=True):
+    """
+    Load an inventory, from memory or the compiled cache when they are current.
+
+    Args:
+        path (str): Inventory CSV, today's inventory if not provided
+        use_cache (bool): Read and write the compiled cache next to the CSV
+
+    Returns:
+        VMInventory, or CachedInventory when the compiled cache is current (same lookups)
+
+    Raises:
+        FileNotFoundError: If the inventory CSV does not exist
+    """
+    path = path or inventory_path()
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Inventory not found at: {path}")
+
+    stamp = _stamp(path)
+    with _loaded_lock:
+        loaded = _loaded.get(path)
+        if loaded and loaded[0] == stamp:
+            return loaded[1]
+
+        inventory = _read_cache(path, stamp) if use_cache else None
+        if inventory is None:
+            inventory = VMInventory.from_csv(path)
+            if use_cache:
+                _write_cache(path, inventory, stamp)
+
+        _loaded[path] = (stamp, inventory)
+        return inventory
+
+
+def load_inventory(vm_name, path=None):
+    """
+    Load VM information from the inventory.
+
+    Args:
+        vm_name (str): VM name to search for
+        path (str): Inventory CSV, today's inventory if not provided
+
+    Returns:
+        dict: VM information including subscription_id, resource_group, and vm_name,
+              or None if the VM is not in the inventory
+
+    Raises:
+        FileNotFoundError: If the inventory CSV does not exist
+    """
+    return vm_info(open_inventory(path).by_name(vm_name))